@@ -0,0 +1,107 @@
+"""
+Per grid cell running statistics which can be updated with, or merged from, separate chunks of data. This allows
+ungridded data to be aggregated without holding all of it in memory at once.
+"""
+import numpy as np
+
+from cis.collocation.col_framework import AbstractDataOnlyKernel
+import cis.collocation.segmented as segmented
+
+
+class RunningMoments(object):
+    """
+    The number of values, mean, sum of squared deviations from the mean (M2), minimum and maximum in each cell of a
+    grid. Two sets of moments are merged using the pairwise update of Chan et al., so the result doesn't depend (beyond
+    rounding) on how the values were split between them.
+    """
+
+    #: The statistics which can be calculated from the moments
+    statistics = ('count', 'mean', 'std', 'min', 'max', 'sum')
+
+    def __init__(self, shape):
+        """
+        :param tuple shape: The shape of the grid
+        """
+        self.count = np.zeros(shape)
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+        self.min = np.full(shape, np.inf)
+        self.max = np.full(shape, -np.inf)
+
+    def update(self, count, mean, m2, minimum, maximum):
+        """
+        Merge the moments of some more values into these moments.
+
+        :param count: Array of the number of new values in each cell
+        :param mean: Array of the mean of the new values in each cell (ignored where the count is zero)
+        :param m2: Array of the sum of squared deviations from the mean of the new values in each cell (ignored where
+         the count is zero)
+        :param minimum: Array of the minimum of the new values in each cell (ignored where the count is zero)
+        :param maximum: Array of the maximum of the new values in each cell (ignored where the count is zero)
+        """
+        new = np.asarray(count) > 0
+        count_a, count_b = self.count[new], np.asarray(count)[new]
+        total = count_a + count_b
+        delta = np.asarray(mean)[new] - self.mean[new]
+        self.mean[new] += delta * count_b / total
+        self.m2[new] += np.asarray(m2)[new] + delta ** 2 * count_a * count_b / total
+        self.count[new] = total
+        self.min[new] = np.minimum(self.min[new], np.asarray(minimum)[new])
+        self.max[new] = np.maximum(self.max[new], np.asarray(maximum)[new])
+
+    def merge(self, other):
+        """
+        Merge another set of running moments (over the same grid) into these.
+
+        :param RunningMoments other: The moments to merge
+        """
+        self.update(other.count, other.mean, other.m2, other.min, other.max)
+
+    def get_statistic(self, name, ddof=1):
+        """
+        Calculate a statistic of the values in each cell.
+
+        :param str name: One of :attr:`statistics`
+        :param int ddof: The delta degrees of freedom used for the standard deviation
+        :return: A masked array over the grid, masked where the statistic is undefined (e.g. cells with no values)
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if name == 'count':
+                result = self.count.copy()
+            elif name == 'mean':
+                result = self.mean.copy()
+            elif name == 'std':
+                result = np.sqrt(self.m2 / (self.count - ddof))
+                result[self.count <= ddof] = np.nan
+            elif name == 'min':
+                result = self.min.copy()
+            elif name == 'max':
+                result = self.max.copy()
+            elif name == 'sum':
+                result = self.mean * self.count
+            else:
+                raise ValueError("Unknown statistic: {}".format(name))
+        result[self.count == 0] = np.nan
+        return np.ma.masked_invalid(result)
+
+
+class running_moments(AbstractDataOnlyKernel):
+    """
+    Calculate the inputs of :meth:`RunningMoments.update` (the number of values, mean, sum of squared deviations, minimum
+    and maximum) for some values.
+    """
+    return_size = 5
+
+    def get_variable_details(self, var_name, var_long_name, var_standard_name, var_units):
+        return tuple((var_name + '_' + name, var_long_name, None, var_units)
+                     for name in ('count', 'mean', 'm2', 'min', 'max'))
+
+    def get_value_for_data_only(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        mean = np.mean(values)
+        return values.size, mean, np.sum((values - mean) ** 2), np.min(values), np.max(values)
+
+    def get_value_for_segments(self, values, indptr):
+        return (segmented.segment_count(values, indptr), segmented.segment_mean(values, indptr),
+                segmented.segment_sum_of_squared_deviations(values, indptr), segmented.segment_min(values, indptr),
+                segmented.segment_max(values, indptr))
@@ -5,17 +5,53 @@ from datetime import datetime
 
 class UngriddedAggregator(object):
 
-    def __init__(self, grid):
+    def __init__(self, grid, workers=1):
+        """
+        :param dict grid: The grid specifications (slices) for each coordinate to aggregate onto, by name
+        :param int workers: The number of worker processes to aggregate the data with
+        """
         self._grid = grid
+        self.workers = int(workers)
+        if self.workers < 1:
+            raise ValueError("The number of workers must be at least 1")
 
     def aggregate(self, data, kernel):
         """
         Performs aggregation for ungridded data by first generating a new grid, converting it into a cube, then
-        collocating using the appropriate kernel and a cube cell constraint
+        collocating using the appropriate kernel and a cube cell constraint.
+
+        If more than one worker is used (and the kernel can be calculated from running moments) the data points are
+        split into partitions which are aggregated in separate processes and then merged.
+        """
+        from cis.collocation.col_implementations import GeneralGriddedCollocator, BinnedCubeCellOnlyConstraint
+
+        if self.workers > 1:
+            try:
+                aggregator = StreamingUngriddedAggregator(self._grid, kernel, workers=self.workers)
+            except ValueError as e:
+                logging.warning("{} Aggregating in a single process.".format(e))
+            else:
+                aggregator.add(data)
+                return aggregator.result()
+
+        aggregation_cube = self._make_aggregation_cube(data)
+
+        collocator = GeneralGriddedCollocator()
+        constraint = BinnedCubeCellOnlyConstraint()
+        aggregated_cube = collocator.collocate(aggregation_cube, data, constraint, kernel)
+        self._add_max_min_bounds_for_collapsed_coords(aggregated_cube, data)
+        self._rename_clashing_variables(aggregated_cube, aggregation_cube)
+
+        return aggregated_cube
+
+    def _make_aggregation_cube(self, data):
+        """
+        Make a cube with the aggregation grid, to collocate the data onto.
+        :param data: The data to be aggregated
+        :return: An iris Cube
         """
         from cis.exceptions import CoordinateNotFoundError
         from iris.cube import Cube
-        from cis.collocation.col_implementations import GeneralGriddedCollocator, BinnedCubeCellOnlyConstraint
         new_cube_coords = []
         new_cube_shape = []
 
@@ -34,16 +70,15 @@ class UngriddedAggregator(object):
                                           "name.".format("' or '".join(list(self._grid.keys()))))
 
         dummy_data = np.reshape(np.arange(int(np.prod(new_cube_shape))) + 1.0, tuple(new_cube_shape))
-        aggregation_cube = Cube(dummy_data, dim_coords_and_dims=new_cube_coords)
+        return Cube(dummy_data, dim_coords_and_dims=new_cube_coords)
 
-        collocator = GeneralGriddedCollocator()
-        constraint = BinnedCubeCellOnlyConstraint()
-        aggregated_cube = collocator.collocate(aggregation_cube, data, constraint, kernel)
-        self._add_max_min_bounds_for_collapsed_coords(aggregated_cube, data)
-
-        # We need to rename any variables which clash with coordinate names otherwise they will not output correctly, we
-        # prepend it with 'aggregated_' to make it clear which variable has been aggregated (the original coordinate
-        # value will not have been.)
+    @staticmethod
+    def _rename_clashing_variables(aggregated_cube, aggregation_cube):
+        """
+        We need to rename any variables which clash with coordinate names otherwise they will not output correctly, we
+        prepend it with 'aggregated_' to make it clear which variable has been aggregated (the original coordinate
+        value will not have been.)
+        """
         for idx, d in enumerate(aggregated_cube):
             if d.var_name in [coord.var_name for coord in aggregation_cube.coords()]:
                 new_name = "aggregated_" + d.var_name
@@ -52,8 +87,6 @@ class UngriddedAggregator(object):
                 logging.warning("Variable {} clashes with a coordinate variable name and has been renamed to: {}"
                                 .format(d.var_name, new_name))
 
-        return aggregated_cube
-
     @staticmethod
     def _get_CF_coordinate_units(coord):
         """
@@ -140,6 +173,190 @@ class UngriddedAggregator(object):
         return start, end, centre
 
 
+class StreamingUngriddedAggregator(UngriddedAggregator):
+    """
+    Aggregates ungridded data which is given a chunk (e.g. a file) at a time. Only running moments are kept for each
+    grid cell, so the memory needed is proportional to the size of the grid rather than the amount of data. This
+    supports the kernels which can be calculated from the moments: moments, mean, stddev, min, max and sum.
+
+    The grid must be fully specified (including the start and end of each aggregated dimension) as it can't be
+    determined from the first chunk.
+
+    Each chunk can also be split into partitions which are binned in separate worker processes, the running moments
+    of the partitions are then merged in the same way as those of separate chunks.
+    """
+
+    def __init__(self, grid, kernel, workers=1):
+        """
+        :param dict grid: The grid specifications (slices) for each coordinate to aggregate onto, by name
+        :param kernel: The kernel to use in the aggregation
+        :param int workers: The number of worker processes to bin each chunk with
+        """
+        super(StreamingUngriddedAggregator, self).__init__(grid, workers)
+        for name, grid_slice in grid.items():
+            if grid_slice.start is None or grid_slice.stop is None:
+                raise ValueError("The start and end of the {} grid must be given to aggregate in chunks".format(name))
+        self.kernel = kernel
+        self.statistics = self._get_kernel_statistics(kernel)
+
+        self._aggregation_cube = None
+        # The collocated output of the first chunk for each variable, which is used for the shape and coordinates of
+        # the final output
+        self._templates = None
+        # The (name, long name, standard name, units) of each variable
+        self._variables = None
+        self._moments = None
+        # The (min, max) of the coordinates which are fully collapsed, to give their final bounds
+        self._collapsed_ranges = {}
+
+    @staticmethod
+    def _get_kernel_statistics(kernel):
+        """
+        Find the statistics of the running moments which give the outputs of a kernel.
+        :param kernel: The aggregation kernel
+        :return tuple: The names of the statistics, see :attr:`RunningMoments.statistics`
+        """
+        import cis.collocation.col_implementations as ci
+        kernel_statistics = [(ci.moments, ('mean', 'std', 'count')), (ci.mean, ('mean',)), (ci.stddev, ('std',)),
+                             (ci.min, ('min',)), (ci.max, ('max',)), (ci.sum, ('sum',))]
+        for kernel_class, statistics in kernel_statistics:
+            if isinstance(kernel, kernel_class):
+                return statistics
+        raise ValueError("The {} kernel can't be used to aggregate in chunks, it must be one of moments, mean, stddev,"
+                         " min, max or sum".format(kernel.__class__.__name__))
+
+    def add(self, data):
+        """
+        Add a chunk of data to the aggregation.
+        :param UngriddedData or UngriddedDataList data: The chunk, this must have the same variables and coordinates
+         as the previous chunks
+        """
+        from cis.collocation import parallel
+
+        variables = data if isinstance(data, list) else [data]
+        if self._aggregation_cube is None:
+            self._aggregation_cube = self._make_aggregation_cube(data)
+            self._variables = [(var.var_name, var.long_name, var.standard_name, var.units) for var in variables]
+        elif len(variables) != len(self._variables):
+            raise ValueError("Each chunk must contain the same variables: expected {} but found {}".format(
+                len(self._variables), len(variables)))
+
+        # Load the data (removing any points with missing coordinates) before it is partitioned, so that the (forked)
+        # workers share it rather than each reading it
+        n_partitions = min([self.workers] + [len(var.data) for var in variables])
+        if n_partitions > 1:
+            results = parallel.map_in_processes(_get_partition_moments, list(range(n_partitions)), n_partitions,
+                                                self, data, n_partitions)
+        else:
+            results = [self._get_moments(data)]
+        for templates, moments in results:
+            self._merge(templates, moments)
+
+        for coord in self._aggregation_cube.coords():
+            if len(coord.points) == 1 and np.all(np.isinf(coord.bounds)):
+                start, end, centre = self._get_coord_start_end_centre(data.coord(coord.name()))
+                previous_start, previous_end = self._collapsed_ranges.get(coord.name(), (start, end))
+                self._collapsed_ranges[coord.name()] = (np.minimum(start, previous_start), np.maximum(end, previous_end))
+
+    def _get_moments(self, data):
+        """
+        Bin some data onto the aggregation grid and find the running moments of each variable.
+        :param UngriddedData or UngriddedDataList data: The data
+        :return: A list of the collocated cubes to use as templates for the output, and a list of the RunningMoments
+         for each variable
+        """
+        from cis.aggregation.running_moments import RunningMoments, running_moments
+        from cis.collocation.col_implementations import GeneralGriddedCollocator, BinnedCubeCellOnlyConstraint
+
+        output = GeneralGriddedCollocator().collocate(self._aggregation_cube, data, BinnedCubeCellOnlyConstraint(),
+                                                      running_moments())
+        size = running_moments.return_size
+        templates = output[::size]
+        all_moments = []
+        for idx, template in enumerate(templates):
+            count, mean, m2, minimum, maximum = output[idx * size:(idx + 1) * size]
+            moments = RunningMoments(template.shape)
+            moments.update(count.data.filled(0), *[cube.data.filled(np.nan) for cube in (mean, m2, minimum, maximum)])
+            all_moments.append(moments)
+        return templates, all_moments
+
+    def _merge(self, templates, moments):
+        """
+        Merge the running moments of some data (see :meth:`_get_moments`) into those of the aggregation.
+        """
+        if self._moments is None:
+            self._templates, self._moments = templates, moments
+        else:
+            for total, new in zip(self._moments, moments):
+                total.merge(new)
+
+    def aggregate(self, data, kernel=None):
+        """
+        Aggregate all of the chunks of data in an iterable.
+        :param data: An iterable of UngriddedData or UngriddedDataList chunks
+        :param kernel: (not used) the kernel is given when creating the aggregator
+        :return GriddedDataList: The aggregated data
+        """
+        for chunk in data:
+            self.add(chunk)
+        return self.result()
+
+    def result(self):
+        """
+        Get the aggregation of all of the chunks added so far.
+        :return GriddedDataList: The aggregated data
+        """
+        from cis.data_io.gridded_data import GriddedDataList
+        from cis.utils import set_standard_name_if_valid
+
+        if self._moments is None:
+            raise ValueError("No data has been added to the aggregation")
+
+        output = GriddedDataList()
+        for (var_name, long_name, standard_name, units), moments, template in zip(self._variables, self._moments,
+                                                                                   self._templates):
+            details = self.kernel.get_variable_details(var_name, long_name, standard_name, units)
+            for statistic, (name, statistic_long_name, statistic_standard_name, statistic_units) in \
+                    zip(self.statistics, details):
+                cube = template.copy(data=moments.get_statistic(statistic))
+                cube.var_name = name
+                cube.long_name = statistic_long_name
+                cube.standard_name = None
+                set_standard_name_if_valid(cube, statistic_standard_name)
+                try:
+                    cube.units = statistic_units
+                except ValueError:
+                    logging.warning("Units are not cf compliant, not setting them. Units {}".format(statistic_units))
+                for coord_name, (start, end) in self._collapsed_ranges.items():
+                    coord = cube.coord(coord_name)
+                    coord.points = np.array([start + (end - start) / 2.0])
+                    coord.bounds = np.array([[start, end]])
+                output.append(cube)
+
+        self._rename_clashing_variables(output, self._aggregation_cube)
+        return output
+
+
+def _get_partition_moments(aggregator, data, n_partitions, partition):
+    """
+    Find the running moments of one partition of some data, splitting each variable into equal ranges of points.
+    :param StreamingUngriddedAggregator aggregator: The aggregator
+    :param UngriddedData or UngriddedDataList data: The data to partition
+    :param int n_partitions: The number of partitions the data is split into
+    :param int partition: The index of the partition to aggregate
+    :return: The templates and running moments, see :meth:`StreamingUngriddedAggregator._get_moments`
+    """
+    def get_partition(variable):
+        bounds = np.linspace(0, len(variable.data), n_partitions + 1).astype(int)
+        return variable[bounds[partition]:bounds[partition + 1]]
+
+    if isinstance(data, list):
+        data = type(data)([get_partition(variable) for variable in data])
+    else:
+        data = get_partition(data)
+    return aggregator._get_moments(data)
+
+
 def aggregation_grid_array(start, end, delta):
     from cis.time_util import cis_standard_time_unit
     new_grid = np.arange(start + delta / 2, end + delta / 2, delta)
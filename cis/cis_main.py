@@ -89,6 +89,11 @@ def col_cmd(main_arguments):
     missing_data_for_missing_sample = check_boolean(col_options.pop('missing_data_for_missing_sample',
                                                                     str(missing_data_for_missing_sample)), logging)
 
+    # Collocating in chunks writes the output as it goes, rather than returning it
+    chunk_size = col_options.pop('chunk_size', None)
+    if chunk_size is not None:
+        col_options.update(chunk_size=chunk_size, output_file=main_arguments.output)
+
     kernel = get_kernel(kern_name)(**kern_options) if kern_name else None
 
     for input_group in main_arguments.datagroups:
@@ -96,7 +101,8 @@ def col_cmd(main_arguments):
         data = DataReader().read_single_datagroup(input_group)
         output = data.collocated_onto(sample_data, how=col_name, kernel=kernel,
                                       missing_data_for_missing_sample=missing_data_for_missing_sample, **col_options)
-        output.save_data(main_arguments.output)
+        if chunk_size is None:
+            output.save_data(main_arguments.output)
 
 
 def subset_cmd(main_arguments):
@@ -134,6 +140,13 @@ def aggregate_cmd(main_arguments):
         __error_occurred("Aggregation can only be performed on one data group")
     input_group = main_arguments.datagroups[0]
 
+    if main_arguments.stream:
+        from cis.data_io.ungridded_data import _aggregate_ungridded_in_chunks
+        output = _aggregate_ungridded_in_chunks(_read_each_file(input_group), how=input_group.get("kernel", ''),
+                                                workers=main_arguments.workers, **main_arguments.grid)
+        output.save_data(main_arguments.output)
+        return
+
     data = DataReader().read_single_datagroup(input_group)
 
     if isinstance(data, GriddedDataList):
@@ -143,11 +156,28 @@ def aggregate_cmd(main_arguments):
             raise ex.InvalidCommandLineOptionError("Grid specifications are not supported for Gridded aggregation.")
         output = data.collapsed(list(main_arguments.grid.keys()), how=input_group.get("kernel", ''))
     else:
-        output = data.aggregate(how=input_group.get("kernel", ''), **main_arguments.grid)
+        output = data.aggregate(how=input_group.get("kernel", ''), workers=main_arguments.workers,
+                                **main_arguments.grid)
 
     output.save_data(main_arguments.output)
 
 
+def _read_each_file(datagroup):
+    """
+    Read the data from each file of a datagroup in turn.
+
+    :param datagroup: The datagroup to read
+    :return: An iterator of the UngriddedDataList read from each file
+    """
+    import cis.exceptions as ex
+    for filename in datagroup['filenames']:
+        data = DataReader().read_data_list([filename], datagroup['variables'], datagroup.get('product', None),
+                                           datagroup.get('aliases', None))
+        if data.is_gridded:
+            raise ex.InvalidCommandLineOptionError("Only ungridded data can be aggregated one file at a time.")
+        yield data
+
+
 def collapse_cmd(main_arguments):
     """
     Main routine for handling calls to the collapse command.
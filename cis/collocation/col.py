@@ -20,7 +20,6 @@ def collocate(data, sample, collocator, constraint, kernel):
     """
     from cis.exceptions import CoordinateNotFoundError
     from time import time
-    from cis import __version__
 
     logging.info("Collocator: " + str(collocator))
     logging.info("Kernel: " + str(kernel))
@@ -36,16 +35,53 @@ def collocate(data, sample, collocator, constraint, kernel):
     logging.info("Completed. Total time taken: " + str(time() - t1))
 
     for d in new_data:
-        history = "Collocated onto sampling from: " + str(getattr(sample, "filenames", "Unknown")) + " " + \
-                  "\nusing CIS version " + __version__ + " " + \
-                  "\nvariables: " + str(getattr(data, "var_name", "Unknown")) + " " + \
-                  "\nwith files: " + str(getattr(data, "filenames", "Unknown")) + " " + \
-                  "\nusing collocator: " + str(collocator) + " " + \
-                  "\nkernel: " + str(kernel)
-        d.add_history(history)
+        d.add_history(_get_history(data, sample, collocator, kernel))
     return new_data
 
 
+def collocate_to_file(data, sample, collocator, constraint, kernel, output_file, chunk_size):
+    """
+    Perform the collocation a chunk at a time, writing the output to a file as each chunk is completed. Chunks are of
+    sample points for ungridded collocation, and of time steps for gridded -> gridded collocation.
+
+    :param CommonData or CommonDataList data: Data to collocate
+    :param CommonData sample: Sampling to collocate onto
+    :param cis.collocation.col_framework.Collocator collocator: The collocator object to use, which must implement
+        collocate_to_file
+    :param cis.collocation.col_framework.Constraint constraint: The constraint object
+    :param cis.collocation.col_framework.Kernel  kernel: The kernel to use
+    :param str output_file: The NetCDF file to write the collocated data to
+    :param int chunk_size: The number of sample points (or time steps) to collocate at a time
+    :raises CoordinateNotFoundError: If the collocator was unable to compare the sample and data points
+    """
+    from cis.exceptions import CoordinateNotFoundError
+    from time import time
+
+    logging.info("Collocator: " + str(collocator))
+    logging.info("Kernel: " + str(kernel))
+
+    logging.info("Collocating in chunks of {}, this could take a while...".format(chunk_size))
+    t1 = time()
+    try:
+        collocator.collocate_to_file(sample, data, constraint, kernel, output_file, chunk_size,
+                                     history=_get_history(data, sample, collocator, kernel))
+    except (TypeError, AttributeError) as e:
+        raise CoordinateNotFoundError('Collocator was unable to compare data points, check the dimensions of each '
+                                      'data set and the collocation methods chosen. \n' + str(e))
+
+    logging.info("Completed. Total time taken: " + str(time() - t1))
+
+
+def _get_history(data, sample, collocator, kernel):
+    from cis import __version__
+    return "Collocated onto sampling from: " + str(getattr(sample, "filenames", "Unknown")) + " " + \
+           "\nusing CIS version " + __version__ + " " + \
+           "\nvariables: " + str(getattr(data, "var_name", "Unknown")) + " " + \
+           "\nwith files: " + str(getattr(data, "filenames", "Unknown")) + " " + \
+           "\nusing collocator: " + str(collocator) + " " + \
+           "\nkernel: " + str(kernel)
+
+
 def get_kernel(kernel, default=moments):
     """
      Return a valid kernel instance from either an instance or a string, default is moments if no kernel is specified
@@ -127,6 +127,147 @@ class AbstractDataOnlyKernel(Kernel):
         :raises ValueError: If there are any problems creating a value
         """
 
+    def get_value_for_segments(self, values, indptr):
+        """
+        Apply the kernel to many sets of values at once. The values for segment ``i`` (e.g. the data points
+        constrained to one sample point) are ``values[indptr[i]:indptr[i + 1]]``.
+
+        This default implementation calls :meth:`.AbstractDataOnlyKernel.get_value_for_data_only` once per
+        non-empty segment; kernels which can be expressed as segmented numpy reductions should override it.
+
+        :param values: A flat numpy array of the values of all segments, in segment order
+        :param indptr: A numpy array of the segment boundaries, of length number of segments + 1
+        :return: An array of length number of segments if return_size is 1, otherwise a tuple of
+            :attr:`.Kernel.return_size` such arrays. Segments for which no value could be calculated are NaN.
+        """
+        result = np.full((self.return_size, len(indptr) - 1), np.nan)
+        for i, (start, stop) in enumerate(zip(indptr[:-1], indptr[1:])):
+            if stop > start:
+                try:
+                    result[:, i] = self.get_value_for_data_only(values[start:stop])
+                except ValueError:
+                    pass
+        return result[0] if self.return_size == 1 else tuple(result)
+
+
+class AbstractNearestNeighbourKernel(Kernel):
+    """
+    A Kernel which returns the value of the data point nearest to the sample point, using a distance calculated from
+    one or more coordinates. Where two or more points are equally near the first one is chosen.
+    """
+
+    __metaclass__ = ABCMeta
+
+    #: The names of the coordinates used to calculate the distance between points
+    coord_names = ()
+
+    @abstractmethod
+    def get_distances(self, data_coords, sample_coords):
+        """
+        This method should return the distance between each data point and its sample point. The coordinates are given
+        in the order of :attr:`.AbstractNearestNeighbourKernel.coord_names`.
+
+        :param data_coords: A list of numpy arrays of the data point coordinates
+        :param sample_coords: A list of the sample point coordinates, either scalars or numpy arrays of the same shape as
+         the data point coordinates
+        :return: A numpy array of distances
+        """
+
+    def get_value(self, point, data):
+        """
+        Find the value of the data point nearest to the sample point.
+
+        :param point: A single HyperPoint (or pandas Series) with the coordinates in coord_names
+        :param data: A pandas DataFrame of the data points
+        :return: The value of the nearest data point
+        :raises ValueError: If there are no data points
+        """
+        nearest = self.get_value_for_segments(point, data, np.array([0, len(data)]))[0]
+        if np.isnan(nearest):
+            raise ValueError
+        return nearest
+
+    def get_value_for_segments(self, sample_points, data_points, indptr, indices=None, values=None):
+        """
+        Find the values of the nearest data points for many sample points at once. The data points constrained to
+        sample point ``i`` are the rows ``indices[indptr[i]:indptr[i + 1]]`` of data_points.
+
+        :param sample_points: The sample points, a pandas DataFrame (or a single point) with the coordinates in
+         coord_names
+        :param data_points: The data points, a pandas DataFrame
+        :param indptr: A numpy array of the segment boundaries, of length number of sample points + 1
+        :param indices: A numpy array of the row numbers in data_points of each segment's points. If None then this is
+         every data point, in order.
+        :param values: A numpy array of the value of each data point. If None then this is ``data_points.vals``.
+        :return: An array of length number of sample points of nearest values, NaN where there is no nearest point
+        """
+        from cis.collocation import segmented
+        if indices is None:
+            indices = np.arange(len(data_points))
+        sample_ids = segmented.segment_ids(indptr)
+        data_coords = [getattr(data_points, name).values[indices] for name in self.coord_names]
+        sample_coords = [np.asarray(getattr(sample_points, name)) for name in self.coord_names]
+        if sample_coords and np.ndim(sample_coords[0]) > 0:
+            sample_coords = [coord[sample_ids] for coord in sample_coords]
+        nearest = segmented.segment_argmin(self.get_distances(data_coords, sample_coords), indptr)
+
+        result = np.full(len(indptr) - 1, np.nan)
+        found = nearest >= 0
+        if values is None:
+            values = data_points.vals.values
+        result[found] = values[indices[nearest[found]]]
+        return result
+
+
+class AbstractDistanceWeightedKernel(Kernel):
+    """
+    A Kernel which returns a mean of the data points weighted by their horizontal distance from the sample point.
+    """
+
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def get_weights(self, distances, indptr):
+        """
+        This method should return the weight of each data point, given its distance from its sample point.
+
+        :param distances: A flat numpy array of the distances (in km) of the data points of all segments, in segment
+         order
+        :param indptr: A numpy array of the segment boundaries, of length number of segments + 1
+        :return: A numpy array of weights, the same shape as distances
+        """
+
+    def get_value(self, point, data):
+        """
+        Find the weighted mean of the data points around a sample point.
+
+        :param point: A single HyperPoint (or pandas Series) with a latitude and longitude
+        :param data: A pandas DataFrame of the data points
+        :return: The weighted mean of the data values
+        :raises ValueError: If there are no data points (or they all have zero weight)
+        """
+        from cis.collocation.kdtree import haversine
+        distances = haversine(data[['latitude', 'longitude']].values, np.array([point.latitude, point.longitude]))
+        value = self.get_value_for_segments(data.vals.values, distances, np.array([0, len(data)]))[0]
+        if np.isnan(value):
+            raise ValueError
+        return value
+
+    def get_value_for_segments(self, values, distances, indptr):
+        """
+        Find the weighted means of many segments at once. The data points of segment ``i`` (i.e. those constrained to
+        one sample point) are ``values[indptr[i]:indptr[i + 1]]``, at distances ``distances[indptr[i]:indptr[i + 1]]``
+        from the sample point.
+
+        :param values: A flat numpy array of the values of all segments, in segment order
+        :param distances: A flat numpy array of the distances (in km) of each value from its sample point
+        :param indptr: A numpy array of the segment boundaries, of length number of segments + 1
+        :return: An array of length number of segments of the weighted means, NaN for segments with no points
+        """
+        from cis.collocation import segmented
+        return segmented.segment_weighted_mean(values, self.get_weights(np.asarray(distances, dtype=np.float64),
+                                                                        indptr), indptr)
+
 
 class Constraint(object):
     """
@@ -4,15 +4,19 @@ import iris.cube
 import iris.coords
 from iris.exceptions import CoordinateMultiDimError
 import numpy as np
+import pandas as pd
 from numpy import mean as np_mean, std as np_std, min as np_min, max as np_max, sum as np_sum
 
 from cis.collocation.col_framework import (Collocator, Constraint, PointConstraint, CellConstraint,
-                                           IndexedConstraint, Kernel, AbstractDataOnlyKernel)
+                                           IndexedConstraint, Kernel, AbstractDataOnlyKernel,
+                                           AbstractNearestNeighbourKernel, AbstractDistanceWeightedKernel)
 import cis.exceptions
 from cis.data_io.gridded_data import GriddedData, make_from_cube, GriddedDataList
 from cis.data_io.hyperpoint import HyperPoint, HyperPointList
 from cis.data_io.ungridded_data import Metadata, UngriddedDataList, UngriddedData
 import cis.collocation.data_index as data_index
+import cis.collocation.parallel as parallel
+import cis.collocation.segmented as segmented
 from cis.utils import log_memory_profile, set_standard_name_if_valid
 
 
@@ -21,6 +25,22 @@ class GeneralUngriddedCollocator(Collocator):
     Collocator for locating onto ungridded sample points
     """
 
+    def __init__(self, fill_value=None, var_name='', var_long_name='', var_units='',
+                 missing_data_for_missing_sample=False, workers=1):
+        """
+        :param workers: The number of worker processes to collocate the sample points with. The sample points are split
+         into spatially coherent shards which are collocated in parallel. The default is 1 (no parallelism).
+        """
+        super(GeneralUngriddedCollocator, self).__init__(fill_value, var_name, var_long_name, var_units,
+                                                         missing_data_for_missing_sample)
+        from cis.exceptions import InvalidCommandLineOptionError
+        try:
+            self.workers = int(workers)
+        except ValueError:
+            raise InvalidCommandLineOptionError('Collocator workers must be a valid integer')
+        if self.workers < 1:
+            raise InvalidCommandLineOptionError('Collocator workers must be at least 1')
+
     def collocate(self, points, data, constraint, kernel):
         """
         This collocator takes a list of HyperPoints and a data object (currently either Ungridded
@@ -39,6 +59,10 @@ class GeneralUngriddedCollocator(Collocator):
         log_memory_profile("GeneralUngriddedCollocator Initial")
 
         if isinstance(data, list):
+            if self._can_share_constraint(data, constraint, kernel):
+                # The variables share coordinates, so the points constrained to each sample point are found once
+                # and the kernel is then applied to the values of each variable.
+                return self._collocate_variables(points, data, constraint, kernel)
             # Indexing and constraints (for SepConstraintKdTree) will only take place on the first iteration,
             # so we really can just call this method recursively if we've got a list of data.
             output = UngriddedDataList()
@@ -46,70 +70,280 @@ class GeneralUngriddedCollocator(Collocator):
                 output.extend(self.collocate(points, var, constraint, kernel))
             return output
 
+        return self._collocate_variables(points, [data], constraint, kernel)
+
+    @staticmethod
+    def _can_share_constraint(data, constraint, kernel):
+        """
+        Can the constrained points be found once for all of the variables in a list? This requires that the constraint
+        and kernel can work on many sample points at once, and that the variables all have the same coordinates.
+        """
+        if len(data) < 2 or not hasattr(constraint, "get_segment_iterator") or \
+                not isinstance(kernel, (AbstractDataOnlyKernel, AbstractNearestNeighbourKernel,
+                                        AbstractDistanceWeightedKernel)):
+            return False
+        return _have_same_coordinates(data)
+
+    def _collocate_variables(self, points, variables, constraint, kernel):
+        """
+        Collocate one or more variables which share the same coordinates.
+
+        :param UngriddedData or UngriddedCoordinates points: Object defining the sample points
+        :param list variables: The UngriddedData objects to collocate from
+        :param constraint: An instance of a Constraint subclass
+        :param kernel: An instance of a Kernel subclass
+        :return UngriddedDataList: The output variables of the kernel for each variable in turn
+        """
         # First fix the sample points so that they all fall within the same 360 degree longitude range
         _fix_longitude_range(points.coords(), points)
-        # Then fix the data points so that they fall onto the same 360 degree longitude range as the sample points
-        _fix_longitude_range(points.coords(), data)
 
         # Convert to dataframes for fancy indexing
         sample_points = points.as_data_frame(time_index=False, name='vals')
-        data_points = data.as_data_frame(time_index=False, name='vals').dropna(axis=0)
+        data_points, value_names = self._get_data_points(points, variables)
 
         log_memory_profile("GeneralUngriddedCollocator after data retrieval")
 
         # Create index if constraint and/or kernel require one.
         coord_map = None
         data_index.create_indexes(constraint, points, data_points, coord_map)
+        data_index.create_indexes(kernel, points, data_points, coord_map)
         log_memory_profile("GeneralUngriddedCollocator after indexing")
 
         logging.info("--> Collocating...")
+        return self._collocate_sample(sample_points, points.coords(), data_points, value_names, variables,
+                                      constraint, kernel)
 
-        # Create output arrays.
-        self.var_name = data.var_name
-        self.var_long_name = data.long_name
-        self.var_standard_name = data.standard_name
-        self.var_units = data.units
-        var_set_details = kernel.get_variable_details(self.var_name, self.var_long_name,
-                                                      self.var_standard_name, self.var_units)
+    def collocate_to_file(self, points, data, constraint, kernel, output_file, chunk_size=100000, history=None):
+        """
+        Collocate onto the sample points in chunks, writing the results for each chunk to a NetCDF file as it is
+        completed. This means the memory needed for the collocation is bounded by the chunk size rather than the number
+        of sample points. The output file is the same as would be created by saving the output of :meth:`collocate`.
+
+        :param UngriddedData or UngriddedCoordinates points: Object defining the sample points
+        :param UngriddedData or UngriddedDataList data: The source data to collocate from
+        :param constraint: An instance of a Constraint subclass
+        :param kernel: An instance of a Kernel subclass
+        :param str output_file: The NetCDF file to write
+        :param int chunk_size: The number of sample points to collocate at a time
+        :param str history: History to add to each output variable
+        """
+        from cis.data_io.Coord import Coord, CoordList
+        from cis.data_io.write_netcdf import write_coordinates, add_data_to_file
+
+        chunk_size = _parse_chunk_size(chunk_size)
+
+        if not isinstance(data, list):
+            groups = [[data]]
+        elif self._can_share_constraint(data, constraint, kernel):
+            groups = [data]
+        else:
+            groups = [[var] for var in data]
+
+        _fix_longitude_range(points.coords(), points)
+        write_coordinates(points, output_file)
+
+        sample_coords = points.coords()
+        coord_arrays = [_flat_values(coord.data) for coord in sample_coords]
+        sample_arrays = {coord.standard_name: values for coord, values in zip(sample_coords, coord_arrays)}
+        if hasattr(points, 'data'):
+            sample_arrays['vals'] = _flat_values(points.data)
+        sample_points_count = len(coord_arrays[0])
+
+        for variables in groups:
+            data_points, value_names = self._get_data_points(points, variables)
+            data_index.create_indexes(constraint, points, data_points, None)
+            data_index.create_indexes(kernel, points, data_points, None)
+            for start in range(0, sample_points_count, chunk_size):
+                # Slicing past the end of the arrays gives the (shorter) last chunk
+                chunk = slice(start, start + chunk_size)
+                logging.info("--> Collocating from sample point {} of {}".format(start, sample_points_count))
+                sample_points = pd.DataFrame({name: values[chunk] for name, values in sample_arrays.items()})
+                chunk_coords = CoordList([Coord(values[chunk], coord.metadata, coord.axis)
+                                          for coord, values in zip(sample_coords, coord_arrays)])
+                output = self._collocate_sample(sample_points, chunk_coords, data_points, value_names, variables,
+                                                constraint, kernel)
+                for output_var in output:
+                    if history is not None:
+                        output_var.add_history(history)
+                    add_data_to_file(output_var, output_file, start=chunk.start)
+                log_memory_profile("GeneralUngriddedCollocator after chunk")
+
+    def _get_data_points(self, points, variables):
+        """
+        Create a DataFrame of the data points of one or more variables which share the same coordinates.
 
+        :param points: The sample points, whose longitude range the data is fixed to
+        :param list variables: The UngriddedData objects
+        :return: The DataFrame, and a list of the names of its value column for each variable
+        """
+        # Fix the data points so that they fall onto the same 360 degree longitude range as the sample points
+        for var in variables:
+            _fix_longitude_range(points.coords(), var)
+
+        data_points = variables[0].as_data_frame(time_index=False, name='vals')
+        coord_names = [name for name in data_points.columns if name != 'vals']
+        value_names = ['vals']
+        for var in variables[1:]:
+            value_names.append('vals_{}'.format(len(value_names)))
+            data_points[value_names[-1]] = _flat_values(var.data)
+        # Keep the points for which at least one of the variables has a value
+        data_points = data_points.dropna(axis=0, subset=coord_names).dropna(axis=0, how='all', subset=value_names)
+        return data_points, value_names
+
+    def _collocate_sample(self, sample_points, sample_coords, data_points, value_names, variables, constraint, kernel):
+        """
+        Collocate the data points onto some sample points, using an already indexed constraint.
+
+        :param sample_points: The sample points DataFrame
+        :param sample_coords: The coordinates of the sample points, for the output
+        :param data_points: The (non-masked) data points DataFrame
+        :param list value_names: The names of the value columns in data_points, one for each variable
+        :param list variables: The UngriddedData objects the values are from, for the output metadata
+        :param constraint: The constraint, which has already been indexed
+        :param kernel: The kernel
+        :return UngriddedDataList: The output variables of the kernel for each variable in turn
+        """
+        # Create output arrays.
         sample_points_count = len(sample_points)
-        # Create an empty masked array to store the collocated values. The elements will be unmasked by assignment.
-        values = np.ma.masked_all((len(var_set_details), sample_points_count))
-        values.fill_value = self.fill_value
+        var_set_details = []
+        values = []
+        for var in variables:
+            self.var_name = var.var_name
+            self.var_long_name = var.long_name
+            self.var_standard_name = var.standard_name
+            self.var_units = var.units
+            var_set_details.append(kernel.get_variable_details(self.var_name, self.var_long_name,
+                                                               self.var_standard_name, self.var_units))
+            # Create an empty masked array to store the collocated values. The elements will be unmasked by
+            # assignment.
+            var_values = np.ma.masked_all((len(var_set_details[-1]), sample_points_count))
+            var_values.fill_value = self.fill_value
+            values.append(var_values)
         log_memory_profile("GeneralUngriddedCollocator after output array creation")
 
         logging.info("    {} sample points".format(sample_points_count))
         # Apply constraint and/or kernel to each sample point.
+        if self.workers > 1 and sample_points_count > 1 and 'latitude' in sample_points and 'longitude' in sample_points:
+            # Split the sample points into spatially coherent shards (so that each shard only needs a small part of the
+            # data index) and collocate them in parallel. Several shards per worker helps to balance the load.
+            shards = parallel.spatial_shards(sample_points.latitude.values, sample_points.longitude.values,
+                                             self.workers * 4)
+            results = parallel.map_in_processes(self._collocate_shard, shards, self.workers, sample_points,
+                                                data_points, constraint, kernel, value_names,
+                                                [len(details) for details in var_set_details])
+            for shard, shard_values in zip(shards, results):
+                for var_values, var_shard_values in zip(values, shard_values):
+                    var_values[:, shard] = var_shard_values
+        else:
+            self._collocate_points(sample_points, data_points, constraint, kernel, value_names, values)
+        log_memory_profile("GeneralUngriddedCollocator after running kernel on sample points")
+
+        return_data = UngriddedDataList()
+        for var_details, var_values in zip(var_set_details, values):
+            # Mask any bad values
+            var_values = np.ma.masked_invalid(var_values)
+            for idx, details in enumerate(var_details):
+                var_metadata = Metadata(name=details[0], long_name=details[1], shape=(sample_points_count,),
+                                        missing_value=self.fill_value, units=details[3])
+                set_standard_name_if_valid(var_metadata, details[2])
+                return_data.append(UngriddedData(var_values[idx, :], var_metadata, sample_coords))
+        log_memory_profile("GeneralUngriddedCollocator final")
 
+        return return_data
+
+    def _collocate_shard(self, sample_points, data_points, constraint, kernel, value_names, n_outputs, shard):
+        """
+        Collocate a subset of the sample points, returning the values for just those points.
+
+        :param sample_points: The sample points DataFrame
+        :param data_points: The (non-masked) data points DataFrame
+        :param constraint: The constraint, which has already been indexed
+        :param kernel: The kernel
+        :param list value_names: The names of the value columns in data_points, one for each variable
+        :param list n_outputs: The number of output variables of the kernel for each variable
+        :param shard: numpy array of the indices of the sample points to collocate
+        :return: A list of masked arrays of shape (n_outputs, len(shard)), one for each variable
+        """
+        values = [np.ma.masked_all((n, len(shard))) for n in n_outputs]
+        self._collocate_points(sample_points.iloc[shard].reset_index(drop=True), data_points, constraint, kernel,
+                               value_names, values)
+        return values
+
+    def _collocate_points(self, sample_points, data_points, constraint, kernel, value_names, values):
+        """
+        Apply the constraint and kernel to every sample point, setting the values in place.
+
+        :param sample_points: The sample points DataFrame
+        :param data_points: The (non-masked) data points DataFrame
+        :param constraint: The constraint, which has already been indexed
+        :param kernel: The kernel
+        :param list value_names: The names of the value columns in data_points, one for each variable. Only the batched
+         kernels support more than one variable.
+        :param list values: Masked arrays of shape (number of output variables, number of sample points) to store the
+         values of each variable in
+        """
         if isinstance(kernel, nn_horizontal_only):
             # Only find the nearest point using the kd-tree, without constraint in other dimensions
             nearest_points = data_points.iloc[constraint.haversine_distance_kd_tree_index.find_nearest_point(sample_points)]
-            values[0, :] = nearest_points.vals.values
+            values[0][0, :] = nearest_points.vals.values
+        elif isinstance(kernel, nn_spacetime):
+            # Find the nearest point in space and time to every sample point with a single query of the index
+            distances, nearest = kernel.space_time_kd_tree_index.find_nearest_points(sample_points)
+            found = np.flatnonzero(nearest < len(data_points))
+            if hasattr(constraint, 'separation_mask'):
+                # Any separations given are the furthest the nearest point can be
+                found = found[constraint.separation_mask(data_points, sample_points, nearest[found], found)]
+            values[0][0, found] = data_points[value_names[0]].values[nearest[found]]
+            if self.missing_data_for_missing_sample and hasattr(sample_points, 'vals'):
+                values[0][:, np.isnan(sample_points.vals.values)] = np.ma.masked
+        elif isinstance(kernel, AbstractDistanceWeightedKernel) and hasattr(constraint, "get_segment_iterator"):
+            # Weight the points constrained to many sample points at once by the distances found by the constraint
+            all_data_values = [data_points[name].values for name in value_names]
+            for sample_slice, indptr, indices, distances in constraint.get_segment_iterator(data_points, sample_points,
+                                                                                            distances=True):
+                for data_values, var_values in zip(all_data_values, values):
+                    var_indptr, var_indices, var_distances = indptr, indices, distances
+                    valid = ~np.isnan(data_values[indices])
+                    if not valid.all():
+                        # Remove the points at which this variable has no value
+                        var_indptr = segmented.compress_segments(indptr, valid)
+                        var_indices, var_distances = indices[valid], distances[valid]
+                    var_values[0, sample_slice] = kernel.get_value_for_segments(data_values[var_indices],
+                                                                                var_distances, var_indptr)
+            if self.missing_data_for_missing_sample and hasattr(sample_points, 'vals'):
+                for var_values in values:
+                    var_values[:, np.isnan(sample_points.vals.values)] = np.ma.masked
+        elif isinstance(kernel, (AbstractDataOnlyKernel, AbstractNearestNeighbourKernel)) and \
+                hasattr(constraint, "get_segment_iterator"):
+            # Constrain the points for many sample points at once, then apply the kernel to each variable
+            all_data_values = [data_points[name].values for name in value_names]
+            for sample_slice, indptr, indices in constraint.get_segment_iterator(data_points, sample_points):
+                for data_values, var_values in zip(all_data_values, values):
+                    var_indptr, var_indices = indptr, indices
+                    valid = ~np.isnan(data_values[indices])
+                    if not valid.all():
+                        # Remove the points at which this variable has no value
+                        var_indptr, var_indices = segmented.compress_segments(indptr, valid), indices[valid]
+                    if isinstance(kernel, AbstractDataOnlyKernel):
+                        var_values[:, sample_slice] = kernel.get_value_for_segments(data_values[var_indices],
+                                                                                    var_indptr)
+                    else:
+                        var_values[0, sample_slice] = kernel.get_value_for_segments(
+                            sample_points.iloc[sample_slice], data_points, var_indptr, var_indices, data_values)
+            if self.missing_data_for_missing_sample and hasattr(sample_points, 'vals'):
+                for var_values in values:
+                    var_values[:, np.isnan(sample_points.vals.values)] = np.ma.masked
         else:
             for i, point, con_points in constraint.get_iterator(self.missing_data_for_missing_sample, None, None,
                                                                 data_points, None, sample_points, None):
 
                 try:
-                    values[:, i] = kernel.get_value(point, con_points)
+                    values[0][:, i] = kernel.get_value(point, con_points)
                     # Kernel returns either a single value or a tuple of values to insert into each output variable.
                 except CoordinateMultiDimError as e:
                     raise NotImplementedError(e)
                 except ValueError as e:
                     pass
-        log_memory_profile("GeneralUngriddedCollocator after running kernel on sample points")
-
-        # Mask any bad values
-        values = np.ma.masked_invalid(values)
-
-        return_data = UngriddedDataList()
-        for idx, var_details in enumerate(var_set_details):
-            var_metadata = Metadata(name=var_details[0], long_name=var_details[1], shape=(len(sample_points),),
-                                    missing_value=self.fill_value, units=var_details[3])
-            set_standard_name_if_valid(var_metadata, var_details[2])
-            return_data.append(UngriddedData(values[idx, :], var_metadata, points.coords()))
-        log_memory_profile("GeneralUngriddedCollocator final")
-
-        return return_data
 
 
 class GriddedUngriddedCollocator(Collocator):
@@ -143,21 +377,26 @@ class GriddedUngriddedCollocator(Collocator):
         log_memory_profile("GriddedUngriddedCollocator Initial")
 
         if isinstance(data, list):
-            # Indexing and constraints (for SepConstraintKdTree) will only take place on the first iteration,
-            # so we really can just call this method recursively if we've got a list of data.
-            output = UngriddedDataList()
-            for var in data:
-                output.extend(self.collocate(points, var, constraint, kernel))
-            return output
+            if len(data) > 1 and not _are_on_same_grid(data):
+                # Indexing and constraints (for SepConstraintKdTree) will only take place on the first iteration,
+                # so we really can just call this method recursively if we've got a list of data.
+                output = UngriddedDataList()
+                for var in data:
+                    output.extend(self.collocate(points, var, constraint, kernel))
+                return output
+            # Otherwise all of the variables can be interpolated together, with a single evaluation of the weights
+            variables = data
+        else:
+            variables = [data]
 
         if constraint is not None and not isinstance(constraint, DummyConstraint):
             raise ValueError("A constraint cannot be specified for the GriddedUngriddedCollocator")
-        data_points = data
 
         # First fix the sample points so that they all fall within the same 360 degree longitude range
         _fix_longitude_range(points.coords(), points)
         # Then fix the data points so that they fall onto the same 360 degree longitude range as the sample points
-        _fix_longitude_range(points.coords(), data_points)
+        for var in variables:
+            _fix_longitude_range(points.coords(), var)
 
         log_memory_profile("GriddedUngriddedCollocator after data retrieval")
 
@@ -166,16 +405,23 @@ class GriddedUngriddedCollocator(Collocator):
 
         if self.interpolator is None:
             # Cache the interpolator
-            self.interpolator = GriddedUngriddedInterpolator(data, points, kernel, self.missing_data_for_missing_sample)
+            self.interpolator = GriddedUngriddedInterpolator(variables[0], points, kernel,
+                                                             self.missing_data_for_missing_sample)
 
-        values = self.interpolator(data, fill_value=self.fill_value, extrapolate=self.extrapolate)
+        if len(variables) > 1:
+            values = self.interpolator(variables, fill_value=self.fill_value, extrapolate=self.extrapolate)
+        else:
+            values = [self.interpolator(variables[0], fill_value=self.fill_value, extrapolate=self.extrapolate)]
 
         log_memory_profile("GriddedUngriddedCollocator after running kernel on sample points")
 
-        metadata = Metadata(self.var_name or data.var_name, long_name=self.var_long_name or data.long_name,
-                            shape=values.shape, missing_value=self.fill_value, units=self.var_units or data.units)
-        set_standard_name_if_valid(metadata, data.standard_name)
-        return_data = UngriddedDataList([UngriddedData(values, metadata, points.coords())])
+        return_data = UngriddedDataList()
+        for var, var_values in zip(variables, values):
+            metadata = Metadata(self.var_name or var.var_name, long_name=self.var_long_name or var.long_name,
+                                shape=var_values.shape, missing_value=self.fill_value,
+                                units=self.var_units or var.units)
+            set_standard_name_if_valid(metadata, var.standard_name)
+            return_data.append(UngriddedData(var_values, metadata, points.coords()))
 
         log_memory_profile("GriddedUngriddedCollocator final")
 
@@ -262,7 +508,10 @@ class SepConstraintKdtree(PointConstraint):
     search using the other parameter(s).
     """
 
-    def __init__(self, h_sep=None, a_sep=None, p_sep=None, t_sep=None):
+    #: The maximum number of candidate (sample point, data point) pairs to constrain at once in get_segment_iterator
+    max_block_size = 10000000
+
+    def __init__(self, h_sep=None, a_sep=None, p_sep=None, t_sep=None, eps=None):
         from cis.exceptions import InvalidCommandLineOptionError
 
         self.haversine_distance_kd_tree_index = False
@@ -271,21 +520,37 @@ class SepConstraintKdtree(PointConstraint):
 
         self._index_cache = {}
         self.checks = []
+        # The same checks as (coordinate name, mask function) pairs, for constraining many points at once
+        self.mask_checks = []
         if h_sep is not None:
             self.h_sep = cis.utils.parse_distance_with_units_to_float_km(h_sep)
             self.haversine_distance_kd_tree_index = None
         else:
             self.h_sep = None
 
+        if eps is not None:
+            try:
+                eps = float(eps)
+            except ValueError:
+                raise InvalidCommandLineOptionError('Separation Constraint eps must be a valid float')
+            if eps < 0:
+                raise InvalidCommandLineOptionError('Separation Constraint eps must not be negative')
+            if self.h_sep is not None:
+                # Configure the index to search approximately, it is filled in by data_index.create_indexes
+                from cis.collocation.haversinedistancekdtreeindex import HaversineDistanceKDTreeIndex
+                self.haversine_distance_kd_tree_index = HaversineDistanceKDTreeIndex(eps=eps)
+
         if a_sep is not None:
             self.a_sep = cis.utils.parse_distance_with_units_to_float_m(a_sep)
             self.checks.append(self.alt_constraint)
+            self.mask_checks.append(('altitude', self.alt_mask))
         if p_sep is not None:
             try:
                 self.p_sep = float(p_sep)
             except:
                 raise InvalidCommandLineOptionError('Separation Constraint p_sep must be a valid float')
             self.checks.append(self.pressure_constraint)
+            self.mask_checks.append(('air_pressure', self.pressure_mask))
         if t_sep is not None:
             from cis.parse_datetime import parse_datetimestr_delta_to_float_days
             try:
@@ -293,6 +558,10 @@ class SepConstraintKdtree(PointConstraint):
             except ValueError as e:
                 raise InvalidCommandLineOptionError(e)
             self.checks.append(self.time_constraint)
+            self.mask_checks.append(('time', self.time_mask))
+            if self.h_sep is None:
+                # Without a horizontal separation use the time index to find the candidate points
+                self.time_sorted_index = None
 
     def time_constraint(self, points, ref_point):
         return (np.abs(points.time - ref_point.time) < self.t_sep).to_numpy().nonzero()[0]
@@ -307,6 +576,38 @@ class SepConstraintKdtree(PointConstraint):
                                       (points.air_pressure.values <= ref_point.air_pressure))[0]
         return np.concatenate([lesser_pressures, greater_pressures])
 
+    def time_mask(self, data_times, ref_times):
+        return np.abs(data_times - ref_times) < self.t_sep
+
+    def alt_mask(self, data_altitudes, ref_altitudes):
+        return np.abs(data_altitudes - ref_altitudes) < self.a_sep
+
+    def pressure_mask(self, data_pressures, ref_pressures):
+        return np.where(data_pressures > ref_pressures,
+                        (data_pressures / ref_pressures) < self.p_sep,
+                        (ref_pressures / data_pressures) < self.p_sep)
+
+    def separation_mask(self, data_points, points, data_indices, sample_indices, horizontal=True):
+        """
+        Check whether pairs of data and sample points are within all of the separations of this constraint.
+
+        :param data_points: The data points, as a DataFrame
+        :param points: The sample points, as a DataFrame
+        :param data_indices: numpy array of the indices of the data point of each pair
+        :param sample_indices: numpy array of the indices of the sample point of each pair
+        :param bool horizontal: Also check the horizontal separation (if there is one)
+        :return: Boolean numpy array which is True for the pairs within the separations
+        """
+        keep = np.ones(len(data_indices), dtype=bool)
+        if horizontal and self.h_sep is not None:
+            from cis.collocation.kdtree import haversine
+            keep &= haversine(data_points[['latitude', 'longitude']].values[data_indices],
+                              points[['latitude', 'longitude']].values[sample_indices]) < self.h_sep
+        for coord_name, mask_check in self.mask_checks:
+            keep &= mask_check(getattr(data_points, coord_name).values[data_indices],
+                               getattr(points, coord_name).values[sample_indices])
+        return keep
+
     def constrain_points(self, ref_point, data):
         if self.haversine_distance_kd_tree_index and self.h_sep:
             point_indices = self._get_cached_indices(ref_point)
@@ -314,6 +615,8 @@ class SepConstraintKdtree(PointConstraint):
                 point_indices = self.haversine_distance_kd_tree_index.find_points_within_distance(ref_point, self.h_sep)
                 self._add_cached_indices(ref_point, point_indices)
             con_points = data.iloc[point_indices]
+        elif self._has_time_index():
+            con_points = data.iloc[self.time_sorted_index.find_points_within_window(ref_point.time, self.t_sep)]
         else:
             con_points = data
         for check in self.checks:
@@ -321,6 +624,9 @@ class SepConstraintKdtree(PointConstraint):
 
         return con_points
 
+    def _has_time_index(self):
+        return getattr(self, 'time_sorted_index', None) is not None and self.time_sorted_index.sort_order is not None
+
     def _get_cached_indices(self, ref_point):
         # Don't use the value as a key (it's both irrelevant and un-hashable)
         return self._index_cache.get(tuple(ref_point[['latitude', 'longitude']].values), None)
@@ -335,9 +641,12 @@ class SepConstraintKdtree(PointConstraint):
         sample_points_count = len(points)
 
         indices = False
+        window_starts = None
 
         if self.haversine_distance_kd_tree_index and self.h_sep:
             indices = self.haversine_distance_kd_tree_index.find_points_within_distance_sample(points, self.h_sep)
+        elif self._has_time_index():
+            window_starts, window_stops = self.time_sorted_index.find_windows(points.time.values, self.t_sep)
 
         for i, p in points.iterrows():
 
@@ -353,6 +662,9 @@ class SepConstraintKdtree(PointConstraint):
                 if indices:
                     # Note that data_points has to be a dataframe at this point because of the indexing
                     d_points = data_points.iloc[indices[i]]
+                elif window_starts is not None:
+                    d_points = data_points.iloc[np.sort(self.time_sorted_index.sort_order[window_starts[i]:
+                                                                                          window_stops[i]])]
                 else:
                     d_points = data_points
                 for check in self.checks:
@@ -360,6 +672,83 @@ class SepConstraintKdtree(PointConstraint):
 
                 yield i, p, d_points
 
+    def get_segment_iterator(self, data_points, points, distances=False):
+        """
+        Iterate through the sample points in blocks, constraining the data points for every sample point in a block at
+        once. The constrained points are returned as a flattened CSR-style structure: the indices (into data_points) of
+        the points constrained to sample point ``block.start + j`` are ``indices[indptr[j]:indptr[j + 1]]``.
+
+        :param data_points: The (non-masked) data points, as a DataFrame
+        :param points: The sample points, as a DataFrame
+        :param bool distances: Also return the horizontal distance (in km) of each constrained point from its sample
+         point. These are the distances found by the k-D tree query if there is a horizontal separation.
+        :return: Iterator which iterates through (slice of sample points, indptr, indices) for each block, or (slice of
+         sample points, indptr, indices, distances) if distances are requested
+        """
+        sample_points_count = len(points)
+        data_points_count = len(data_points)
+
+        window_starts = None
+        all_distances = None
+        if self.haversine_distance_kd_tree_index and self.h_sep and distances:
+            all_indptr, all_indices, all_distances = \
+                self.haversine_distance_kd_tree_index.find_points_and_distances_within_distance_sample(points,
+                                                                                                       self.h_sep)
+        elif self.haversine_distance_kd_tree_index and self.h_sep:
+            neighbours = self.haversine_distance_kd_tree_index.find_points_within_distance_sample(points, self.h_sep)
+            all_indptr, all_indices = segmented.csr_from_lists(neighbours)
+        elif self._has_time_index():
+            # The candidates for each sample point are a contiguous window of the time sorted data points
+            window_starts, window_stops = self.time_sorted_index.find_windows(points.time.values, self.t_sep)
+            all_indptr = np.zeros(sample_points_count + 1, dtype=np.intp)
+            np.cumsum(window_stops - window_starts, out=all_indptr[1:])
+            all_indices = None
+        else:
+            # Every data point is a candidate for every sample point
+            all_indptr = np.arange(sample_points_count + 1) * data_points_count
+            all_indices = None
+
+        start = 0
+        while start < sample_points_count:
+            # Limit the number of candidate points in each block to bound the size of the temporary arrays
+            stop = np.searchsorted(all_indptr, all_indptr[start] + self.max_block_size, side='right') - 1
+            stop = int(np.clip(stop, start + 1, sample_points_count))
+
+            indptr = all_indptr[start:stop + 1] - all_indptr[start]
+            if window_starts is not None:
+                sample_ids = segmented.segment_ids(indptr)
+                positions = np.arange(indptr[-1]) - indptr[sample_ids] + window_starts[start:stop][sample_ids]
+                indices = self.time_sorted_index.sort_order[positions]
+                # Keep the points for each sample point in their original order
+                indices = indices[np.lexsort((indices, sample_ids))]
+            elif all_indices is None:
+                indices = np.tile(np.arange(data_points_count), stop - start)
+            else:
+                indices = all_indices[all_indptr[start]:all_indptr[stop]]
+
+            if all_distances is not None:
+                block_distances = all_distances[all_indptr[start]:all_indptr[stop]]
+            elif distances:
+                from cis.collocation.kdtree import haversine
+                block_distances = haversine(data_points[['latitude', 'longitude']].values[indices],
+                                            points[['latitude', 'longitude']].values[segmented.segment_ids(indptr) +
+                                                                                     start])
+
+            if self.mask_checks and indices.size > 0:
+                keep = self.separation_mask(data_points, points, indices, segmented.segment_ids(indptr) + start,
+                                            horizontal=False)
+                indptr = segmented.compress_segments(indptr, keep)
+                indices = indices[keep]
+                if distances:
+                    block_distances = block_distances[keep]
+
+            logging.info("    Processed {} points of {}".format(stop, sample_points_count))
+            if distances:
+                yield slice(start, stop), indptr, indices, block_distances
+            else:
+                yield slice(start, stop), indptr, indices
+            start = stop
+
 
 # noinspection PyPep8Naming
 class mean(AbstractDataOnlyKernel):
@@ -373,6 +762,9 @@ class mean(AbstractDataOnlyKernel):
         """
         return np_mean(values)
 
+    def get_value_for_segments(self, values, indptr):
+        return segmented.segment_mean(values, indptr)
+
 
 # noinspection PyPep8Naming
 class stddev(AbstractDataOnlyKernel):
@@ -386,6 +778,9 @@ class stddev(AbstractDataOnlyKernel):
         """
         return np_std(values, ddof=1)
 
+    def get_value_for_segments(self, values, indptr):
+        return segmented.segment_std(values, indptr, ddof=1)
+
 
 # noinspection PyPep8Naming,PyShadowingBuiltins
 class min(AbstractDataOnlyKernel):
@@ -399,6 +794,9 @@ class min(AbstractDataOnlyKernel):
         """
         return np_min(values)
 
+    def get_value_for_segments(self, values, indptr):
+        return segmented.segment_min(values, indptr)
+
 
 # noinspection PyPep8Naming,PyShadowingBuiltins
 class max(AbstractDataOnlyKernel):
@@ -412,6 +810,9 @@ class max(AbstractDataOnlyKernel):
         """
         return np_max(values)
 
+    def get_value_for_segments(self, values, indptr):
+        return segmented.segment_max(values, indptr)
+
 
 class sum(AbstractDataOnlyKernel):
     """
@@ -424,6 +825,53 @@ class sum(AbstractDataOnlyKernel):
         """
         return np_sum(values)
 
+    def get_value_for_segments(self, values, indptr):
+        return segmented.segment_sum(values, indptr)
+
+
+# noinspection PyPep8Naming
+class median(AbstractDataOnlyKernel):
+    """
+    Calculate the median of the values
+    """
+
+    def get_value_for_data_only(self, values):
+        """
+        Return the median of the values
+        """
+        return np.median(values)
+
+    def get_value_for_segments(self, values, indptr):
+        return segmented.segment_median(values, indptr)
+
+
+# noinspection PyPep8Naming
+class percentile(AbstractDataOnlyKernel):
+    """
+    Calculate a percentile of the values
+    """
+
+    def __init__(self, q=50):
+        """
+        :param q: The percentile to calculate, between 0 and 100
+        """
+        from cis.exceptions import InvalidCommandLineOptionError
+        try:
+            self.q = float(q)
+        except ValueError:
+            raise InvalidCommandLineOptionError('The percentile q must be a valid number')
+        if not 0 <= self.q <= 100:
+            raise InvalidCommandLineOptionError('The percentile q must be between 0 and 100')
+
+    def get_value_for_data_only(self, values):
+        """
+        Return the q-th percentile of the values
+        """
+        return np.percentile(values, self.q)
+
+    def get_value_for_segments(self, values, indptr):
+        return segmented.segment_percentile(values, indptr, self.q)
+
 
 # noinspection PyPep8Naming
 class moments(AbstractDataOnlyKernel):
@@ -461,24 +909,67 @@ class moments(AbstractDataOnlyKernel):
 
         return np_mean(values), np_std(values, ddof=1), np.size(values)
 
+    def get_value_for_segments(self, values, indptr):
+        return (segmented.segment_mean(values, indptr), segmented.segment_std(values, indptr, ddof=1),
+                segmented.segment_count(values, indptr))
 
-class nn_horizontal(Kernel):
-    def get_value(self, point, data):
+
+class idw(AbstractDistanceWeightedKernel):
+    """
+    Calculate the mean of the data points weighted by the inverse of their horizontal distance from the sample point
+    (raised to a power). If any data points are at the sample point the mean of those points is used instead.
+    """
+
+    def __init__(self, power=2):
         """
-            Collocation using nearest neighbours along the face of the earth where both points and
-              data are a list of HyperPoints. The default point is the first point.
+        :param power: The power of the inverse distance to weight by
         """
-        from cis.collocation.kdtree import haversine
-        iterator = data.iterrows()
+        from cis.exceptions import InvalidCommandLineOptionError
         try:
-            nearest_point = next(iterator)[1]
-        except StopIteration:
-            # No points to check
-            raise ValueError
-        for idx, data_point in iterator:
-            if (haversine(point, nearest_point) > haversine(point, data_point)):
-                nearest_point = data_point
-        return nearest_point.vals
+            self.power = float(power)
+        except ValueError:
+            raise InvalidCommandLineOptionError('The idw power must be a valid number')
+        if self.power <= 0:
+            raise InvalidCommandLineOptionError('The idw power must be positive')
+
+    def get_weights(self, distances, indptr):
+        at_sample_point = distances == 0
+        with np.errstate(divide='ignore'):
+            weights = 1.0 / distances ** self.power
+        # Segments with a point at the sample point only use those points
+        exact = segmented.segment_sum(at_sample_point, indptr) > 0
+        exact = np.repeat(exact, np.diff(indptr))
+        return np.where(exact, at_sample_point.astype(np.float64), weights)
+
+
+class gaussian(AbstractDistanceWeightedKernel):
+    """
+    Calculate the mean of the data points weighted by a Gaussian function of their horizontal distance from the
+    sample point.
+    """
+
+    def __init__(self, sigma='10km'):
+        """
+        :param str sigma: The standard deviation (width) of the Gaussian weighting, e.g. 10km
+        """
+        from cis.exceptions import InvalidCommandLineOptionError
+        self.sigma = cis.utils.parse_distance_with_units_to_float_km(sigma)
+        if self.sigma <= 0:
+            raise InvalidCommandLineOptionError('The gaussian sigma must be positive')
+
+    def get_weights(self, distances, indptr):
+        return np.exp(-0.5 * (distances / self.sigma) ** 2)
+
+
+class nn_horizontal(AbstractNearestNeighbourKernel):
+    """
+    Collocation using nearest neighbours along the face of the earth.
+    """
+    coord_names = ('latitude', 'longitude')
+
+    def get_distances(self, data_coords, sample_coords):
+        from cis.collocation.kdtree import haversine
+        return haversine(np.column_stack(np.broadcast_arrays(*sample_coords)), np.column_stack(data_coords))
 
 
 class nn_horizontal_only(Kernel):
@@ -489,70 +980,80 @@ class nn_horizontal_only(Kernel):
         pass
 
 
-class nn_altitude(Kernel):
-    def get_value(self, point, data):
+class nn_spacetime(Kernel):
+    """
+    Collocation using the nearest neighbour in space and time together. Horizontal distances, time differences and
+    (optionally) altitude differences are combined into a single distance using the given scales, which are the
+    separations in each dimension counted as equally far. For example with h_scale=100km and t_scale=PT1H a point 100 km
+    away at the same time is as near as a point in the same place one hour later.
+    """
+
+    def __init__(self, h_scale='100km', t_scale='PT1H', a_scale=None):
         """
-            Collocation using nearest neighbours in altitude, where both points and
-              data are a list of HyperPoints. The default point is the first point.
+        :param str h_scale: The horizontal distance equivalent to t_scale (and a_scale), e.g. 100km
+        :param str t_scale: The time difference equivalent to h_scale, e.g. PT1H. If this is None the nearest point
+         ignores time.
+        :param str a_scale: The altitude difference equivalent to h_scale, e.g. 1km. If this isn't given the nearest
+         point ignores altitude.
         """
-        iterator = data.iterrows()
-        try:
-            nearest_point = next(iterator)[1]
-        except StopIteration:
-            # No points to check
-            raise ValueError
-        for idx, data_point in iterator:
-            if abs(point.altitude - nearest_point.altitude) > abs(point.altitude - data_point.altitude):
-                nearest_point = data_point
-        return nearest_point.vals
-
+        from cis.exceptions import InvalidCommandLineOptionError
+        from cis.parse_datetime import parse_datetimestr_delta_to_float_days
 
-class nn_pressure(Kernel):
+        h_scale = cis.utils.parse_distance_with_units_to_float_km(h_scale)
+        if t_scale is not None:
+            try:
+                t_scale = parse_datetimestr_delta_to_float_days(t_scale)
+            except ValueError as e:
+                raise InvalidCommandLineOptionError(e)
+        a_scale = cis.utils.parse_distance_with_units_to_float_m(a_scale) if a_scale is not None else None
+        if h_scale <= 0 or any(scale is not None and scale <= 0 for scale in (t_scale, a_scale)):
+            raise InvalidCommandLineOptionError('The scales of the nn_spacetime kernel must be positive')
 
+        self.space_time_kd_tree_index = data_index.SpaceTimeKDTreeIndex(h_scale, t_scale, a_scale)
 
     def get_value(self, point, data):
         """
-            Collocation using nearest neighbours in pressure, where both points and
-              data are a list of HyperPoints. The default point is the first point.
+        Find the value of the data point nearest to the sample point in the scaled space-time.
         """
+        if len(data) == 0:
+            raise ValueError("No data points to find the nearest of")
+        index = self.space_time_kd_tree_index
+        index.check_coordinates(point)
+        index.check_coordinates(data)
+        distances = np.linalg.norm(index.scale_points(data) - index.scale_points(point), axis=1)
+        return data.vals.values[np.argmin(distances)]
 
-        def pres_sep(point1, point2):
-            """
-                Computes the pressure ratio between two points, this is always >= 1.
-            """
-            if point1.air_pressure > point2.air_pressure:
-                return point1.air_pressure / point2.air_pressure
-            else:
-                return point2.air_pressure / point1.air_pressure
 
-        iterator = data.iterrows()
-        try:
-            nearest_point = next(iterator)[1]
-        except StopIteration:
-            # No points to check
-            raise ValueError
-        for idx, data_point in iterator:
-            if pres_sep(point, nearest_point) > pres_sep(point, data_point):
-                nearest_point = data_point
-        return nearest_point.vals
+class nn_altitude(AbstractNearestNeighbourKernel):
+    """
+    Collocation using nearest neighbours in altitude.
+    """
+    coord_names = ('altitude',)
 
+    def get_distances(self, data_coords, sample_coords):
+        return np.abs(sample_coords[0] - data_coords[0])
 
-class nn_time(Kernel):
-    def get_value(self, point, data):
-        """
-            Collocation using nearest neighbours in time, where both points and
-              data are a list of HyperPoints. The default point is the first point.
-        """
-        iterator = data.iterrows()
-        try:
-            nearest_point = next(iterator)[1]
-        except StopIteration:
-            # No points to check
-            raise ValueError
-        for idx, data_point in iterator:
-            if abs(point.time - nearest_point.time) > abs(point.time - data_point.time):
-                nearest_point = data_point
-        return nearest_point.vals
+
+class nn_pressure(AbstractNearestNeighbourKernel):
+    """
+    Collocation using nearest neighbours in pressure, measured as the ratio of the two pressures (which is always >= 1).
+    """
+    coord_names = ('air_pressure',)
+
+    def get_distances(self, data_coords, sample_coords):
+        data_pressures, sample_pressures = data_coords[0], sample_coords[0]
+        return np.where(sample_pressures > data_pressures,
+                        sample_pressures / data_pressures, data_pressures / sample_pressures)
+
+
+class nn_time(AbstractNearestNeighbourKernel):
+    """
+    Collocation using nearest neighbours in time.
+    """
+    coord_names = ('time',)
+
+    def get_distances(self, data_coords, sample_coords):
+        return np.abs(sample_coords[0] - data_coords[0])
 
 
 # These classes act as abbreviations for kernel classes above:
@@ -580,6 +1081,12 @@ class nn_t(nn_time):
     pass
 
 
+class nn_st(nn_spacetime):
+    """Nearest neighbour space-time kernel - alias for nn_spacetime.
+    """
+    pass
+
+
 class GriddedCollocator(Collocator):
 
     def __init__(self, fill_value=None, var_name='', var_long_name='', var_units='',
@@ -587,15 +1094,18 @@ class GriddedCollocator(Collocator):
         super(GriddedCollocator, self).__init__(fill_value, var_name, var_long_name, var_units,
                                                          missing_data_for_missing_sample)
         self.extrapolate = 'extrapolate' if extrapolate else 'mask'
+        # Regridders by a hash of the source and sample grids, so the weights are only calculated once for each
+        self._regridders = {}
 
     @staticmethod
     def _check_for_valid_kernel(kernel):
         from cis.exceptions import ClassNotFoundError
 
-        if not (isinstance(kernel, gridded_gridded_nn) or isinstance(kernel, gridded_gridded_li)):
+        if not isinstance(kernel, (gridded_gridded_nn, gridded_gridded_li, gridded_gridded_conservative)):
             raise ClassNotFoundError("Expected kernel of one of classes {}; found one of class {}".format(
                 str([cis.utils.get_class_name(gridded_gridded_nn),
-                     cis.utils.get_class_name(gridded_gridded_li)]),
+                     cis.utils.get_class_name(gridded_gridded_li),
+                     cis.utils.get_class_name(gridded_gridded_conservative)]),
                 cis.utils.get_class_name(type(kernel))))
 
     def collocate(self, points, data, constraint, kernel):
@@ -605,7 +1115,8 @@ class GriddedCollocator(Collocator):
         :param points: An Iris cube with the sampling grid to collocate onto.
         :param data: The Iris cube with the data to be collocated.
         :param constraint: None allowed yet, as this is unlikely to be required for gridded-gridded.
-        :param kernel: The kernel to use, current options are gridded_gridded_nn and gridded_gridded_li.
+        :param kernel: The kernel to use, current options are gridded_gridded_nn, gridded_gridded_li and
+         gridded_gridded_conservative.
         :return: An Iris cube with the collocated data.
         """
         self._check_for_valid_kernel(kernel)
@@ -613,6 +1124,9 @@ class GriddedCollocator(Collocator):
         # Force the data longitude range to be the same as that of the sample grid.
         _fix_longitude_range(points.coords(), data)
 
+        if isinstance(kernel, gridded_gridded_conservative):
+            return self._regrid_conservatively(points, data)
+
         # Initialise variables used to create an output mask based on the sample data mask.
         sample_coord_lookup = {}  # Maps coordinate in sample data -> location in dimension order
         for idx, coord in enumerate(points.coords()):
@@ -681,15 +1195,72 @@ class GriddedCollocator(Collocator):
         # Use the new_data array to recreate points, without the DimCoords not in the data cube
         points = iris.cube.Cube(new_points_array, dim_coords_and_dims=new_dim_coord_list)
 
-        output_cube = self._iris_interpolate(coord_names_and_sizes_for_output_grid,
-                                             coord_names_and_sizes_for_sample_grid, data,
-                                             kernel, output_mask, points, self.extrapolate)
+        if self._can_regrid(data, points.dim_coords):
+            output_cube = self._regrid(data, kernel, output_mask, points)
+        else:
+            output_cube = self._iris_interpolate(coord_names_and_sizes_for_output_grid,
+                                                 coord_names_and_sizes_for_sample_grid, data,
+                                                 kernel, output_mask, points, self.extrapolate)
 
         if not isinstance(output_cube, list):
             return GriddedDataList([output_cube])
         else:
             return output_cube
 
+    def collocate_to_file(self, points, data, constraint, kernel, output_file, chunk_size=100, history=None):
+        """
+        Collocate the data a block of time steps at a time, writing the results for each block to a NetCDF file as it
+        is completed. The interpolation weights are calculated once and reused for every block, and the memory needed
+        is bounded by the block size rather than the length of the time dimension. The output file is the same as would
+        be created by saving the output of :meth:`collocate`.
+
+        :param GriddedData points: The sample grid, which mustn't include time unless regridding conservatively
+        :param GriddedData or GriddedDataList data: The source data to collocate from
+        :param constraint: None allowed yet, as this is unlikely to be required for gridded-gridded.
+        :param kernel: The kernel to use, current options are gridded_gridded_nn, gridded_gridded_li and
+         gridded_gridded_conservative.
+        :param str output_file: The NetCDF file to write
+        :param int chunk_size: The number of time steps to collocate at a time
+        :param str history: History to add to each output variable
+        """
+        import os
+        import tempfile
+        from cis.data_io.write_netcdf import append_along_unlimited_dimension
+
+        chunk_size = _parse_chunk_size(chunk_size)
+        variables = data if isinstance(data, list) else [data]
+        if not isinstance(kernel, gridded_gridded_conservative) and points.coords('time', dim_coords=True):
+            raise ValueError("Gridded data can only be collocated in blocks of time steps when time isn't one of the "
+                             "sample coordinates")
+        if not all(var.coords('time', dim_coords=True) for var in variables):
+            raise ValueError("Gridded data can only be collocated in blocks if it has a time dimension")
+        time_dims = [var.coord_dims('time')[0] for var in variables]
+        time_length = variables[0].shape[time_dims[0]]
+        if any(var.shape[dim] != time_length for var, dim in zip(variables, time_dims)):
+            raise ValueError("Gridded data can only be collocated in blocks if each variable has the same times")
+
+        handle, block_file = tempfile.mkstemp(suffix='.nc')
+        os.close(handle)
+        try:
+            for start in range(0, time_length, chunk_size):
+                logging.info("--> Collocating from time step {} of {}".format(start, time_length))
+                block = GriddedDataList()
+                for var, dim in zip(variables, time_dims):
+                    slices = [slice(None)] * var.ndim
+                    slices[dim] = slice(start, start + chunk_size)
+                    block.append(var[tuple(slices)])
+                output = self.collocate(points, block, constraint, kernel)
+                for output_var in output:
+                    if history is not None:
+                        output_var.add_history(history)
+                # The first block creates the file, later blocks are appended along the (unlimited) time dimension
+                output.save_data(output_file if start == 0 else block_file)
+                if start > 0:
+                    append_along_unlimited_dimension(block_file, output_file, start)
+                log_memory_profile("GriddedCollocator after block")
+        finally:
+            os.remove(block_file)
+
     @staticmethod
     def _make_output_mask(coord_names_and_sizes_for_sample_grid, output_shape, points, repeat_size):
         """ Creates a mask to apply to the output data based on the sample data mask. If there are coordinates in
@@ -714,6 +1285,69 @@ class GriddedCollocator(Collocator):
                 output_mask = np.reshape(np.repeat(points.data.mask, repeat_size), output_shape)
         return output_mask
 
+    @staticmethod
+    def _can_regrid(data, sample_coords):
+        from cis.collocation.gridded_interpolation import GriddedRegridder
+        variables = data if isinstance(data, list) else [data]
+        return all(GriddedRegridder.can_regrid(var, sample_coords) for var in variables)
+
+    def _get_regridder(self, data, sample_coords, method):
+        """ Get the regridder from the grid of the data onto the sample grid, creating it if there isn't one already
+        """
+        from cis.collocation.gridded_interpolation import GriddedRegridder, ConservativeRegridder
+        from cis.collocation.index_cache import hash_arrays
+        # Only the regridded coordinates are part of the key, so data which differs only in its other dimensions (such
+        #  as consecutive blocks of time steps) shares the regridder
+        source_coords = [data.coord(dim_coords=True, name_or_coord=c.name()) for c in sample_coords]
+        coords = source_coords + list(sample_coords)
+        key = hash_arrays(*[c.points for c in coords] + [c.bounds for c in coords if c.has_bounds()], method=method,
+                          ndim=data.ndim, dims=[data.coord_dims(c) for c in source_coords],
+                          names=[c.name() for c in source_coords],
+                          circular=[getattr(c, 'circular', False) for c in source_coords])
+        if key not in self._regridders:
+            if method == 'conservative':
+                self._regridders[key] = ConservativeRegridder(data, sample_coords)
+            else:
+                self._regridders[key] = GriddedRegridder(data, sample_coords, method)
+        return self._regridders[key]
+
+    def _regrid_conservatively(self, points, data):
+        """ Collocates using a ConservativeRegridder over the latitude and longitude of the sample grid. Any other
+        dimensions of the data are carried through unchanged.
+        """
+        from cis.collocation.gridded_interpolation import ConservativeRegridder
+        sample_coords = [coord for coord in points.dim_coords if coord.name() in ('latitude', 'longitude')]
+        variables = data if isinstance(data, list) else [data]
+        if not all(ConservativeRegridder.can_regrid(var, sample_coords) for var in variables):
+            raise ValueError("Conservative regridding requires both the sample and the data to be defined on a "
+                             "latitude-longitude grid")
+
+        output_mask = np.ma.nomask
+        if self.missing_data_for_missing_sample and points.ndim == len(sample_coords):
+            output_mask = np.ma.getmask(points.data)
+
+        output = GriddedDataList()
+        for var in variables:
+            output_cube = self._get_regridder(var, sample_coords, 'conservative')(var)
+            if output_mask is not np.ma.nomask:
+                mask = np.reshape(output_mask, output_mask.shape + (1,) * (output_cube.ndim - output_mask.ndim))
+                output_cube.data = cis.utils.apply_mask_to_numpy_array(output_cube.data,
+                                                                        np.broadcast_to(mask, output_cube.shape))
+            output.append(output_cube)
+        return output
+
+    def _regrid(self, data, kernel, output_mask, points):
+        """ Collocates using a GriddedRegridder, which reuses the interpolation weights for data on the same grid
+        """
+        method = 'nn' if isinstance(kernel, gridded_gridded_nn) else 'lin'
+        output = GriddedDataList()
+        for var in (data if isinstance(data, list) else [data]):
+            regridder = self._get_regridder(var, points.dim_coords, method)
+            output_cube = regridder(var, extrapolate=self.extrapolate == 'extrapolate')
+            output_cube.data = cis.utils.apply_mask_to_numpy_array(output_cube.data, output_mask)
+            output.append(output_cube)
+        return output
+
     @staticmethod
     def _iris_interpolate(coord_names_and_sizes_for_output_grid, coord_names_and_sizes_for_sample_grid, data, kernel,
                           output_mask, points, extrapolate):
@@ -771,6 +1405,17 @@ class gridded_gridded_li(Kernel):
         raise ValueError("gridded_gridded_li kernel selected for use with collocator other than GriddedCollocator")
 
 
+class gridded_gridded_conservative(Kernel):
+    def __init__(self):
+        self.name = 'conservative'
+
+    def get_value(self, point, data):
+        """Not needed for gridded/gridded collocation.
+        """
+        raise ValueError("gridded_gridded_conservative kernel selected for use with collocator other than "
+                         "GriddedCollocator")
+
+
 class GeneralGriddedCollocator(Collocator):
     """Performs collocation of data on to the points of a cube (ie onto a gridded dataset).
     """
@@ -786,6 +1431,8 @@ class GeneralGriddedCollocator(Collocator):
         """
         log_memory_profile("GeneralGriddedCollocator Initial")
         if isinstance(data, list):
+            if self._can_share_index(data, constraint, kernel):
+                return self._collocate_with_shared_index(points, data, constraint, kernel)
             # If data is a list then call this method recursively over each element
             output_list = []
             for variable in data:
@@ -797,30 +1444,7 @@ class GeneralGriddedCollocator(Collocator):
 
         log_memory_profile("GeneralGriddedCollocator Created data hyperpoint list view")
 
-        # Work out how to iterate over the cube and map HyperPoint coordinates to cube coordinates.
-        coord_map = make_coord_map(points, data)
-        if self.missing_data_for_missing_sample and len(coord_map) is not len(points.coords()):
-            raise cis.exceptions.UserPrintableException(
-                "A sample variable has been specified but not all coordinates in the data appear in the sample so "
-                "there are multiple points in the sample data so whether the data is missing or not can not be "
-                "determined")
-
-        coords = points.coords()
-        shape = []
-        output_coords = []
-
-        # Find shape of coordinates to be iterated over.
-        for (hpi, ci, shi) in coord_map:
-            coord = coords[ci]
-            if coord.ndim > 1:
-                raise NotImplementedError("Co-location of data onto a cube with a coordinate of dimension greater"
-                                          " than one is not supported (coordinate %s)", coord.name())
-            # Ensure that bounds exist.
-            if not coord.has_bounds():
-                logging.warning("Creating guessed bounds as none exist in file")
-                coord.guess_bounds()
-            shape.append(coord.shape[0])
-            output_coords.append(coord)
+        coord_map, coords, shape, output_coords = self._get_output_coords(points, data)
 
         _fix_longitude_range(coords, data_points)
 
@@ -832,13 +1456,7 @@ class GeneralGriddedCollocator(Collocator):
 
         log_memory_profile("GeneralGriddedCollocator Created indexes")
 
-        # Initialise output array as initially all masked, and set the appropriate fill value.
-        values = []
-        for i in range(kernel.return_size):
-            val = np.ma.zeros(shape)
-            val.mask = True
-            val.fill_value = self.fill_value
-            values.append(val)
+        values = self._make_output_values(shape, kernel)
 
         if kernel.return_size == 1:
             set_value_kernel = self._set_single_value_kernel
@@ -847,7 +1465,11 @@ class GeneralGriddedCollocator(Collocator):
 
         logging.info("--> Co-locating...")
 
-        if hasattr(kernel, "get_value_for_data_only") and hasattr(constraint, "get_iterator_for_data_only"):
+        if isinstance(kernel, AbstractDataOnlyKernel) and hasattr(constraint, "get_segments_for_data_only"):
+            # Apply the kernel to all of the populated cells at once
+            self._set_segment_values(values, kernel, *constraint.get_segments_for_data_only(
+                self.missing_data_for_missing_sample, coord_map, data_points, points))
+        elif hasattr(kernel, "get_value_for_data_only") and hasattr(constraint, "get_iterator_for_data_only"):
             # Iterate over constrained cells
             iterator = constraint.get_iterator_for_data_only(
                 self.missing_data_for_missing_sample, coord_map, coords, data_points, shape, points, values)
@@ -874,7 +1496,116 @@ class GeneralGriddedCollocator(Collocator):
 
         log_memory_profile("GeneralGriddedCollocator Completed collocation")
 
-        # Construct an output cube containing the collocated data.
+        output = self._make_output_cubes(data, values, kernel, output_coords, coord_map)
+
+        log_memory_profile("GeneralGriddedCollocator Finished")
+
+        return output
+
+    @staticmethod
+    def _can_share_index(data, constraint, kernel):
+        """
+        Can the data points be binned once for all of the variables in a list? This requires that the kernel can be
+        applied to all of the cells at once, and that the variables all have the same coordinates.
+        """
+        return len(data) > 1 and isinstance(kernel, AbstractDataOnlyKernel) and \
+            hasattr(constraint, "get_segments_for_data_only") and _have_same_coordinates(data)
+
+    def _collocate_with_shared_index(self, points, variables, constraint, kernel):
+        """
+        Collocate variables which share the same coordinates. The points are binned (and sorted) once, using only
+        their coordinates, and the kernel is then applied to the values of each variable in turn. Masked values are
+        removed from the cells of each variable separately.
+
+        :param points: cube defining the sample points
+        :param list variables: The UngriddedData objects to collocate
+        :param constraint: A constraint with a get_segments_for_data_only method
+        :param kernel: An AbstractDataOnlyKernel
+        :return: GriddedDataList of collocated data
+        """
+        coordinate_points = variables[0].get_coordinates_points()
+        coord_map, coords, shape, output_coords = self._get_output_coords(points, variables[0])
+
+        _fix_longitude_range(coords, coordinate_points)
+        data_index.create_indexes(constraint, coords, coordinate_points, coord_map)
+
+        log_memory_profile("GeneralGriddedCollocator Created shared index")
+
+        output = GriddedDataList([])
+        for variable in variables:
+            logging.info("--> Co-locating {}...".format(variable.var_name))
+            values = self._make_output_values(shape, kernel)
+            self._set_segment_values(values, kernel, *constraint.get_segments_for_data_only(
+                self.missing_data_for_missing_sample, coord_map, variable.get_all_points(), points))
+            output.extend(self._make_output_cubes(variable, values, kernel, output_coords, coord_map))
+
+        log_memory_profile("GeneralGriddedCollocator Finished")
+
+        return output
+
+    def _get_output_coords(self, points, data):
+        """
+        Work out how to iterate over the cube and map HyperPoint coordinates to cube coordinates.
+
+        :param points: cube defining the sample points
+        :param data: The data to be collocated
+        :return: Tuple of the coordinate map (see :func:`make_coord_map`), the coordinates of the sample points, the
+         shape of the output and the coordinates of the output
+        """
+        coord_map = make_coord_map(points, data)
+        if self.missing_data_for_missing_sample and len(coord_map) is not len(points.coords()):
+            raise cis.exceptions.UserPrintableException(
+                "A sample variable has been specified but not all coordinates in the data appear in the sample so "
+                "there are multiple points in the sample data so whether the data is missing or not can not be "
+                "determined")
+
+        coords = points.coords()
+        shape = []
+        output_coords = []
+
+        # Find shape of coordinates to be iterated over.
+        for (hpi, ci, shi) in coord_map:
+            coord = coords[ci]
+            if coord.ndim > 1:
+                raise NotImplementedError("Co-location of data onto a cube with a coordinate of dimension greater"
+                                          " than one is not supported (coordinate %s)", coord.name())
+            # Ensure that bounds exist.
+            if not coord.has_bounds():
+                logging.warning("Creating guessed bounds as none exist in file")
+                coord.guess_bounds()
+            shape.append(coord.shape[0])
+            output_coords.append(coord)
+        return coord_map, coords, shape, output_coords
+
+    def _make_output_values(self, shape, kernel):
+        """
+        Initialise output arrays for each kernel output as initially all masked, and set the appropriate fill value.
+        """
+        values = []
+        for i in range(kernel.return_size):
+            val = np.ma.zeros(shape)
+            val.mask = True
+            val.fill_value = self.fill_value
+            values.append(val)
+        return values
+
+    @staticmethod
+    def _set_segment_values(values, kernel, out_indices, data_values, indptr):
+        """
+        Apply a data only kernel to the values in every populated cell at once, see
+        :meth:`BinnedCubeCellOnlyConstraint.get_segments_for_data_only`.
+        """
+        kernel_vals = kernel.get_value_for_segments(data_values, indptr)
+        if kernel.return_size == 1:
+            kernel_vals = (kernel_vals,)
+        # Cells for which the kernel couldn't calculate a value are NaN, and so masked below
+        for val, kernel_val in zip(values, kernel_vals):
+            val[tuple(out_indices)] = kernel_val
+
+    def _make_output_cubes(self, data, values, kernel, output_coords, coord_map):
+        """
+        Construct output cubes containing the collocated data.
+        """
         kernel_var_details = kernel.get_variable_details(self.var_name or data.var_name,
                                                          self.var_long_name or data.long_name,
                                                          data.standard_name,
@@ -900,9 +1631,6 @@ class GeneralGriddedCollocator(Collocator):
             transpose_order = [coord[2] for coord in coord_map]
             cube.transpose(transpose_order)
             output.append(cube)
-
-        log_memory_profile("GeneralGriddedCollocator Finished")
-
         return output
 
     def _set_multi_value_kernel(self, kernel_val, values, indices):
@@ -1017,6 +1745,42 @@ class BinnedCubeCellOnlyConstraint(Constraint):
 
                 yield out_indices, hp, con_points
 
+    def get_segments_for_data_only(self, missing_data_for_missing_sample, coord_map, data_points, points):
+        """
+        Find the data values in every populated cell at once, as segments of one array of values. This gives the same
+        cells and values as :meth:`get_iterator_for_data_only` without iterating over the cells.
+
+        :param missing_data_for_missing_sample: If true anywhere there is missing data on the sample then final point is
+         missing; otherwise just use the sample
+        :param coord_map: The map from the output coordinates to the sample coordinates
+        :param data_points: The (non-masked) data points
+        :param points: The original points object, these are the points to collocate
+        :return: Tuple of (out_indices, values, indptr). out_indices is an integer array of shape (number of output
+         dimensions, number of cells) of the position of each cell in the output, and the values in cell ``i`` are
+         ``values[indptr[i]:indptr[i + 1]]``.
+        """
+        index = self.grid_cell_bin_index_slices
+        out_indices, indptr = index.get_segments()
+        sorted_points = index.sort_order[indptr[0]:indptr[-1]]
+        values = np.ma.getdata(data_points.data)[sorted_points]
+        indptr = indptr - indptr[0]
+        keep_cells = np.ones(out_indices.shape[1], dtype=bool)
+        if missing_data_for_missing_sample and out_indices.shape[1] > 0:
+            # Remap the indices to match the data coordinate order, using the coord_map provided
+            remapped_indices = out_indices[[c[2] for c in sorted(coord_map, key=lambda x: x[1])]]
+            keep_cells = ~np.ma.getmaskarray(points.data)[tuple(remapped_indices)]
+        # Masked values are only binned if the index was created from the coordinates alone (so that it can be shared
+        # between variables)
+        keep_values = ~np.ma.getmaskarray(data_points.data)[sorted_points] & np.repeat(keep_cells, np.diff(indptr))
+        if not np.all(keep_values):
+            # Remove the values to skip, then any (now empty) cells
+            kept_indptr = segmented.compress_segments(indptr, keep_values)
+            keep_cells &= np.diff(kept_indptr) > 0
+            values = values[keep_values]
+            indptr = np.append(kept_indptr[:-1][keep_cells], kept_indptr[-1])
+            out_indices = out_indices[:, keep_cells]
+        return out_indices, values, indptr
+
     def get_iterator_for_data_only(self, missing_data_for_missing_sample, coord_map, coords, data_points, shape, points,
                                    values):
         """
@@ -1110,6 +1874,70 @@ def _find_longitude_range(coords):
     return low
 
 
+def _flat_values(data):
+    """
+    Flatten a (possibly masked) array without copying it unless it is masked, in which case the masked values are set
+    to NaN (as they would be in a DataFrame created from the data).
+    """
+    from cis.data_io.ungridded_data import _to_flat_ndarray
+    try:
+        return _to_flat_ndarray(data, copy=False)
+    except ValueError:
+        return _to_flat_ndarray(data, copy=True)
+
+
+def _have_same_coordinates(data):
+    """
+    Do all of the variables in a list have the same coordinates?
+    :param list data: The variables
+    :return bool:
+    """
+    first_coords = data[0].coords()
+    for var in data[1:]:
+        coords = var.coords()
+        if len(coords) != len(first_coords):
+            return False
+        for first_coord, coord in zip(first_coords, coords):
+            if coord is not first_coord and (coord.standard_name != first_coord.standard_name or
+                                             not np.array_equal(coord.points, first_coord.points)):
+                return False
+    return True
+
+
+def _are_on_same_grid(data):
+    """
+    Are all of the gridded variables in a list defined on the same grid, so that they can be interpolated together?
+    :param list data: The variables
+    :return bool:
+    """
+    first = data[0]
+    if any(var.shape != first.shape for var in data[1:]) or not _have_same_coordinates(data):
+        return False
+    for var in data[1:]:
+        for first_coord, coord in zip(first.coords(), var.coords()):
+            if var.coord_dims(coord) != first.coord_dims(first_coord):
+                return False
+    return True
+
+
+def _parse_chunk_size(chunk_size):
+    """
+    Check the chunk size given for a collocation which writes its output as it goes
+
+    :param chunk_size: The chunk size, as given by the user
+    :return int: The chunk size
+    :raises InvalidCommandLineOptionError: If the chunk size isn't a positive integer
+    """
+    from cis.exceptions import InvalidCommandLineOptionError
+    try:
+        chunk_size = int(chunk_size)
+    except ValueError:
+        raise InvalidCommandLineOptionError('Collocator chunk_size must be a valid integer')
+    if chunk_size < 1:
+        raise InvalidCommandLineOptionError('Collocator chunk_size must be at least 1')
+    return chunk_size
+
+
 def _fix_longitude_range(coords, data_points):
     """Sets the longitude range of the data points to match that of the sample coordinates.
     :param coords: coordinates for grid on which to collocate
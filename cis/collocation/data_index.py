@@ -121,6 +121,21 @@ class GridCellBinIndexInSlices(object):
         self._indices = indices[:, self.sort_order]
         self.hp_coords = [hp_coord[self.sort_order] for hp_coord in hp_coords]
 
+    def get_segments(self):
+        """
+        Get all of the cells which contain points at once. This gives the same cells as :meth:`get_iterator` without
+        iterating over them.
+
+        :return: Tuple of (out_indices, indptr). out_indices is an integer array of shape (number of grid dimensions,
+         number of cells) giving the position of each cell in the grid. The sorted points in cell ``i`` are
+         ``sort_order[indptr[i]:indptr[i + 1]]``.
+        """
+        # The points outside the grid (with a cell number of -1) are sorted before all of the others
+        first_in_grid = np.searchsorted(self.cell_numbers, 0)
+        starts = first_in_grid + np.flatnonzero(np.diff(self.cell_numbers[first_in_grid:], prepend=-1))
+        indptr = np.append(starts, len(self.cell_numbers))
+        return self._indices[:, starts], indptr
+
     def get_iterator(self):
         """
         Get an iterator through all the points which will contribute to a cell.
@@ -249,11 +264,152 @@ class GridCellBinIndex(object):
         return self.index[tuple(indices)]
 
 
+class TimeSortedIndex(object):
+    """
+    Index of data points sorted by time, used to find the points within a time window of each sample point with a
+    binary search rather than by comparing every data point.
+    """
+    def __init__(self):
+        # The order which sorts the data points by time
+        self.sort_order = None
+
+        # The sorted times
+        self.sorted_times = None
+
+    def index_data(self, points, data, coord_map):
+        """
+        Sorts the data points by time.
+
+        :param points: (not used) sample points
+        :param data: DataFrame of the data points to index
+        :param coord_map: (not used)
+        """
+        try:
+            times = data.time.values
+        except AttributeError:
+            return  # Unable to create index
+        self.sort_order = np.argsort(times, kind='mergesort')
+        self.sorted_times = times[self.sort_order]
+
+    def find_windows(self, times, window):
+        """
+        Finds the data points within a time window of each of the given times. The times are searched for in sorted
+        order, so that each search starts from where the previous one finished.
+
+        :param times: numpy array of the times of the (sample) points
+        :param window: The half-width of the window, in the same units as the times
+        :return: Tuple of (start, stop) arrays, the points within the window of ``times[i]`` are
+         ``sort_order[start[i]:stop[i]]``. This includes the points exactly ``window`` away.
+        """
+        times = np.asarray(times)
+        time_order = np.argsort(times, kind='mergesort')
+        start = np.empty(len(times), dtype=np.intp)
+        stop = np.empty(len(times), dtype=np.intp)
+        start[time_order] = np.searchsorted(self.sorted_times, times[time_order] - window, side='left')
+        stop[time_order] = np.searchsorted(self.sorted_times, times[time_order] + window, side='right')
+        return start, stop
+
+    def find_points_within_window(self, time, window):
+        """
+        Finds the data points within a time window of a single time.
+
+        :param time: The time of the (sample) point
+        :param window: The half-width of the window, in the same units as the time
+        :return: numpy array of the indices of the data points, in their original order
+        """
+        start, stop = self.find_windows([time], window)
+        return np.sort(self.sort_order[start[0]:stop[0]])
+
+
+class SpaceTimeKDTreeIndex(object):
+    """
+    k-D tree index of points in a combined, scaled, space-time so that the point nearest in both space and time can be
+    found for many points at once. Each point is placed on a sphere with a radius of the Earth's radius in units of the
+    horizontal scale, and its time (and optionally altitude) is added as a further dimension in units of the time (and
+    altitude) scale.
+    """
+    def __init__(self, h_scale=100.0, t_scale=1.0 / 24, a_scale=None):
+        """
+        :param float h_scale: The horizontal distance (in km) equivalent to t_scale (and a_scale)
+        :param float t_scale: The time difference (in days) equivalent to h_scale, or None to ignore time
+        :param float a_scale: The altitude difference (in m) equivalent to h_scale, or None to ignore altitude
+        """
+        self.h_scale = h_scale
+        self.t_scale = t_scale
+        self.a_scale = a_scale
+
+        # The k-D tree (a scipy cKDTree) of the scaled data points
+        self.index = None
+
+        # Subtracted from the times before scaling them, to keep the scaled times small
+        self.time_offset = 0.0
+
+    def check_coordinates(self, points):
+        """
+        Check that the points have all of the coordinates used by the index.
+
+        :param points: DataFrame (or Series for a single point) of the points
+        :raises CoordinateNotFoundError: If the points don't have time (or altitude) but it is used
+        """
+        from cis.exceptions import CoordinateNotFoundError
+        for name, scale in [('latitude', self.h_scale), ('longitude', self.h_scale), ('time', self.t_scale),
+                            ('altitude', self.a_scale)]:
+            if scale is not None and name not in points:
+                raise CoordinateNotFoundError("The nearest point in space and time can't be found without {}, check "
+                                              "the dimensions of the data and sample points".format(name))
+
+    def scale_points(self, points):
+        """
+        Find the positions of some points in the scaled space-time.
+
+        :param points: DataFrame (or Series for a single point) with latitude and longitude, and time and altitude if
+         they are used
+        :return: numpy array of shape (number of points, number of dimensions)
+        """
+        from cis.collocation.kdtree import lat_lon_to_unit_vectors, RADIUS_EARTH
+        lat_lon = np.column_stack([np.atleast_1d(points.latitude), np.atleast_1d(points.longitude)])
+        dimensions = [lat_lon_to_unit_vectors(lat_lon) * (RADIUS_EARTH / self.h_scale)]
+        if self.t_scale is not None:
+            dimensions.append((np.atleast_1d(points.time) - self.time_offset) / self.t_scale)
+        if self.a_scale is not None:
+            dimensions.append(np.atleast_1d(points.altitude) / self.a_scale)
+        return np.column_stack(dimensions)
+
+    def index_data(self, points, data, coord_map):
+        """
+        Creates the k-D tree of the scaled data points.
+
+        :param points: (not used) sample points
+        :param data: DataFrame of the data points to index
+        :param coord_map: (not used)
+        :raises CoordinateNotFoundError: If the data points don't have time (or altitude) but it is used
+        """
+        from scipy.spatial import cKDTree
+        self.check_coordinates(data)
+        if self.t_scale is not None and len(data) > 0:
+            self.time_offset = np.min(data.time.values)
+        self.index = cKDTree(self.scale_points(data))
+
+    def find_nearest_points(self, points):
+        """
+        Finds the nearest indexed point to each of the given points.
+
+        :param points: DataFrame of the (sample) points
+        :return: Tuple of (distances, indices) arrays. The distances are in units of the scales. If there are no indexed
+         points the index is the number of indexed points (and the distance infinite).
+        :raises CoordinateNotFoundError: If the points don't have time (or altitude) but it is used
+        """
+        self.check_coordinates(points)
+        return self.index.query(self.scale_points(points))
+
+
 # Map of names of attributes of a constraint or kernel to the class used to
 # create an index to which the attribute should be set
 _index_attributes = {'grid_cell_bin_index': GridCellBinIndex,
                      'grid_cell_bin_index_slices': GridCellBinIndexInSlices,
-                     'haversine_distance_kd_tree_index': HaversineDistanceKDTreeIndex}
+                     'haversine_distance_kd_tree_index': HaversineDistanceKDTreeIndex,
+                     'time_sorted_index': TimeSortedIndex,
+                     'space_time_kd_tree_index': SpaceTimeKDTreeIndex}
 
 
 def create_indexes(operator, coords, data, coord_map):
@@ -266,7 +422,10 @@ def create_indexes(operator, coords, data, coord_map):
     """
     for attr, cls in _index_attributes.items():
         if hasattr(operator, attr):
-            index = cls()
+            # Reuse an existing (e.g. configured by the operator) index, otherwise create one
+            index = getattr(operator, attr)
+            if not isinstance(index, cls):
+                index = cls()
             logging.info("--> Creating index for %s", operator.__class__.__name__)
             index.index_data(coords, data, coord_map)
             setattr(operator, attr, index)
@@ -16,8 +16,8 @@
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 
-# There is no algorithmic change, just a restructuring to allow caching of the weights for calculating many
-#  interpolations of different datasets using the same points, and support for hybrid coordinates.
+# There is no algorithmic change, just a restructuring to allow caching of the weights (as a sparse matrix) for
+#  calculating many interpolations of different datasets using the same points, and support for hybrid coordinates.
 # The two helper functions extend_circular_coord and _data are also taken from SciPy as the interpolate module is
 #  deprecated since Iris 1.10.
 import numpy as np
@@ -51,14 +51,19 @@ class GriddedUngriddedInterpolator(object):
         """
         Prepare an interpolation over the grid defined by a GriddedData source onto an UngriddedData sample.
 
-        Indices are calculated but no interpolation is performed until the resulting object is called. Note that
+        Weights are calculated but no interpolation is performed until the resulting object is called. Note that
         if the source contains a hybrid vertical coordinate these ARE interpolated to find a single vertical index.
+        Only the coordinates of the source are read here, and only the block of the source data containing the grid
+        cells needed for the sample points is read when the interpolation is performed.
+        The weights are stored in (and later loaded from) the index cache if one is configured, see
+        :mod:`cis.collocation.index_cache`.
 
         :param GriddedData _data: The source data, only the coordinates are used from this at initialisation.
         :param UngriddedData sample: The points to sample the source data at.
         :param str method: The interpolation method to use (either 'linear' or 'nearest'). Default is 'linear'.
         """
         from cis.utils import move_item_to_end
+        from cis.collocation.index_cache import get_default_cache
         coords = []
         grid_points = []
         self._circular_coord_dims = []
@@ -73,9 +78,11 @@ class GriddedUngriddedInterpolator(object):
         else:
             self._data_transpose = list(range(_data.ndim))
 
-        # Unfortunately transpose works in place, so make a copy of the data first
-        data = _data.copy()
+        # Unfortunately transpose works in place, so make a copy of the cube first. This is given a dummy (zero-strided)
+        #  data array so that the data itself is neither read nor copied just to get at the coordinates.
+        data = _data.copy(data=np.broadcast_to(np.zeros((), dtype=_data.dtype), _data.shape))
         data.transpose(self._data_transpose)
+        self._data_shape = data.shape
 
         # Remove any tuples in the list that do not correspond to a dimension coordinate in the cube 'data'.
         for coord in data.coords(dim_coords=True):
@@ -88,7 +95,7 @@ class GriddedUngriddedInterpolator(object):
                 decreasing = (coord_points.size > 1 and
                               coord_points[1] < coord_points[0])
                 if decreasing:
-                    self._decreasing_coord_dims.append(decreasing)
+                    self._decreasing_coord_dims.append(coord_dim)
                     coord_points = coord_points[::-1]
 
                 if getattr(coord, 'circular', False):
@@ -128,8 +135,11 @@ class GriddedUngriddedInterpolator(object):
         else:
             self.missing_mask = None
 
-        self._interp = _RegularGridInterpolator(grid_points, sample_points,
-                                                hybrid_coord=hybrid_coord, hybrid_dims=hybrid_dims, method=method)
+        self._interp = _RegularGridInterpolator(grid_points, sample_points, hybrid_coord=hybrid_coord,
+                                                hybrid_dims=hybrid_dims, method=method, cache=get_default_cache())
+        self._slices, self._block_interp = _get_block_interpolator(self._interp, self._data_shape, self._data_transpose,
+                                                                   self._circular_coord_dims,
+                                                                   self._decreasing_coord_dims)
 
     def _get_dims_order(self, data, coords):
         """
@@ -142,46 +152,405 @@ class GriddedUngriddedInterpolator(object):
         self._data_transpose.pop(vertical_dim)
         self._data_transpose.append(vertical_dim)
 
-    def _account_for_inverted(self, data):
-        dim_slices = [slice(None)] * data.ndim
-        for dim in self._decreasing_coord_dims:
-                dim_slices[dim] = slice(-1, None, -1)
-        data = data[dim_slices]
-        return data
+    def _expand_missing(self, result, fill_value):
+        """
+        Pack the interpolated values back into the original shape of the sample if any missing sample points were
+        skipped.
+        """
+        if self.missing_mask is not None:
+            expanded_result = np.ma.masked_array(np.zeros(self.missing_mask.shape), mask=self.missing_mask.copy(),
+                                                 fill_value=fill_value)
+            expanded_result[~self.missing_mask] = result
+            result = expanded_result
+        return result
 
     def __call__(self, data, fill_value=np.nan, extrapolate=False):
         """
          Perform the prepared interpolation over the given data GriddedData object - this assumes that the coordinates
           used to initialise the interpolator are identical as those in this data object.
 
+        A list of GriddedData objects (all on that same grid) can also be given, in which case they are stacked and
+        interpolated together, so the weights are only applied once.
+
         If extrapolate is True then fill_value is ignored (since there will be no invalid values).
 
-        :param GriddedData data: Data values to interpolate
+        :param GriddedData or list data: Data values to interpolate
         :param float fill_value: The fill value to use for sample points outside of the bounds of the data
         :param bool extrapolate: Extrapolate points outside the bounds of the data? Default False.
-        :return ndarray: Interpolated values.
+        :return ndarray or list: Interpolated values (a list of them, one for each variable, if a list was given).
         """
         if extrapolate:
             fill_value = None
 
-        # Apply a transpose if we need to so that the indices line-up correctly
-        data_array = data.data.transpose(self._data_transpose)
-        # Account for any circular coords present
-        for dim in self._circular_coord_dims:
-            data_array = extend_circular_data(data_array, dim)
+        if isinstance(data, list):
+            # Stack the variables along a trailing dimension, which is carried through the interpolation
+            data_array = np.ma.stack([_read_block(var, self._slices, self._data_transpose) for var in data], axis=-1)
+            result = self._block_interp(data_array, fill_value=fill_value)
+            return [self._expand_missing(result[..., i], fill_value) for i in range(len(data))]
 
-        data_array = self._account_for_inverted(data_array)
+        result = self._block_interp(_read_block(data, self._slices, self._data_transpose), fill_value=fill_value)
+        return self._expand_missing(result, fill_value)
 
-        result = self._interp(data_array, fill_value=fill_value)
 
-        if self.missing_mask is not None:
-            # Pack the interpolated values back into the original shape
-            expanded_result = np.ma.masked_array(np.zeros(self.missing_mask.shape), mask=self.missing_mask.copy(),
-                                                 fill_value=fill_value)
-            expanded_result[~self.missing_mask] = result
-            result = expanded_result
+class GriddedRegridder(object):
 
-        return result
+    def __init__(self, source, sample_coords, method='lin'):
+        """
+        Prepare a regridding of GriddedData from the grid of a source onto the grid defined by some sample coordinates.
+
+        The weights are calculated once, as a sparse matrix, and can then be applied to any data on the same grid as the
+        source by calling the resulting object. Any dimensions of the source which aren't in the sample are carried
+        through unchanged (for example a leading time dimension). The weights are stored in (and later loaded from) the
+        index cache if one is configured, see :mod:`cis.collocation.index_cache`.
+
+        :param GriddedData source: The source data, only the coordinates are used from this.
+        :param list sample_coords: The dimension coordinates defining the grid to regrid onto, each of which must
+         correspond to a dimension coordinate of the source.
+        :param str method: The interpolation method to use (either 'lin' or 'nn'). Default is 'lin'.
+        """
+        from cis.collocation.index_cache import get_default_cache
+        self.method = method
+        self._sample_coords = list(sample_coords)
+        self._source_coords = [source.coord(dim_coords=True, name_or_coord=c.name()) for c in self._sample_coords]
+        interp_dims = [source.coord_dims(c)[0] for c in self._source_coords]
+        other_dims = [dim for dim in range(source.ndim) if dim not in interp_dims]
+        self._transpose = interp_dims + other_dims
+        self._other_dims = other_dims
+
+        grid_points = []
+        circular_dims, decreasing_dims = [], []
+        for dim, coord in enumerate(self._source_coords):
+            coord_points = coord.points
+            if coord_points[1] < coord_points[0]:
+                decreasing_dims.append(dim)
+                coord_points = coord_points[::-1]
+            if getattr(coord, 'circular', False):
+                circular_dims.append(dim)
+                coord_points = extend_circular_coord(coord, coord_points)
+            grid_points.append(coord_points)
+
+        self.shape = tuple(len(c.points) for c in self._sample_coords)
+        sample_points = [p.ravel() for p in np.meshgrid(*[c.points for c in self._sample_coords], indexing='ij')]
+
+        self._interp = _RegularGridInterpolator(grid_points, sample_points, method=method, cache=get_default_cache())
+        transposed_shape = tuple(source.shape[dim] for dim in self._transpose)
+        self._slices, self._block_interp = _get_block_interpolator(self._interp, transposed_shape, self._transpose,
+                                                                   circular_dims, decreasing_dims)
+
+    @staticmethod
+    def can_regrid(source, sample_coords):
+        """
+        Can the source be regridded onto the sample coordinates? This requires each sample coordinate to correspond to
+        a dimension coordinate (with at least two points) of the source, and no auxiliary coordinates of the source to
+        span the dimensions being regridded (as these would have to be interpolated too).
+
+        :param GriddedData source: The source data
+        :param list sample_coords: The dimension coordinates defining the grid to regrid onto
+        :return bool:
+        """
+        interp_dims = set()
+        for coord in sample_coords:
+            source_coords = source.coords(dim_coords=True, name_or_coord=coord.name())
+            if len(source_coords) != 1 or len(source_coords[0].points) < 2:
+                return False
+            interp_dims.update(source.coord_dims(source_coords[0]))
+        return len(source.aux_factories) == 0 and not any(interp_dims.intersection(source.coord_dims(coord))
+                                                          for coord in source.aux_coords)
+
+    def __call__(self, data, extrapolate=False):
+        """
+        Regrid the given GriddedData object - this assumes that its coordinates are identical to those of the source used
+        to initialise the regridder.
+
+        The result has the sample dimensions first (in the order of the sample coordinates) followed by any other
+        dimensions of the data, in their original order. The output is masked wherever any of the data values used
+        (with a non-zero weight) are masked.
+
+        :param GriddedData data: The data to regrid
+        :param bool extrapolate: Extrapolate points outside the bounds of the data? Default False, in which case they
+         are masked.
+        :return GriddedData: The regridded data
+        """
+        values = _read_block(data, self._slices, self._transpose)
+        other_shape = values.shape[len(self.shape):]
+
+        result = np.ma.getdata(self._block_interp(np.ma.getdata(values), fill_value=None))
+        mask = np.zeros(result.shape, dtype=bool)
+        if np.ma.is_masked(values):
+            mask_fraction = self._block_interp(np.ma.getmaskarray(values).astype(float), fill_value=None)
+            mask |= np.ma.getdata(mask_fraction) > 0
+        if not extrapolate:
+            mask |= np.reshape(self._block_interp.out_of_bounds, result.shape[:1] + (1,) * len(other_shape))
+
+        if self.method == 'nn' or np.issubdtype(values.dtype, np.floating):
+            result = result.astype(values.dtype)
+        result = result.reshape(self.shape + other_shape)
+        if np.ma.isMaskedArray(values) or mask.any():
+            result = np.ma.masked_array(result, mask=mask.reshape(result.shape))
+
+        new_coords = [coord.copy(sample_coord.points) for coord, sample_coord in zip(self._source_coords,
+                                                                                     self._sample_coords)]
+        return _make_regridded_cube(data, result, new_coords, self._other_dims)
+
+
+class ConservativeRegridder(object):
+
+    def __init__(self, source, sample_coords):
+        """
+        Prepare a conservative (area weighted) regridding of GriddedData from the latitude-longitude grid of a source
+        onto the grid defined by some sample latitude and longitude coordinates.
+
+        The weights are the exact areas of overlap on the sphere between each sample grid cell and each source grid
+        cell, calculated from the cell bounds (which are guessed if they're not defined). They are stored as a sparse
+        matrix, in (and later loaded from) the index cache if one is configured, see
+        :mod:`cis.collocation.index_cache`. Any other dimensions of the source are carried through unchanged.
+
+        :param GriddedData source: The source data, only the coordinates are used from this.
+        :param list sample_coords: The latitude and longitude dimension coordinates defining the grid to regrid onto.
+        """
+        from cis.collocation.index_cache import get_default_cache
+        self._sample_coords = list(sample_coords)
+        self._source_coords = [source.coord(dim_coords=True, name_or_coord=c.name()) for c in self._sample_coords]
+        interp_dims = [source.coord_dims(c)[0] for c in self._source_coords]
+        self._other_dims = [dim for dim in range(source.ndim) if dim not in interp_dims]
+        self._transpose = interp_dims + self._other_dims
+
+        self._sample_bounds = [_get_bounds(c) for c in self._sample_coords]
+        source_bounds = [_get_bounds(c) for c in self._source_coords]
+        self.shape = tuple(len(b) for b in self._sample_bounds)
+
+        cache = get_default_cache()
+        arrays = None
+        if cache is not None:
+            from cis.collocation.index_cache import hash_arrays
+            key = hash_arrays(*(self._sample_bounds + source_bounds), weights=type(self).__name__,
+                              names=[c.name() for c in self._sample_coords])
+            arrays = cache.load(key)
+
+        if arrays is not None:
+            self._set_weights_from_arrays(arrays)
+        else:
+            self._calculate_weights(source_bounds)
+            if cache is not None:
+                cache.store(key, self._get_weights_as_arrays())
+
+        # Only the block of source cells which overlap the sample grid is read
+        slices = [slice(None)] * source.ndim
+        for dim, (start, stop) in zip(interp_dims, self._block):
+            slices[dim] = slice(int(start), int(stop))
+        self._slices = tuple(slices)
+
+    def _calculate_weights(self, source_bounds):
+        """
+        Calculate the weights from the overlaps along each dimension. Latitudes are converted to the sine of the
+        latitude so that the product of the overlaps is proportional to the area of overlap on the sphere.
+
+        :param list source_bounds: The bounds of the source cells along each dimension
+        """
+        from scipy.sparse import kron
+        overlaps, self._block = [], []
+        for coord, bounds, sample_bounds in zip(self._source_coords, source_bounds, self._sample_bounds):
+            if coord.name() == 'latitude':
+                overlap = _get_overlaps(np.sin(np.deg2rad(np.clip(sample_bounds, -90, 90))),
+                                        np.sin(np.deg2rad(np.clip(bounds, -90, 90))))
+            else:
+                overlap = _get_overlaps(sample_bounds, bounds, modulus=coord.units.modulus)
+            start, stop = (overlap.indices.min(), overlap.indices.max() + 1) if overlap.nnz else (0, 1)
+            overlaps.append(overlap[:, start:stop])
+            self._block.append((start, stop))
+        self.weights = kron(overlaps[0], overlaps[1], format='csr')
+
+    def _get_weights_as_arrays(self):
+        """
+        Get the arrays making up the weights, e.g. for saving to disk.
+
+        :return dict: The arrays by name
+        """
+        return {'data': self.weights.data, 'indices': self.weights.indices, 'indptr': self.weights.indptr,
+                'shape': np.array(self.weights.shape), 'block': np.array(self._block)}
+
+    def _set_weights_from_arrays(self, arrays):
+        """
+        Set the weights from the arrays returned by :meth:`_get_weights_as_arrays` (which may be memory mapped).
+
+        :param dict arrays: The arrays by name
+        """
+        from scipy.sparse import csr_matrix
+        self.weights = csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']),
+                                  shape=tuple(int(n) for n in arrays['shape']))
+        self._block = np.asarray(arrays['block'])
+
+    @staticmethod
+    def can_regrid(source, sample_coords):
+        """
+        Can the source be regridded conservatively onto the sample coordinates? The sample coordinates must be a
+        latitude and a longitude, corresponding to one-dimensional dimension coordinates of the source.
+
+        :param GriddedData source: The source data
+        :param list sample_coords: The dimension coordinates defining the grid to regrid onto
+        :return bool:
+        """
+        names = sorted(c.name() for c in sample_coords)
+        return names == ['latitude', 'longitude'] and all(len(source.coords(dim_coords=True, name_or_coord=name)) == 1
+                                                          for name in names)
+
+    def __call__(self, data):
+        """
+        Regrid the given GriddedData object - this assumes that its coordinates are identical to those of the source used
+        to initialise the regridder.
+
+        Each output value is the area weighted mean of the (unmasked) source values overlapping that sample cell, so
+        masked values are accounted for by renormalising the weights over the valid values. Sample cells which don't
+        overlap any valid source values are masked. As for :class:`GriddedRegridder`, the result has the sample
+        dimensions first followed by any other dimensions of the data.
+
+        :param GriddedData data: The data to regrid
+        :return GriddedData: The regridded data
+        """
+        values = _read_block(data, self._slices, self._transpose)
+        other_shape = values.shape[len(self.shape):]
+        flat_shape = (self.weights.shape[1], -1)
+
+        valid = ~np.ma.getmaskarray(values).reshape(flat_shape)
+        total = self.weights.dot(np.where(valid, np.ma.getdata(values).reshape(flat_shape), 0))
+        area = self.weights.dot(valid.astype(float))
+        mask = area <= 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = np.where(mask, 0, total / area)
+
+        dtype = values.dtype if np.issubdtype(values.dtype, np.floating) else np.float64
+        result = result.astype(dtype).reshape(self.shape + other_shape)
+        if np.ma.isMaskedArray(values) or mask.any():
+            result = np.ma.masked_array(result, mask=mask.reshape(result.shape))
+
+        new_coords = [coord.copy(sample_coord.points, bounds) for coord, sample_coord, bounds in
+                      zip(self._source_coords, self._sample_coords, self._sample_bounds)]
+        return _make_regridded_cube(data, result, new_coords, self._other_dims)
+
+
+def _make_regridded_cube(data, result, new_coords, other_dims):
+    """
+    Create the output of a regridding, with the regridded dimensions first followed by the other dimensions of the data.
+    Auxiliary coordinates over the regridded dimensions are not carried through.
+
+    :param GriddedData data: The data which was regridded
+    :param ndarray result: The regridded values
+    :param list new_coords: The dimension coordinates of the regridded dimensions
+    :param list other_dims: The other dimensions of the data, in the order they appear in the result
+    :return GriddedData: The regridded data
+    """
+    import iris.cube
+    from cis.data_io.gridded_data import make_from_cube
+    output = iris.cube.Cube(result)
+    output.metadata = data.metadata
+    for dim, coord in enumerate(new_coords):
+        output.add_dim_coord(coord, dim)
+    for dim, data_dim in enumerate(other_dims, start=len(new_coords)):
+        for coord in data.coords(dimensions=data_dim, dim_coords=True):
+            output.add_dim_coord(coord.copy(), dim)
+    for coord in data.aux_coords:
+        coord_dims = data.coord_dims(coord)
+        if all(d in other_dims for d in coord_dims):
+            output.add_aux_coord(coord.copy(), [len(new_coords) + other_dims.index(d) for d in coord_dims])
+    return make_from_cube(output)
+
+
+def _get_bounds(coord):
+    """
+    Get the bounds of a one-dimensional coordinate, guessing them from the points if there aren't any.
+    """
+    if coord.has_bounds():
+        return coord.bounds
+    coord = coord.copy()
+    coord.guess_bounds()
+    return coord.bounds
+
+
+def _get_overlaps(target_bounds, source_bounds, modulus=None):
+    """
+    Find the length of the overlap of each target interval with each source interval. The intervals of each must be
+    contiguous and monotonic (as the cells of a grid are), but can be increasing or decreasing.
+
+    :param ndarray target_bounds: The bounds of the target intervals, shape (N, 2)
+    :param ndarray source_bounds: The bounds of the source intervals, shape (M, 2)
+    :param float modulus: The modulus of the coordinate (e.g. 360 for longitudes), if any, in which case the source
+     intervals also overlap the target intervals one modulus either side.
+    :return scipy.sparse.csr_matrix: The overlaps, shape (N, M)
+    """
+    from scipy.sparse import coo_matrix
+    t_lo, t_hi = target_bounds.min(axis=1), target_bounds.max(axis=1)
+    order = np.argsort(source_bounds.min(axis=1))
+    s_lo, s_hi = source_bounds.min(axis=1)[order], source_bounds.max(axis=1)[order]
+
+    rows, columns, lengths = [], [], []
+    for offset in ([0] if not modulus else [-modulus, 0, modulus]):
+        # The (sorted) sources which can overlap each target are those which start before it ends and end after it
+        #  starts - a contiguous range of them
+        start = np.searchsorted(s_hi + offset, t_lo, side='right')
+        stop = np.searchsorted(s_lo + offset, t_hi, side='left')
+        counts = np.maximum(stop - start, 0)
+        row = np.repeat(np.arange(len(t_lo)), counts)
+        column = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(start, counts)
+        length = np.minimum(t_hi[row], s_hi[column] + offset) - np.maximum(t_lo[row], s_lo[column] + offset)
+        rows.append(row)
+        columns.append(order[column])
+        lengths.append(length)
+
+    rows, columns, lengths = np.concatenate(rows), np.concatenate(columns), np.concatenate(lengths)
+    keep = lengths > 0
+    return coo_matrix((lengths[keep], (rows[keep], columns[keep])),
+                      shape=(len(target_bounds), len(source_bounds))).tocsr()
+
+
+def _get_block_interpolator(interp, shape, transpose, circular_dims, decreasing_dims):
+    """
+    Find the smallest block of the source data which contains all of the grid cells used by an interpolation, and an
+    interpolator which applies the weights directly to that block. This also takes care of any inverted and circular
+    coordinates, so the block can be used as it is read from the source.
+
+    :param _RegularGridInterpolator interp: The interpolator over the (extended and inverted) grid
+    :param tuple shape: The shape of the source data after transposing, the interpolation is over the leading dimensions
+    :param list transpose: The transpose applied to the source data
+    :param list circular_dims: The (transposed) dimensions with a circular coordinate
+    :param list decreasing_dims: The (transposed) dimensions with a decreasing coordinate
+    :return: Tuple of the slices defining the block (in the original order of the source dimensions) and the
+     interpolator for the block
+    """
+    cells = list(interp.get_cells())
+    lower, upper = [], []
+    for dim, n in enumerate(shape[:len(cells)]):
+        if dim in circular_dims:
+            # The extra point at the end of a circular coordinate is the first point again
+            cells[dim] = cells[dim] % n
+        if dim in decreasing_dims:
+            cells[dim] = n - 1 - cells[dim]
+        lower.append(cells[dim].min() if cells[dim].size else 0)
+        upper.append(cells[dim].max() + 1 if cells[dim].size else 1)
+
+    slices = [slice(None)] * len(shape)
+    for dim, start, stop in zip(transpose, lower, upper):
+        slices[dim] = slice(start, stop)
+
+    block_interp = interp.with_cells([c - start for c, start in zip(cells, lower)],
+                                     [stop - start for start, stop in zip(lower, upper)])
+    return tuple(slices), block_interp
+
+
+def _read_block(data, slices, transpose):
+    """
+    Read a block of data, transposed so that the indices line-up correctly.
+
+    :param GriddedData data: The source data
+    :param tuple slices: The slices defining the block
+    :param list transpose: The transpose to apply to the block
+    :return ndarray: The block of data
+    """
+    if data.has_lazy_data():
+        # Slicing the cube first means only the block of data we need is read
+        data_array = data[slices].data
+    else:
+        data_array = data.data[slices]
+    return data_array.transpose(transpose)
 
 
 def _ndim_coords_from_arrays(points, ndim=None):
@@ -218,16 +587,18 @@ class _RegularGridInterpolator(object):
     The data must be defined on a regular grid; the grid spacing however may be
     uneven.  Linear and nearest-neighbour interpolation are supported. After
     setting up the interpolator object, the interpolation can be performed for
-    multiple data arrays with cached indices - this assumes they have the same
-    coordinates.
+    multiple data arrays with cached weights - this assumes they have the same
+    coordinates. The weights are held as a sparse matrix (sample points x grid
+    cells) so each interpolation is a single sparse matrix product.
     """
     # this class is based on code originally programmed by Johannes Buchner,
     # see https://github.com/JohannesBuchner/regulargrid
 
-    def __init__(self, coords, points, hybrid_coord=None, hybrid_dims=None, method="lin"):
+    def __init__(self, coords, points, hybrid_coord=None, hybrid_dims=None, method="lin", cache=None):
         """
-        Initialise the itnerpolator - this will calculate and cache the indices of the interpolation. It will
-        also interpolate the hybrid coordinate if needed to determine a unique vertical index.
+        Initialise the interpolator - this will calculate the interpolation weights of each sample point and store
+        them as a sparse matrix. It will also interpolate the hybrid coordinate if needed to determine a unique
+        vertical index.
 
         :param iterable coords: The coords defining the regular grid in n dimensions. Should be a tuple of ndarrays
         :param ndarray points: The points to sample the gridded data at.
@@ -235,6 +606,7 @@ class _RegularGridInterpolator(object):
         :param iterable hybrid_dims: The grid dimensions over which the hybrid coordinate is defined
         :param str method: The method of interpolation to perform. Supported are "linear" and "nearest". Default is
         "linear".
+        :param IndexCache cache: An (optional) cache to load the weights from, or store them in if they aren't there
         """
         if method == "lin":
             self._interp = self._evaluate_linear
@@ -263,33 +635,99 @@ class _RegularGridInterpolator(object):
             ndim = len(self.grid)
             points = _ndim_coords_from_arrays(points, ndim=ndim)
 
+        if cache is not None:
+            from cis.collocation.index_cache import hash_arrays
+            key = hash_arrays(points, np.asarray(hybrid_coord if hybrid_coord is not None else []), *self.grid,
+                              weights=type(self).__name__, method=method, hybrid_dims=hybrid_dims)
+            arrays = cache.load(key)
+            if arrays is not None:
+                self._set_weights_from_arrays(arrays)
+                return
+
         if hybrid_coord is not None:
 
             # Firstly interpolate over all of the dimensions except the vertical (which will always be the last...)
-            self.indices, self.norm_distances, self.out_of_bounds = \
-                self._find_indices(points[:-1], self.grid)
+            indices, norm_distances, self.out_of_bounds = self._find_indices(points[:-1], self.grid)
 
             # Find the dims to interpolate over for the hybrid coord
             hybrid_interp_dims = hybrid_dims[:-1]
-            hybrid_indices = [self.indices[i] for i in hybrid_interp_dims]
+            hybrid_indices = [indices[i] for i in hybrid_interp_dims]
 
             # Find all of the interpolated vertical columns (one for each point)
-            v_coords = self._interp(hybrid_coord, hybrid_indices, self.norm_distances)
-
-            self.indices.append(np.zeros(len(points.T), dtype=self.indices[0].dtype))
-            self.norm_distances.append(np.zeros(len(points.T)))
+            v_coords = self._interp(hybrid_coord, hybrid_indices, norm_distances)
 
             # Calculate and store the vertical index and weight for each point based on the interpolated vertical
             # column
-            # TODO: This loop could be a bottle-neck for many points, maybe move to Cython?
-            for i, p in enumerate(points.T):
-                vert_index, vert_norm_distance, vert_out_of_bounds = self._find_vertical_index(p[-1], v_coords[i])
-                self.indices[-1][i] = vert_index
-                self.norm_distances[-1][i] = vert_norm_distance
-                self.out_of_bounds[i] += vert_out_of_bounds
+            vert_indices, vert_norm_distances, vert_out_of_bounds = self._find_vertical_indices(points[-1], v_coords)
+            indices.append(vert_indices.astype(indices[0].dtype))
+            norm_distances.append(vert_norm_distances)
+            self.out_of_bounds += vert_out_of_bounds
 
         else:
-            self.indices, self.norm_distances, self.out_of_bounds = self._find_indices(points.T, self.grid)
+            indices, norm_distances, self.out_of_bounds = self._find_indices(points.T, self.grid)
+
+        # The shape of the grid the weights apply to, including the hybrid vertical dimension if there is one
+        self.shape = tuple(len(c) for c in self.grid) + tuple(np.shape(hybrid_coord)[-1:])
+        self.weights = self._get_weights(indices, norm_distances, self.shape, method)
+
+        if cache is not None:
+            cache.store(key, self._get_weights_as_arrays())
+
+    @staticmethod
+    def _get_weights(indices, norm_distances, shape, method):
+        """
+        Create the sparse matrix of interpolation weights, with a row for each sample point and a column for each cell
+        of the (flattened) grid.
+
+        :param list indices: The index of the lower edge of each point in each dimension of the grid
+        :param list norm_distances: The normalised distance of each point from the lower edge in each dimension
+        :param tuple shape: The shape of the grid
+        :param str method: The interpolation method, 'lin' or 'nn'
+        :return scipy.sparse.csr_matrix: The weights
+        """
+        from itertools import product
+        from scipy.sparse import csr_matrix
+        n_points = len(indices[0])
+        if method == "lin":
+            # Each of the 2^n corners of the grid cell surrounding a point contributes to its value. Keep any zero
+            #  weights so that missing values at those corners are still accounted for, as they always have been.
+            columns, weights = [], []
+            for corner in product(*[[0, 1]] * len(indices)):
+                weight = np.ones(n_points)
+                for offset, yi in zip(corner, norm_distances):
+                    weight = weight * (yi if offset else 1 - yi)
+                columns.append(np.ravel_multi_index([i + offset for i, offset in zip(indices, corner)], shape))
+                weights.append(weight)
+            columns, weights = np.column_stack(columns), np.column_stack(weights)
+        else:
+            nearest = [np.where(yi <= .5, i, i + 1) for i, yi in zip(indices, norm_distances)]
+            columns = np.ravel_multi_index(nearest, shape)[:, np.newaxis]
+            weights = np.ones(columns.shape)
+
+        indptr = np.arange(0, columns.size + 1, columns.shape[1])
+        return csr_matrix((weights.ravel(), columns.ravel(), indptr), shape=(n_points, int(np.prod(shape))))
+
+    def _get_weights_as_arrays(self):
+        """
+        Get the arrays making up the interpolation weights, e.g. for saving to disk.
+
+        :return dict: The arrays by name
+        """
+        return {'data': self.weights.data, 'indices': self.weights.indices, 'indptr': self.weights.indptr,
+                'shape': np.array(self.shape), 'out_of_bounds': np.asarray(self.out_of_bounds, dtype=bool)}
+
+    def _set_weights_from_arrays(self, arrays):
+        """
+        Set the interpolation weights from the arrays returned by :meth:`_get_weights_as_arrays` (which may be
+        memory mapped).
+
+        :param dict arrays: The arrays by name
+        """
+        from scipy.sparse import csr_matrix
+        self.shape = tuple(int(n) for n in arrays['shape'])
+        self.weights = csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']),
+                                  shape=(len(arrays['indptr']) - 1, int(np.prod(self.shape))))
+        self.out_of_bounds = np.asarray(arrays['out_of_bounds'])
 
     def __call__(self, values, fill_value=np.nan):
         """
@@ -304,9 +742,9 @@ class _RegularGridInterpolator(object):
             # allow reasonable duck-typed values
             values = np.asarray(values)
 
-        if len(self.grid) > values.ndim:
+        if len(self.shape) > values.ndim:
             raise ValueError("There are %d point arrays, but values has %d "
-                             "dimensions" % (len(self.grid), values.ndim))
+                             "dimensions" % (len(self.shape), values.ndim))
 
         if hasattr(values, 'dtype') and hasattr(values, 'astype'):
             if not np.issubdtype(values.dtype, np.inexact):
@@ -320,18 +758,72 @@ class _RegularGridInterpolator(object):
                 raise ValueError("fill_value must be either 'None' or "
                                  "of a type compatible with values")
 
-        for i, p in enumerate(self.grid):
-            if not values.shape[i] == len(p):
+        for i, n in enumerate(self.shape):
+            if not values.shape[i] == n:
                 raise ValueError("There are %d points and %d values in "
-                                 "dimension %d" % (len(p), values.shape[i], i))
+                                 "dimension %d" % (n, values.shape[i], i))
 
-        result = self._interp(values, self.indices, self.norm_distances)
+        result = self._apply_weights(values)
 
         if fill_value is not None:
-            result = np.ma.array(result, mask=self.out_of_bounds, fill_value=fill_value)
+            # Broadcast the points which are out of bounds over any trailing dimensions of the values
+            out_of_bounds = np.reshape(self.out_of_bounds, result.shape[:1] + (1,) * (result.ndim - 1))
+            out_of_bounds = np.broadcast_to(out_of_bounds, result.shape).copy()
+            result = np.ma.array(result, mask=out_of_bounds, fill_value=fill_value)
 
         return result
 
+    def get_cells(self):
+        """
+        Get the grid cells used by the interpolation.
+
+        :return tuple: The index in each dimension of the grid of the cell of each (non-empty) weight
+        """
+        return np.unravel_index(self.weights.indices, self.shape)
+
+    def with_cells(self, cells, shape):
+        """
+        Get a copy of this interpolator which applies the same weights to a different layout of grid cells, for example
+        a block of the original grid.
+
+        :param list cells: The index in each dimension of the new grid of the cell of each weight, in the same order as
+         returned by :meth:`get_cells`
+        :param list shape: The shape of the new grid
+        :return _RegularGridInterpolator: The new interpolator
+        """
+        from copy import copy
+        from scipy.sparse import csr_matrix
+        interp = copy(self)
+        interp.shape = tuple(shape)
+        interp.weights = csr_matrix((self.weights.data, np.ravel_multi_index(cells, interp.shape), self.weights.indptr),
+                                    shape=(self.weights.shape[0], int(np.prod(interp.shape))))
+        return interp
+
+    def _apply_weights(self, values):
+        """
+        Interpolate the values with a single sparse matrix product. Any trailing dimensions of the values (beyond those
+        of the grid) are interpolated together. The result is masked wherever any of the grid cells used for a point
+        are masked.
+
+        :param ndarray values: The data on the regular grid
+        :return MaskedArray: The interpolated values
+        """
+        from scipy.sparse import csr_matrix
+        trailing_shape = values.shape[len(self.shape):]
+        flat_shape = (self.weights.shape[1], -1)
+        result = self.weights.dot(np.ma.getdata(values).reshape(flat_shape))
+
+        mask = np.ma.getmask(values)
+        if mask is not np.ma.nomask and mask.any():
+            footprint = csr_matrix((np.ones_like(self.weights.data), self.weights.indices, self.weights.indptr),
+                                   shape=self.weights.shape)
+            mask = footprint.dot(mask.reshape(flat_shape).astype(float)) > 0
+            mask = mask.reshape(result.shape[:1] + trailing_shape)
+        else:
+            mask = np.ma.nomask
+
+        return np.ma.masked_array(result.reshape(result.shape[:1] + trailing_shape), mask=mask)
+
     @staticmethod
     def _evaluate_linear(values, indices, norm_distances):
         from itertools import product
@@ -354,7 +846,7 @@ class _RegularGridInterpolator(object):
         idx_res = []
         for i, yi in zip(indices, norm_distances):
             idx_res.append(np.where(yi <= .5, i, i + 1))
-        return values[idx_res]
+        return values[tuple(idx_res)]
 
     @staticmethod
     def _find_indices(points, coords):
@@ -378,13 +870,32 @@ class _RegularGridInterpolator(object):
         return indices, norm_distances, out_of_bounds
 
     @staticmethod
-    def _find_vertical_index(point, coord):
-        i = np.searchsorted(coord, point) - 1
-        if i < 0:
-            i = 0
-        if i > coord.size - 2:
-            i = coord.size - 2
-        norm_distances = ((point - coord[i]) / (coord[i + 1] - coord[i]))
-
-        out_of_bounds = point < coord[0] or point > coord[-1]
+    def _find_vertical_indices(points, columns):
+        """
+        Find the vertical index and weight of every point in its own vertical column, for all of the points at once.
+        The columns can be increasing or decreasing.
+
+        :param ndarray points: The vertical coordinate of each point, shape (N,)
+        :param ndarray columns: The vertical column of each point, shape (N, M)
+        :return: Tuple of the index of the lower edge (i.e. the index i such that the point lies between column[i] and
+         column[i + 1]), the normalised distance from that edge and whether the point is outside the column, each of
+         shape (N,)
+        """
+        points = np.asarray(points, dtype=np.float64)
+        columns = np.asarray(columns, dtype=np.float64)
+        rows = np.arange(len(points))
+        n_levels = columns.shape[1]
+
+        # Search in increasing columns, reversing the decreasing ones. This is equivalent to searchsorted in each row
+        increasing = columns[:, -1] >= columns[:, 0]
+        ascending = np.where(increasing[:, np.newaxis], columns, columns[:, ::-1])
+        i = np.count_nonzero(ascending < points[:, np.newaxis], axis=1) - 1
+        i = np.clip(i, 0, n_levels - 2)
+        # Convert the index back to the original order of the decreasing columns
+        i = np.where(increasing, i, n_levels - 2 - i)
+
+        lower, upper = columns[rows, i], columns[rows, i + 1]
+        norm_distances = (points - lower) / (upper - lower)
+
+        out_of_bounds = (points < ascending[:, 0]) | (points > ascending[:, -1])
         return i, norm_distances, out_of_bounds
@@ -1,28 +1,66 @@
+import logging
+
 import numpy as np
 
-from cis.collocation.kdtree import HaversineDistanceKDTree
+from cis.collocation.kdtree import HaversineDistanceKDTree, UnitSphereKDTree
 from cis.data_io.hyperpoint import HyperPoint
 
 
-def create_index(data, leafsize=10):
+def create_index(data, leafsize=10, compiled=True, cache=None):
     """
     Creates the k-D tree index.
 
     :param data: list of HyperPoints to index
+    :param compiled: Use the compiled (scipy cKDTree) tree if available, otherwise the pure Python tree
+    :param cache: An :class:`cis.collocation.index_cache.IndexCache` to load the pure Python tree from, or store it
+        in. The compiled tree isn't cached, as it can only be rebuilt from the points (which is about as quick as
+        building it in the first place) without pickling it.
     """
     spatial_points = data[['latitude', 'longitude']]
     if hasattr(data, 'data'):
         mask = np.ma.getmask(data.data).ravel()
     else:
         mask = None
+    if compiled:
+        try:
+            return UnitSphereKDTree(spatial_points, mask=mask, leafsize=leafsize)
+        except ImportError:
+            logging.warning("Unable to import scipy.spatial.cKDTree, falling back to the pure Python k-D tree")
+    if cache is not None:
+        return _create_cached_index(cache, spatial_points, mask, leafsize)
     return HaversineDistanceKDTree(spatial_points, mask=mask, leafsize=leafsize)
 
 
+def _create_cached_index(cache, spatial_points, mask, leafsize):
+    """
+    Load the pure Python k-D tree for some points from the cache, creating and storing it if it isn't there.
+    """
+    from cis.collocation.index_cache import hash_arrays
+    spatial_points = np.asarray(spatial_points, dtype=np.float64)
+    key = hash_arrays(spatial_points, np.asarray(mask if mask is not None else [], dtype=bool),
+                      tree=HaversineDistanceKDTree.__name__, leafsize=leafsize)
+    arrays = cache.load(key)
+    if arrays is not None:
+        return HaversineDistanceKDTree.from_arrays(arrays)
+    index = HaversineDistanceKDTree(spatial_points, mask=mask, leafsize=leafsize)
+    cache.store(key, index.to_arrays())
+    return index
+
+
 class HaversineDistanceKDTreeIndex(object):
     """k-D tree index that can be used to query using distance along the Earth's surface.
     """
-    def __init__(self):
+    def __init__(self, compiled=True, eps=0):
+        """
+        :param compiled: Use the compiled (scipy cKDTree) tree if available, otherwise the pure Python tree
+        :param float eps: Approximate search: branches of the tree are not explored if their nearest points are
+            further than ``distance/(1+eps)``, and are added in bulk if their furthest points are nearer than
+            ``distance*(1+eps)``. The nearest point found is no further than (1+eps) times the distance to the real
+            nearest point. Zero (the default) gives an exact search.
+        """
         self.index = None
+        self.compiled = compiled
+        self.eps = eps
 
     def index_data(self, points, data, coord_map, leafsize=10):
         """
@@ -33,8 +71,9 @@ class HaversineDistanceKDTreeIndex(object):
         :param coord_map: (not used) list of tuples relating index in HyperPoint
                           to index in sample point coords and in coords to be output
         """
+        from cis.collocation.index_cache import get_default_cache
         try:
-            self.index = create_index(data, leafsize=leafsize)
+            self.index = create_index(data, leafsize=leafsize, compiled=self.compiled, cache=get_default_cache())
         except KeyError:
             pass # Unable to create index
 
@@ -44,7 +83,7 @@ class HaversineDistanceKDTreeIndex(object):
         :return: index in data of closest point
         """
         query_pt = point[['latitude', 'longitude']]
-        (distances, indices) = self.index.query(query_pt)
+        (distances, indices) = self.index.query(query_pt, eps=self.eps)
         return indices
 
     def find_points_within_distance(self, point, distance):
@@ -54,7 +93,7 @@ class HaversineDistanceKDTreeIndex(object):
         :return: list indices in data of points
         """
         query_pt = [[point.latitude, point.longitude]]
-        return self.index.query_ball_point(query_pt, distance)[0]
+        return self.index.query_ball_point(query_pt, distance, eps=self.eps)[0]
 
     def find_points_within_distance_sample(self, sample, distance):
         """Finds the points within a specified distance of a specified point.
@@ -64,4 +103,16 @@ class HaversineDistanceKDTreeIndex(object):
         For each element ``self.data[i]`` of this tree, ``results[i]`` is a
             list of the indices of its neighbors in ``other.data``.
         """
-        return create_index(sample).query_ball_tree(self.index, distance)
+        sample_index = create_index(sample, compiled=isinstance(self.index, UnitSphereKDTree))
+        return sample_index.query_ball_tree(self.index, distance, eps=self.eps)
+
+    def find_points_and_distances_within_distance_sample(self, sample, distance):
+        """Finds the points within a specified distance of each sample point, and the distance to each of them.
+        :param sample: the sample points
+        :param distance: distance in kilometres
+        :return: Tuple of (indptr, indices, distances) numpy arrays. The indices in data of the points within the
+            distance of sample point ``i`` are ``indices[indptr[i]:indptr[i + 1]]`` (in increasing order), and their
+            distances (in kilometres) from it are ``distances[indptr[i]:indptr[i + 1]]``.
+        """
+        sample_index = create_index(sample, compiled=isinstance(self.index, UnitSphereKDTree))
+        return sample_index.query_ball_tree_csr(self.index, distance, eps=self.eps)
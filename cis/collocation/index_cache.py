@@ -0,0 +1,174 @@
+"""
+A persistent on-disk cache of the spatial indexes used for collocation.
+
+Building the pure Python k-D tree (or the interpolation and regridding weights) over a large data set can take longer
+than the collocation itself, and the same source data are often collocated many times (e.g. many model variables onto
+the same satellite granules). If the ``CIS_INDEX_CACHE_DIR`` environment variable is set, the arrays making up each
+index are saved under that directory and memory mapped back in by later runs rather than being rebuilt. The compiled
+SciPy k-D tree isn't cached, as it can't be saved without pickling it and rebuilding it is no quicker than building it.
+
+Entries are keyed on a hash of the indexed coordinates (and any parameters of the index) so an entry is only reused for
+identical points. The cache is kept in check by evicting entries which haven't been used for
+``CIS_INDEX_CACHE_MAX_AGE`` days (default 30) and then the least recently used entries until the total size is less than
+``CIS_INDEX_CACHE_MAX_SIZE`` megabytes (default 1024).
+"""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+CACHE_DIR_ENV = "CIS_INDEX_CACHE_DIR"
+MAX_SIZE_ENV = "CIS_INDEX_CACHE_MAX_SIZE"
+MAX_AGE_ENV = "CIS_INDEX_CACHE_MAX_AGE"
+
+DEFAULT_MAX_SIZE_MB = 1024
+DEFAULT_MAX_AGE_DAYS = 30
+
+# Increment this if the format of the cached arrays changes, to invalidate any existing entries
+CACHE_FORMAT_VERSION = 2
+
+
+def hash_arrays(*arrays, **params):
+    """
+    Create a cache key from the contents of some arrays and any other parameters.
+
+    :param arrays: numpy arrays (or array_like) to hash
+    :param params: other (string-able) parameters which affect the index
+    :return str: A hex digest
+    """
+    key = hashlib.sha1()
+    key.update(str(CACHE_FORMAT_VERSION).encode())
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        key.update("{}{}".format(array.dtype.str, array.shape).encode())
+        key.update(array.view(np.uint8).ravel() if array.size else b'')
+    for name in sorted(params):
+        key.update("{}={}".format(name, params[name]).encode())
+    return key.hexdigest()
+
+
+class IndexCache(object):
+    """
+    A directory of cached indexes. Each entry is a sub-directory, named by its key, containing one ``.npy`` file per
+    array.
+    """
+
+    def __init__(self, cache_dir, max_size=DEFAULT_MAX_SIZE_MB, max_age=DEFAULT_MAX_AGE_DAYS):
+        """
+        :param str cache_dir: The directory to store the cache in, this is created if it doesn't exist
+        :param float max_size: The maximum total size of the cache in megabytes, or None for no limit
+        :param float max_age: The maximum time since an entry was last used in days, or None for no limit
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.max_age = max_age
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key):
+        """
+        Load an entry from the cache. The arrays are memory mapped read-only, and never unpickled.
+
+        :param str key: The key of the entry
+        :return dict: The arrays of the entry by name, or None if there is no such entry
+        """
+        path = self._entry_path(key)
+        if not os.path.isdir(path):
+            return None
+        try:
+            arrays = {os.path.splitext(f)[0]: np.load(os.path.join(path, f), mmap_mode='r', allow_pickle=False)
+                      for f in os.listdir(path) if f.endswith('.npy')}
+            # Mark the entry as recently used
+            os.utime(path, None)
+        except (IOError, OSError, ValueError) as e:
+            logging.warning("Unable to read the cached index {}: {}".format(path, e))
+            return None
+        logging.info("--> Using cached index {}".format(path))
+        return arrays
+
+    def store(self, key, arrays):
+        """
+        Store an entry in the cache, then evict old entries if needed.
+
+        :param str key: The key of the entry
+        :param dict arrays: The numpy arrays to store, by name
+        """
+        path = self._entry_path(key)
+        # Write to a temporary directory and then move it in place so that other processes never see partial entries
+        tmp_path = tempfile.mkdtemp(prefix='.tmp-', dir=self.cache_dir)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_path, name + '.npy'), np.asarray(array), allow_pickle=False)
+            if not os.path.isdir(path):
+                os.rename(tmp_path, path)
+        except (IOError, OSError) as e:
+            logging.warning("Unable to store the index in the cache {}: {}".format(self.cache_dir, e))
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        try:
+            self.evict(keep=key)
+        except OSError as e:
+            # Eviction is only best effort, other processes may be changing the cache at the same time
+            logging.warning("Unable to evict old indexes from the cache {}: {}".format(self.cache_dir, e))
+
+    def entries(self):
+        """
+        :return list: Tuples of (path, size in bytes, time last used) for each entry in the cache
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith('.') or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+                entries.append((path, size, os.path.getmtime(path)))
+            except OSError:
+                # The entry was removed (e.g. evicted by another process) while we were looking at it
+                continue
+        return entries
+
+    def evict(self, keep=None):
+        """
+        Remove entries which are older than the maximum age, then the least recently used entries until the cache is
+        no larger than the maximum size.
+
+        :param str keep: The key of an entry not to remove (e.g. the one just stored), even if it is too large
+        """
+        now = time.time()
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total_size = sum(size for path, size, last_used in entries)
+        for path, size, last_used in entries:
+            if keep is not None and path == self._entry_path(keep):
+                continue
+            too_old = self.max_age is not None and now - last_used > self.max_age * 86400
+            too_big = self.max_size is not None and total_size > self.max_size * 1024 * 1024
+            if too_old or too_big:
+                logging.info("--> Removing cached index {}".format(path))
+                shutil.rmtree(path, ignore_errors=True)
+                total_size -= size
+
+
+def get_default_cache():
+    """
+    Get the index cache configured by the environment variables.
+
+    :return IndexCache: The cache, or None if ``CIS_INDEX_CACHE_DIR`` isn't set
+    """
+    cache_dir = os.environ.get(CACHE_DIR_ENV, None)
+    if not cache_dir:
+        return None
+    try:
+        max_size = float(os.environ.get(MAX_SIZE_ENV, DEFAULT_MAX_SIZE_MB))
+        max_age = float(os.environ.get(MAX_AGE_ENV, DEFAULT_MAX_AGE_DAYS))
+        return IndexCache(cache_dir, max_size=max_size, max_age=max_age)
+    except (ValueError, IOError, OSError) as e:
+        logging.warning("Unable to use the index cache {}: {}".format(cache_dir, e))
+        return None
@@ -12,7 +12,7 @@ import math
 import numpy as np
 import scipy.sparse
 
-__all__ = ['minkowski_distance_p', 'minkowski_distance', 'haversine_distance',
+__all__ = ['minkowski_distance_p', 'minkowski_distance', 'haversine_distance', 'UnitSphereKDTree',
            'distance_matrix',
            'Rectangle', 'KDTree']
 
@@ -1155,6 +1155,11 @@ class KDTree(object):
 class HaversineDistanceKDTree(KDTree):
     """Modification of the scipy.spatial.KDTree class to allow querying for
     nearest neighbours measured by distance along the Earth's surface.
+
+    Rather than a tree of node objects the tree is held in a few flat arrays, with one entry per node: the split
+    dimension (-1 for a leaf), the split value, the less and greater children and the range of the node's points in
+    ``indices``. The points are ordered so that those of every node (not just the leaves) are contiguous. This is far
+    more compact than node objects, and the tree can be pickled or saved (see :meth:`to_arrays`) and memory mapped.
     """
 
     def __init__(self, data, leafsize=10, mask=None):
@@ -1165,14 +1170,136 @@ class HaversineDistanceKDTree(KDTree):
         self.leafsize = int(leafsize)
         if self.leafsize < 1:
             raise ValueError("leafsize must be at least 1")
-        self.maxes = np.amax(self.data, axis=0)
-        self.mins = np.amin(self.data, axis=0)
+        # The bounds of the (unmasked) points, as plain arrays since masked arithmetic would slow down every query
+        self.maxes = np.ma.getdata(np.amax(self.data, axis=0))
+        self.mins = np.ma.getdata(np.amin(self.data, axis=0))
 
         indices = np.arange(self.n)
         if mask is not None:
             indices = np.ma.array(indices, mask=mask)
             indices = indices.compressed()
-        self.tree = self._build(indices, self.maxes, self.mins)
+        self.indices = indices
+        nodes = []
+        self._build_nodes(nodes, 0, len(indices), self.maxes, self.mins)
+        split_dims, splits, less, greater, starts, ends = zip(*nodes)
+        self.split_dims = np.array(split_dims, dtype=np.int8)
+        self.splits = np.array(splits, dtype=np.float64)
+        self.less = np.array(less, dtype=np.intp)
+        self.greater = np.array(greater, dtype=np.intp)
+        self.starts = np.array(starts, dtype=np.intp)
+        self.ends = np.array(ends, dtype=np.intp)
+
+    def _build_nodes(self, nodes, start, end, maxes, mins):
+        """
+        Build the (sub-)tree of the points in indices[start:end], reordering them so the points of each child are
+        contiguous. The split is chosen in the same way as :meth:`KDTree._build`.
+        :param list nodes: the nodes built so far, as tuples of (split_dim, split, less, greater, start, end). The
+            nodes are added in depth first order, so the root is node 0.
+        :param start: the start of the node's points in indices
+        :param end: the end of the node's points in indices
+        :param maxes: the maximum value of each dimension for this node
+        :param mins: the minimum value of each dimension for this node
+        :return: the number of the node
+        """
+        node = len(nodes)
+        nodes.append((-1, np.nan, -1, -1, start, end))
+        if end - start <= self.leafsize:
+            return node
+
+        idx = self.indices[start:end]
+        # Find the dimension with the biggest difference (is it lat or lon)
+        d = np.argmax(maxes - mins)
+        maxval = maxes[d]
+        minval = mins[d]
+        if maxval == minval:
+            # all points are identical
+            return node
+        data = np.ma.getdata(self.data)[idx, d]
+
+        split = (maxval + minval) / 2
+        less_idx = np.nonzero(data <= split)[0]
+        greater_idx = np.nonzero(data > split)[0]
+        if len(less_idx) == 0:
+            split = np.amin(data)
+            less_idx = np.nonzero(data <= split)[0]
+            greater_idx = np.nonzero(data > split)[0]
+        if len(greater_idx) == 0:
+            split = np.amax(data)
+            less_idx = np.nonzero(data < split)[0]
+            greater_idx = np.nonzero(data >= split)[0]
+        if len(less_idx) == 0:
+            # _still_ zero? all must have the same value check and assign them all to the same node
+            if not np.all(data == data[0]):
+                raise ValueError("Troublesome data array: %s" % data)
+            return node
+
+        self.indices[start:end] = np.concatenate([idx[less_idx], idx[greater_idx]])
+        middle = start + len(less_idx)
+        lessmaxes = np.copy(maxes)
+        lessmaxes[d] = split
+        greatermins = np.copy(mins)
+        greatermins[d] = split
+        less = self._build_nodes(nodes, start, middle, lessmaxes, mins)
+        greater = self._build_nodes(nodes, middle, end, maxes, greatermins)
+        nodes[node] = (d, split, less, greater, start, end)
+        return node
+
+    def to_arrays(self):
+        """
+        Get the arrays making up the tree, e.g. for saving to disk.
+
+        :return dict: The arrays by name, which can be passed to :meth:`from_arrays`
+        """
+        return {'data': np.ma.getdata(self.data), 'mask': np.ma.getmaskarray(self.data),
+                'leafsize': np.array(self.leafsize), 'indices': self.indices, 'split_dims': self.split_dims,
+                'splits': self.splits, 'less': self.less, 'greater': self.greater, 'starts': self.starts,
+                'ends': self.ends}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Recreate a tree from the arrays returned by :meth:`to_arrays` (which may be memory mapped).
+
+        :param dict arrays: The arrays by name
+        :return HaversineDistanceKDTree: The tree
+        """
+        tree = cls.__new__(cls)
+        tree.__setstate__(arrays)
+        return tree
+
+    def __getstate__(self):
+        return self.to_arrays()
+
+    def __setstate__(self, arrays):
+        self.data = np.ma.MaskedArray(arrays['data'], mask=arrays['mask'], copy=False)
+        self.n, self.m = np.shape(self.data)
+        self.leafsize = int(arrays['leafsize'])
+        self.maxes = np.ma.getdata(np.amax(self.data, axis=0))
+        self.mins = np.ma.getdata(np.amin(self.data, axis=0))
+        for name in ['indices', 'split_dims', 'splits', 'less', 'greater', 'starts', 'ends']:
+            setattr(self, name, arrays[name])
+
+    @property
+    def tree(self):
+        """
+        The tree as :class:`KDTree.innernode` and :class:`KDTree.leafnode` objects, for the :class:`KDTree` methods
+        which need them. These are created when they are first used.
+        """
+        if getattr(self, '_tree', None) is None:
+            def make_node(node):
+                if self.split_dims[node] < 0:
+                    return KDTree.leafnode(self.indices[self.starts[node]:self.ends[node]])
+                return KDTree.innernode(int(self.split_dims[node]), self.splits[node], make_node(self.less[node]),
+                                        make_node(self.greater[node]))
+            self._tree = make_node(0)
+        return self._tree
+
+    def _is_leaf(self, node):
+        return self.split_dims[node] < 0
+
+    def _node_indices(self, node):
+        """The indices in data of all of the points in a node"""
+        return self.indices[self.starts[node]:self.ends[node]]
 
     def _query(self, x, k=1, eps=0, p=2, distance_upper_bound=np.inf):
 
@@ -1189,10 +1316,10 @@ class HaversineDistanceKDTree(KDTree):
         # entries are:
         #  minimum distance between the cell and the target
         #  distances between the nearest side of the cell and the target
-        #  the head node of the cell
+        #  the number of the head node of the cell
         q = [(min_distance,
               tuple(side_distances),
-              self.tree)]
+              0)]
         # priority queue for the nearest neighbors
         # furthest known neighbor first
         # entries are (-distance**p, i)
@@ -1208,17 +1335,18 @@ class HaversineDistanceKDTree(KDTree):
         if p != np.inf and distance_upper_bound != np.inf:
             distance_upper_bound = distance_upper_bound ** p
 
+        points = np.ma.getdata(self.data)
         while q:
             min_distance, side_distances, node = heappop(q)
-            if isinstance(node, HaversineDistanceKDTree.leafnode):
+            if self._is_leaf(node):
                 # brute-force
-                data = self.data[node.idx]
-                ds = haversine_distance(data, x[np.newaxis, :])
+                idx = self._node_indices(node)
+                ds = haversine_distance(points[idx], x[np.newaxis, :])
                 for i in range(len(ds)):
                     if ds[i] < distance_upper_bound:
                         if len(neighbors) == k:
                             heappop(neighbors)
-                        heappush(neighbors, (-ds[i], node.idx[i]))
+                        heappush(neighbors, (-ds[i], idx[i]))
                         if len(neighbors) == k:
                             distance_upper_bound = -neighbors[0][0]
             else:
@@ -1229,10 +1357,11 @@ class HaversineDistanceKDTree(KDTree):
                     # since this is the nearest cell, we're done, bail out
                     break
                 # compute minimum distances to the children and push them on
-                if x[node.split_dim] < node.split:
-                    near, far = node.less, node.greater
+                split_dim, split = self.split_dims[node], self.splits[node]
+                if x[split_dim] < split:
+                    near, far = self.less[node], self.greater[node]
                 else:
-                    near, far = node.greater, node.less
+                    near, far = self.greater[node], self.less[node]
 
                 # near child is at the same distance as the current node
                 heappush(q, (min_distance, side_distances, near))
@@ -1241,13 +1370,13 @@ class HaversineDistanceKDTree(KDTree):
                 # on the split value
                 sd = list(side_distances)
                 if p == np.inf:
-                    min_distance = max(min_distance, abs(node.split - x[node.split_dim]))
+                    min_distance = max(min_distance, abs(split - x[split_dim]))
                 elif p == 1:
-                    sd[node.split_dim] = np.abs(node.split - x[node.split_dim])
-                    min_distance = min_distance - side_distances[node.split_dim] + sd[node.split_dim]
+                    sd[split_dim] = np.abs(split - x[split_dim])
+                    min_distance = min_distance - side_distances[split_dim] + sd[split_dim]
                 else:
-                    sd[node.split_dim] = np.abs(node.split - x[node.split_dim]) ** p
-                    min_distance = min_distance - side_distances[node.split_dim] + sd[node.split_dim]
+                    sd[split_dim] = np.abs(split - x[split_dim]) ** p
+                    min_distance = min_distance - side_distances[split_dim] + sd[split_dim]
 
                 # far child might be too far, if so, don't bother pushing it
                 if min_distance <= distance_upper_bound * epsfac:
@@ -1261,89 +1390,285 @@ class HaversineDistanceKDTree(KDTree):
     def query_ball_tree(self, other, r, p=2., eps=0):
         """Find all pairs of points whose distance is at most r
 
-        :param other: KDTree instance
+        :param other: HaversineDistanceKDTree instance
             The tree containing points to search against.
         :param r: float
             The maximum distance, has to be positive.
         :param p: float (NOT USED)
         :param eps: float, optional
-            Approximate search.  Branches of the tree are not explored
-            if their nearest points are further than ``r/(1+eps)``, and
-            branches are added in bulk if their furthest points are nearer
-            than ``r * (1+eps)``.  `eps` has to be non-negative.
+            Approximate search, see :meth:`query_ball_tree_csr`.
 
         :returns:  list of lists
             For each element ``self.data[i]`` of this tree, ``results[i]`` is a
-            list of the indices of its neighbors in ``other.data``.
+            list of the indices of its neighbors in ``other.data`` (in increasing order).
 
         """
-        results = [[] for i in range(self.n)]
+        indptr, indices, _ = self.query_ball_tree_csr(other, r, eps=eps)
+        indices = indices.tolist()
+        return [indices[start:end] for start, end in zip(indptr[:-1], indptr[1:])]
+
+    def query_ball_tree_csr(self, other, r, eps=0, batch_size=1000000):
+        """Find all pairs of points whose distance is at most r, and the distance between them.
+
+        The two trees are traversed together to find the pairs of nodes whose points could be within r of each other,
+        without looking at the points themselves. The distances between the points of these pairs of nodes are then
+        calculated in large vectorised batches.
+
+        :param other: HaversineDistanceKDTree instance - the tree containing points to search against.
+        :param r: float - the maximum distance (in km), has to be positive.
+        :param eps: float, optional - approximate search. Branches of the tree are not explored if their nearest
+            points are further than ``r/(1+eps)``, and branches are added in bulk if their furthest points are nearer
+            than ``r * (1+eps)``. Only the points actually within r are returned either way.
+        :param batch_size: int, optional - the (approximate) number of pairs of points to calculate the distances
+            between at a time, which bounds the memory used.
+        :returns: indptr, indices, distances - CSR arrays. The indices in ``other.data`` of the neighbours of
+            ``self.data[i]`` are ``indices[indptr[i]:indptr[i + 1]]`` (in increasing order), and their distances (in km)
+            from it are ``distances[indptr[i]:indptr[i + 1]]``.
+        """
+        nodes1, nodes2 = [], []
+        is_leaf1, is_leaf2 = self.split_dims < 0, other.split_dims < 0
 
-        def traverse_checking(node1, rect1, node2, rect2):
+        def traverse(node1, rect1, node2, rect2):
             if rect1.min_distance_rectangle(rect2) > r / (1. + eps):
                 return
-            elif rect1.max_distance_rectangle(rect2) < r * (1. + eps):
-                traverse_no_checking(node1, node2)
-            elif isinstance(node1, KDTree.leafnode):
-                if isinstance(node2, KDTree.leafnode):
-                    d = other.data[node2.idx]
-                    for i in node1.idx:
-                        results[i] += node2.idx[haversine_distance(d, self.data[i]) <= r].tolist()
-                else:
-                    less, greater = rect2.split(node2.split_dim, node2.split)
-                    traverse_checking(node1, rect1, node2.less, less)
-                    traverse_checking(node1, rect1, node2.greater, greater)
-            elif isinstance(node2, KDTree.leafnode):
-                less, greater = rect1.split(node1.split_dim, node1.split)
-                traverse_checking(node1.less, less, node2, rect2)
-                traverse_checking(node1.greater, greater, node2, rect2)
-            else:
-                less1, greater1 = rect1.split(node1.split_dim, node1.split)
-                less2, greater2 = rect2.split(node2.split_dim, node2.split)
-                traverse_checking(node1.less, less1, node2.less, less2)
-                traverse_checking(node1.less, less1, node2.greater, greater2)
-                traverse_checking(node1.greater, greater1, node2.less, less2)
-                traverse_checking(node1.greater, greater1, node2.greater, greater2)
-
-        def traverse_no_checking(node1, node2):
-            if isinstance(node1, KDTree.leafnode):
-                if isinstance(node2, KDTree.leafnode):
-                    for i in node1.idx:
-                        results[i] += node2.idx.tolist()
-                else:
-                    traverse_no_checking(node1, node2.less)
-                    traverse_no_checking(node1, node2.greater)
+            elif (is_leaf1[node1] and is_leaf2[node2]) or rect1.max_distance_rectangle(rect2) < r * (1. + eps):
+                # The points of each node are contiguous, so there is no need to go down to the leaves
+                nodes1.append(node1)
+                nodes2.append(node2)
+            elif is_leaf1[node1]:
+                less, greater = rect2.split(other.split_dims[node2], other.splits[node2])
+                traverse(node1, rect1, other.less[node2], less)
+                traverse(node1, rect1, other.greater[node2], greater)
+            elif is_leaf2[node2]:
+                less, greater = rect1.split(self.split_dims[node1], self.splits[node1])
+                traverse(self.less[node1], less, node2, rect2)
+                traverse(self.greater[node1], greater, node2, rect2)
             else:
-                traverse_no_checking(node1.less, node2)
-                traverse_no_checking(node1.greater, node2)
+                less1, greater1 = rect1.split(self.split_dims[node1], self.splits[node1])
+                less2, greater2 = rect2.split(other.split_dims[node2], other.splits[node2])
+                traverse(self.less[node1], less1, other.less[node2], less2)
+                traverse(self.less[node1], less1, other.greater[node2], greater2)
+                traverse(self.greater[node1], greater1, other.less[node2], less2)
+                traverse(self.greater[node1], greater1, other.greater[node2], greater2)
+
+        traverse(0, RectangleHaversine(self.maxes, self.mins), 0, RectangleHaversine(other.maxes, other.mins))
+        nodes1 = np.array(nodes1, dtype=np.intp)
+        nodes2 = np.array(nodes2, dtype=np.intp)
+
+        # The number of pairs of points in each pair of nodes, and where they start in the list of all of them
+        counts = (self.ends[nodes1] - self.starts[nodes1]) * (other.ends[nodes2] - other.starts[nodes2])
+        offsets = np.zeros(len(counts) + 1, dtype=np.intp)
+        np.cumsum(counts, out=offsets[1:])
+
+        points, other_points = np.ma.getdata(self.data), np.ma.getdata(other.data)
+        rows, columns, distances = [np.empty(0, dtype=np.intp)], [np.empty(0, dtype=np.intp)], [np.empty(0)]
+        start = 0
+        while start < len(counts):
+            # Take as many pairs of nodes as fit in the batch (but always at least one)
+            stop = max(np.searchsorted(offsets, offsets[start] + batch_size, side='right') - 1, start + 1)
+            i, j = self._get_point_pairs(other, nodes1[start:stop], nodes2[start:stop])
+            d = haversine(points[i], other_points[j])
+            within = d <= r
+            rows.append(i[within])
+            columns.append(j[within])
+            distances.append(d[within])
+            start = stop
+
+        rows, columns, distances = np.concatenate(rows), np.concatenate(columns), np.concatenate(distances)
+        order = np.lexsort((columns, rows))
+        indptr = np.zeros(self.n + 1, dtype=np.intp)
+        np.cumsum(np.bincount(rows, minlength=self.n), out=indptr[1:])
+        return indptr, columns[order], distances[order]
+
+    def _get_point_pairs(self, other, nodes1, nodes2):
+        """
+        Get every pair of points from pairs of nodes of this and another tree.
 
-        traverse_checking(self.tree, RectangleHaversine(self.maxes, self.mins),
-                          other.tree, RectangleHaversine(other.maxes, other.mins))
-        return results
+        :param other: HaversineDistanceKDTree instance - the tree of the second node of each pair
+        :param nodes1: array of nodes of this tree
+        :param nodes2: array of nodes of the other tree
+        :return: i, j - arrays of the indices in ``self.data`` and ``other.data`` of each pair of points
+        """
+        counts2 = other.ends[nodes2] - other.starts[nodes2]
+        counts = (self.ends[nodes1] - self.starts[nodes1]) * counts2
+        node_pair = np.repeat(np.arange(len(counts)), counts)
+        # The position of each pair of points within the pairs of its nodes, which gives the position of each point
+        #  within its node
+        position = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        i = self.indices[self.starts[nodes1][node_pair] + position // counts2[node_pair]]
+        j = other.indices[other.starts[nodes2][node_pair] + position % counts2[node_pair]]
+        return i, j
 
     def _query_ball_point(self, x, r, p=2., eps=0):
         R = RectangleHaversine(self.maxes, self.mins)
+        points = np.ma.getdata(self.data)
+        indices, starts, ends = self.indices, self.starts, self.ends
+        split_dims, splits, less_nodes, greater_nodes = self.split_dims, self.splits, self.less, self.greater
 
         def traverse_checking(node, rect):
             if rect.min_distance_point(x, p) > r / (1. + eps):
                 return []
             elif rect.max_distance_point(x, p) < r * (1. + eps):
-                return traverse_no_checking(node)
-            elif isinstance(node, KDTree.leafnode):
-                d = self.data[node.idx]
-                return node.idx[haversine_distance(d, x) <= r].tolist()
+                return indices[starts[node]:ends[node]].tolist()
+            elif split_dims[node] < 0:
+                idx = indices[starts[node]:ends[node]]
+                return idx[haversine_distance(points[idx], x) <= r].tolist()
             else:
-                less, greater = rect.split(node.split_dim, node.split)
-                return traverse_checking(node.less, less) + traverse_checking(node.greater, greater)
+                less, greater = rect.split(split_dims[node], splits[node])
+                return traverse_checking(less_nodes[node], less) + traverse_checking(greater_nodes[node], greater)
 
-        def traverse_no_checking(node):
-            if isinstance(node, KDTree.leafnode):
-                return node.idx.tolist()
-            else:
-                return traverse_no_checking(node.less) + \
-                       traverse_no_checking(node.greater)
+        return traverse_checking(0, R)
 
-        return traverse_checking(self.tree, R)
+
+def lat_lon_to_unit_vectors(x):
+    """Converts latitude, longitude points to Cartesian points on the unit sphere
+    :param x: point or array of points, each as array of latitude, longitude in degrees
+    :return: array of the same shape as x but with a last dimension of length 3 (x, y, z)
+    """
+    x = np.radians(np.asarray(x, dtype=np.float64))
+    lat, lon = x[..., 0], x[..., 1]
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def haversine_distance_to_chord(distance):
+    """Converts a distance along the Earth's surface to the length of the chord between the two points on the
+    unit sphere
+    :param distance: distance (or array of distances) in kilometres
+    :return: chord length on the unit sphere
+    """
+    distance = np.asarray(distance, dtype=np.float64)
+    chord = 2.0 * np.sin(np.minimum(distance / (2.0 * RADIUS_EARTH), HALF_PI))
+    return np.where(np.isinf(distance), np.inf, chord)
+
+
+def chord_to_haversine_distance(chord):
+    """Converts the length of a chord on the unit sphere to the distance along the Earth's surface
+    :param chord: chord length (or array of lengths) on the unit sphere
+    :return: distance in kilometres
+    """
+    chord = np.asarray(chord, dtype=np.float64)
+    distance = 2.0 * RADIUS_EARTH * np.arcsin(np.minimum(chord / 2.0, 1.0))
+    return np.where(np.isinf(chord), np.inf, distance)
+
+
+class UnitSphereKDTree(object):
+    """k-D tree for querying by distance along the Earth's surface, built with the compiled scipy.spatial.cKDTree.
+
+    The latitude, longitude points are mapped to 3D points on the unit sphere. Since the chord length between two
+    points increases monotonically with the distance along the surface, distances are converted to chord lengths for
+    the query and the results are identical to those of :class:`HaversineDistanceKDTree`. The query methods accept the
+    same arguments and return the same values as that class.
+    """
+
+    def __init__(self, data, leafsize=10, mask=None):
+        from scipy.spatial import cKDTree
+        self.data = np.ma.asarray(data)
+        if mask is not None:
+            self.data.mask = np.column_stack([mask] * data.shape[1])
+        self.n, self.m = np.shape(self.data)
+        self.leafsize = int(leafsize)
+        if self.leafsize < 1:
+            raise ValueError("leafsize must be at least 1")
+
+        # The indices in data of the points in the tree, plus a final entry for 'no point found'
+        indices = np.arange(self.n)
+        if mask is not None:
+            indices = indices[~np.asarray(mask, dtype=bool)]
+        self._indices = np.append(indices, self.n)
+        self.tree = cKDTree(lat_lon_to_unit_vectors(np.ma.getdata(self.data)[indices]), leafsize=self.leafsize)
+
+    def query(self, x, k=1, eps=0, p=2, distance_upper_bound=np.inf):
+        """
+        Query the tree for nearest neighbours
+
+        :param x: array_like, last dimension 2 - an array of latitude, longitude points to query.
+        :param k: integer - the number of nearest neighbours to return.
+        :param eps: nonnegative float - return approximate nearest neighbours; the kth returned value
+            is guaranteed to be no further than (1+eps) times the distance to the real kth nearest neighbour.
+        :param p: float (NOT USED)
+        :param distance_upper_bound: nonnegative float - return only neighbours within this distance (in km).
+        :returns: d, i - the distances (in km) to and indices of the nearest neighbours. Missing neighbours are
+            indicated with infinite distances and an index of self.n.
+        """
+        chords, indices = self.tree.query(lat_lon_to_unit_vectors(x), k=k, eps=eps,
+                                          distance_upper_bound=haversine_distance_to_chord(distance_upper_bound))
+        return chord_to_haversine_distance(chords), self._indices[indices]
+
+    def query_ball_point(self, x, r, p=2., eps=0):
+        """Find all points within distance r of point(s) x.
+
+        :param x: array_like, shape tuple + (2,) - the latitude, longitude point or points to search for neighbours of.
+        :param r: positive float - the radius (in km) of points to return.
+        :param p: float (NOT USED)
+        :param eps: nonnegative float, optional - approximate search.
+        :returns: list or array of lists - if `x` is a single point, returns a list of the indices of the neighbours
+            of `x`. If `x` is an array of points, returns an object array of shape tuple containing lists of neighbours.
+        """
+        x = np.asarray(x)
+        neighbours = self.tree.query_ball_point(lat_lon_to_unit_vectors(x), haversine_distance_to_chord(r), eps=eps)
+        if x.ndim == 1:
+            return self._indices[neighbours].tolist()
+        result = np.empty(x.shape[:-1], dtype=object)
+        for c in np.ndindex(result.shape):
+            result[c] = self._indices[neighbours[c]].tolist()
+        return result
+
+    def query_ball_tree(self, other, r, p=2., eps=0):
+        """Find all pairs of points whose distance is at most r
+
+        :param other: UnitSphereKDTree instance - the tree containing points to search against.
+        :param r: float - the maximum distance (in km), has to be positive.
+        :param p: float (NOT USED)
+        :param eps: float, optional - approximate search.
+        :returns:  list of lists - for each element ``self.data[i]`` of this tree, ``results[i]`` is a
+            list of the indices of its neighbors in ``other.data``.
+        """
+        results = [[] for i in range(self.n)]
+        neighbours = self.tree.query_ball_tree(other.tree, haversine_distance_to_chord(r), eps=eps)
+        for i, neighbour_indices in zip(self._indices, neighbours):
+            results[i] = other._indices[neighbour_indices].tolist()
+        return results
+
+    def query_ball_tree_csr(self, other, r, eps=0):
+        """Find all pairs of points whose distance is at most r, and the distance between them.
+
+        :param other: UnitSphereKDTree instance - the tree containing points to search against.
+        :param r: float - the maximum distance (in km), has to be positive.
+        :param eps: float, optional - approximate search, only the points actually within r are returned.
+        :returns: indptr, indices, distances - CSR arrays. The indices in ``other.data`` of the neighbours of
+            ``self.data[i]`` are ``indices[indptr[i]:indptr[i + 1]]`` (in increasing order), and their distances (in km)
+            from it are ``distances[indptr[i]:indptr[i + 1]]``.
+        """
+        if eps == 0:
+            # The compiled tree gives the distances of the pairs it finds
+            rows, columns, distances = self.sparse_distance_matrix(other, r)
+        else:
+            # Only the ball query supports approximate search, so calculate the distances of the pairs it finds
+            neighbours = self.tree.query_ball_tree(other.tree, haversine_distance_to_chord(r), eps=eps)
+            counts = np.fromiter((len(n) for n in neighbours), dtype=np.intp, count=len(neighbours))
+            rows = np.repeat(self._indices[:-1], counts)
+            columns = other._indices[np.fromiter((j for n in neighbours for j in n), dtype=np.intp,
+                                                 count=counts.sum())]
+            distances = haversine(np.ma.getdata(self.data)[rows], np.ma.getdata(other.data)[columns])
+            within = distances <= r
+            rows, columns, distances = rows[within], columns[within], distances[within]
+        order = np.lexsort((columns, rows))
+        indptr = np.zeros(self.n + 1, dtype=np.intp)
+        np.cumsum(np.bincount(rows, minlength=self.n), out=indptr[1:])
+        return indptr, columns[order], distances[order]
+
+    def sparse_distance_matrix(self, other, max_distance):
+        """Find the distances between all pairs of points which are at most max_distance apart.
+
+        :param other: UnitSphereKDTree instance - the tree containing points to search against.
+        :param max_distance: positive float - the maximum distance (in km).
+        :returns: i, j, d - numpy arrays of the indices in ``self.data`` and ``other.data`` of each pair of points,
+            and the distance (in km) between them.
+        """
+        pairs = self.tree.sparse_distance_matrix(other.tree, haversine_distance_to_chord(max_distance),
+                                                 output_type='ndarray')
+        return self._indices[pairs['i']], other._indices[pairs['j']], chord_to_haversine_distance(pairs['v'])
 
 
 def distance_matrix(x, y, p=2, threshold=1000000):
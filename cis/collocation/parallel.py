@@ -0,0 +1,98 @@
+"""
+Helpers for running independent parts of a collocation or aggregation in a pool of worker processes.
+
+The worker processes are forked from the main process so that large read-only objects (such as the data points and
+their spatial index) are shared with the workers rather than being copied to each of them.
+"""
+import logging
+import multiprocessing
+
+import numpy as np
+
+# The function and arguments shared with the forked worker processes, see map_in_processes
+_shared_call = None
+
+
+def _interleave_bits(x):
+    """
+    Spread the lower 16 bits of each element of x out so that there is a zero bit between each of them.
+    """
+    x = x.astype(np.uint32) & 0x0000ffff
+    x = (x | (x << 8)) & 0x00ff00ff
+    x = (x | (x << 4)) & 0x0f0f0f0f
+    x = (x | (x << 2)) & 0x33333333
+    x = (x | (x << 1)) & 0x55555555
+    return x
+
+
+def spatial_order(latitudes, longitudes):
+    """
+    Find the order of points along a Morton (Z-order) space filling curve, so that points which are near each other
+    in the order are also near each other in space.
+
+    :param latitudes: numpy array of latitudes
+    :param longitudes: numpy array of longitudes
+    :return: numpy array of indices which sort the points into space filling curve order
+    """
+    def quantise(values):
+        values = np.asarray(values, dtype=np.float64)
+        v_min, v_max = np.nanmin(values), np.nanmax(values)
+        scale = 0xffff / (v_max - v_min) if v_max > v_min else 0.0
+        return np.nan_to_num((values - v_min) * scale)
+
+    codes = _interleave_bits(quantise(latitudes)) | (_interleave_bits(quantise(longitudes)) << 1)
+    return np.argsort(codes, kind='mergesort')
+
+
+def spatial_shards(latitudes, longitudes, n_shards):
+    """
+    Split a set of points into spatially coherent shards of (roughly) equal size.
+
+    :param latitudes: numpy array of latitudes
+    :param longitudes: numpy array of longitudes
+    :param int n_shards: The number of shards to split the points into
+    :return: A list of numpy arrays of point indices, one for each (non-empty) shard
+    """
+    order = spatial_order(latitudes, longitudes)
+    return [shard for shard in np.array_split(order, n_shards) if shard.size > 0]
+
+
+def _call_shared(task):
+    func, shared_args = _shared_call
+    return func(*(shared_args + (task,)))
+
+
+def map_in_processes(func, tasks, workers, *shared_args):
+    """
+    Call ``func(*shared_args, task)`` for each task, using a pool of worker processes. The shared arguments are not
+    pickled but inherited by the (forked) worker processes, so they are not copied unless they are modified. Only
+    the tasks and the results are sent between the processes.
+
+    If there is only one worker, or processes can't be forked on this platform, the tasks are run in this process.
+
+    :param func: The function to call
+    :param list tasks: The tasks, each of which must be picklable
+    :param int workers: The maximum number of worker processes to use
+    :param shared_args: Arguments passed to every call of func
+    :return list: The results of each call, in the same order as the tasks
+    """
+    global _shared_call
+    workers = min(int(workers), len(tasks))
+    if workers > 1:
+        try:
+            context = multiprocessing.get_context('fork')
+        except ValueError:
+            logging.warning("Unable to fork worker processes on this platform, running in a single process")
+        else:
+            logging.info("    Running {} tasks in {} worker processes".format(len(tasks), workers))
+            _shared_call = (func, shared_args)
+            pool = context.Pool(workers)
+            try:
+                results = pool.map(_call_shared, tasks, chunksize=1)
+                pool.close()
+                return results
+            finally:
+                pool.terminate()
+                pool.join()
+                _shared_call = None
+    return [func(*(shared_args + (task,))) for task in tasks]
@@ -0,0 +1,185 @@
+"""
+Reductions over contiguous segments of a flattened array of values.
+
+Segments are described in the compressed sparse row (CSR) style: the values belonging to segment ``i`` are
+``values[indptr[i]:indptr[i + 1]]``. This allows a kernel to be applied to every sample point (or grid cell) at once
+rather than calling it once per point. Empty segments give NaN, which the collocators subsequently mask.
+"""
+import itertools
+
+import numpy as np
+
+
+def csr_from_lists(lists):
+    """
+    Flatten a list of lists of indices into CSR (indptr, indices) arrays.
+
+    :param lists: A list (or object array) of lists of integer indices
+    :return: Tuple of (indptr, indices) numpy arrays
+    """
+    counts = np.fromiter((len(l) for l in lists), dtype=np.intp, count=len(lists))
+    indptr = np.zeros(len(counts) + 1, dtype=np.intp)
+    np.cumsum(counts, out=indptr[1:])
+    indices = np.fromiter(itertools.chain.from_iterable(lists), dtype=np.intp, count=indptr[-1])
+    return indptr, indices
+
+
+def segment_ids(indptr):
+    """
+    Return the segment number of every element of the flattened values array.
+
+    :param indptr: The segment boundaries (of length number of segments + 1)
+    :return: An integer array of length ``indptr[-1]``
+    """
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+
+def compress_segments(indptr, keep):
+    """
+    Remove elements from a set of segments, returning the new segment boundaries.
+
+    :param indptr: The original segment boundaries
+    :param keep: Boolean array over the flattened elements, True for elements to keep
+    :return: The segment boundaries after the elements which are not kept have been removed
+    """
+    kept_counts = np.bincount(segment_ids(indptr)[keep], minlength=len(indptr) - 1)
+    new_indptr = np.zeros(len(indptr), dtype=np.intp)
+    np.cumsum(kept_counts, out=new_indptr[1:])
+    return new_indptr
+
+
+def _reduce_segments(ufunc, values, indptr):
+    """
+    Apply a ufunc reduction to each non-empty segment, returning NaN for the empty ones.
+    """
+    counts = np.diff(indptr)
+    non_empty = counts > 0
+    result = np.full(len(counts), np.nan)
+    if np.any(non_empty):
+        # Only the starts of non-empty segments are used, so each reduction runs up to the start of the next one
+        result[non_empty] = ufunc.reduceat(np.asarray(values, dtype=np.float64), indptr[:-1][non_empty])
+    return result
+
+
+def segment_count(values, indptr):
+    """
+    The number of values in each segment, NaN for empty segments.
+    """
+    counts = np.diff(indptr).astype(np.float64)
+    counts[counts == 0] = np.nan
+    return counts
+
+
+def segment_sum(values, indptr):
+    """
+    The sum of the values in each segment.
+    """
+    return _reduce_segments(np.add, values, indptr)
+
+
+def segment_min(values, indptr):
+    """
+    The minimum of the values in each segment.
+    """
+    return _reduce_segments(np.minimum, values, indptr)
+
+
+def segment_max(values, indptr):
+    """
+    The maximum of the values in each segment.
+    """
+    return _reduce_segments(np.maximum, values, indptr)
+
+
+def segment_mean(values, indptr):
+    """
+    The mean of the values in each segment.
+    """
+    return segment_sum(values, indptr) / segment_count(values, indptr)
+
+
+def segment_weighted_mean(values, weights, indptr):
+    """
+    The weighted mean of the values in each segment, NaN for segments whose weights sum to zero.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return segment_sum(np.asarray(values, dtype=np.float64) * weights, indptr) / segment_sum(weights, indptr)
+
+
+def segment_sum_of_squared_deviations(values, indptr):
+    """
+    The sum of the squared deviations from the mean (often called M2) of the values in each segment, calculated with
+    two passes for numerical accuracy.
+    """
+    mean = segment_mean(values, indptr)
+    deviations = np.asarray(values, dtype=np.float64) - np.repeat(mean, np.diff(indptr))
+    return segment_sum(deviations ** 2, indptr)
+
+
+def segment_std(values, indptr, ddof=1):
+    """
+    The standard deviation of the values in each segment, calculated with two passes for numerical accuracy.
+    Segments with no more than ``ddof`` values give NaN.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = segment_sum_of_squared_deviations(values, indptr) / (np.diff(indptr) - ddof)
+        variance[np.diff(indptr) <= ddof] = np.nan
+    return np.sqrt(variance)
+
+
+def sort_segments(values, indptr):
+    """
+    Sort the values within each segment (with a single sort over all of the segments), NaNs last.
+
+    :return: A copy of the values, sorted within each segment
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return values[np.lexsort((values, segment_ids(indptr)))]
+
+
+def segment_percentile(values, indptr, q):
+    """
+    The q-th percentile of the values in each segment, linearly interpolating between the nearest values in the same
+    way as :func:`numpy.percentile`.
+
+    :param q: The percentile, between 0 and 100
+    """
+    sorted_values = sort_segments(values, indptr)
+    counts = np.diff(indptr)
+    non_empty = counts > 0
+    result = np.full(len(counts), np.nan)
+    if np.any(non_empty):
+        # The (fractional) position of the percentile in each sorted segment
+        position = indptr[:-1][non_empty] + (counts[non_empty] - 1) * (q / 100.0)
+        below = np.floor(position).astype(np.intp)
+        above = np.ceil(position).astype(np.intp)
+        fraction = position - below
+        result[non_empty] = sorted_values[below] + (sorted_values[above] - sorted_values[below]) * fraction
+    return result
+
+
+def segment_median(values, indptr):
+    """
+    The median of the values in each segment.
+    """
+    return segment_percentile(values, indptr, 50)
+
+
+def segment_argmin(values, indptr):
+    """
+    The position (in the flattened values) of the first minimum of each segment, ignoring NaNs. Segments which are
+    empty or contain only NaNs give -1.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    counts = np.diff(indptr)
+    result = np.full(len(counts), -1, dtype=np.intp)
+    non_empty = counts > 0
+    if np.any(non_empty):
+        starts = indptr[:-1][non_empty]
+        minima = np.fmin.reduceat(values, starts)
+        is_minimum = values == np.repeat(minima, counts[non_empty])
+        positions = np.where(is_minimum, np.arange(values.size), values.size)
+        first = np.minimum.reduceat(positions, starts)
+        result[non_empty] = np.where(first < values.size, first, -1)
+    return result
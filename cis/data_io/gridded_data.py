@@ -345,7 +345,8 @@ class GriddedData(iris.cube.Cube, CommonData):
         return subset(self, GriddedSubsetConstraint, **kwargs)
 
     def sampled_from(self, data, how='', kernel=None, missing_data_for_missing_sample=True, fill_value=None,
-                     var_name='', var_long_name='', var_units='', **kwargs):
+                     var_name='', var_long_name='', var_units='', workers=1, chunk_size=None, output_file=None,
+                     **kwargs):
         """
         Collocate the CommonData object with another CommonData object using the specified collocator and kernel
 
@@ -357,11 +358,25 @@ class GriddedData(iris.cube.Cube, CommonData):
         :param str var_name: The output variable name
         :param str var_long_name: The output variable's long name
         :param str var_units: The output variable's units
-        :return CommonData: The collocated dataset
+        :param int workers: Collocation onto a gridded sample always runs in a single process, so a warning is logged
+            if more workers are given
+        :param int chunk_size: If given, collocate this many time steps at a time and write the output of each block to
+            output_file as it is completed, rather than returning it. Only gridded -> gridded collocation supports this.
+        :param str output_file: The file to write to when collocating in blocks
+        :return CommonData: The collocated dataset, or None if it was written to output_file
         """
         from cis.collocation import col_implementations as ci
         from cis.data_io.ungridded_data import UngriddedData, UngriddedDataList
-        from cis.collocation.col import collocate, get_kernel
+        from cis.collocation.col import collocate, collocate_to_file, get_kernel
+
+        if chunk_size is not None and not (isinstance(data, GriddedData) or isinstance(data, GriddedDataList)):
+            raise ValueError("Chunked collocation onto a gridded sample is only available for gridded -> gridded "
+                             "collocation")
+        if chunk_size is not None and output_file is None:
+            raise ValueError("An output file must be given for chunked collocation")
+        if int(workers) > 1:
+            logging.warning("Only ungridded -> ungridded collocation can use more than one worker process, "
+                            "collocating in a single process")
 
         if isinstance(data, UngriddedData) or isinstance(data, UngriddedDataList):
             col_cls = ci.GeneralGriddedCollocator
@@ -386,6 +401,8 @@ class GriddedData(iris.cube.Cube, CommonData):
                 kernel = ci.gridded_gridded_li()
             elif how == 'nn':
                 kernel = ci.gridded_gridded_nn()
+            elif how == 'conservative':
+                kernel = ci.gridded_gridded_conservative()
             else:
                 raise ValueError("Invalid method specified for gridded -> gridded collocation: " + how)
         else:
@@ -394,6 +411,8 @@ class GriddedData(iris.cube.Cube, CommonData):
         col = col_cls(missing_data_for_missing_sample=missing_data_for_missing_sample, fill_value=fill_value,
                       var_name=var_name, var_long_name=var_long_name, var_units=var_units)
 
+        if chunk_size is not None:
+            return collocate_to_file(data, self, col, con, kernel, output_file, chunk_size)
         return collocate(data, self, col, con, kernel)
 
     def _get_default_plot_type(self, lat_lon=False):
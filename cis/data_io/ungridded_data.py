@@ -780,7 +780,7 @@ class UngriddedData(LazyData, CommonData):
         from cis.subsetting.subset import subset, UngriddedSubsetConstraint
         return subset(self, UngriddedSubsetConstraint, **kwargs)
 
-    def aggregate(self, how=None, **kwargs):
+    def aggregate(self, how=None, workers=1, **kwargs):
         """
         Aggregate the UngriddedData object based on the specified grids. The grid is defined by passing keyword
         arguments for each dimension, each argument must be a slice, or have three entries (a maximum, a minimum and a
@@ -801,10 +801,11 @@ class UngriddedData(LazyData, CommonData):
             data.aggregate(how='mean', t=[PartialDateTime(2008,9), timedelta(days=1))
 
         :param str how: The kernel to use in the aggregation (moments, mean, min, etc...). Default is moments
+        :param int workers: The number of worker processes to aggregate with
         :param kwargs: The grid specifications for each coordinate dimension
         :return GriddedData:
         """
-        agg = _aggregate_ungridded(self, how, **kwargs)
+        agg = _aggregate_ungridded(self, how, workers=workers, **kwargs)
         # Return the single item if there's only one (this depends on the kernel used)
         if len(agg) == 1:
             agg = agg[0]
@@ -1125,7 +1126,7 @@ class UngriddedDataList(CommonDataList):
         from cis.subsetting.subset import subset, UngriddedSubsetConstraint
         return subset(self, UngriddedSubsetConstraint, **kwargs)
 
-    def aggregate(self, how='', **kwargs):
+    def aggregate(self, how='', workers=1, **kwargs):
         """
         Aggregate the UngriddedDataList object based on the specified grids. The grid is defined by passing keyword
         arguments for each dimension, each argument must be a slice, or have three entries (a maximum, a minimum and a
@@ -1146,10 +1147,11 @@ class UngriddedDataList(CommonDataList):
             data.aggregate(how='mean', t=[PartialDateTime(2008,9), timedelta(days=1))
 
         :param str how: The kernel to use in the aggregation (moments, mean, min, etc...)
+        :param int workers: The number of worker processes to aggregate with
         :param kwargs: The grid specifications for each coordinate dimension
         :return GriddedDataList:
         """
-        return _aggregate_ungridded(self, how, **kwargs)
+        return _aggregate_ungridded(self, how, workers=workers, **kwargs)
 
 
 def _coords_as_data_frame(coord_list, copy=True, time_index=True):
@@ -1211,7 +1213,8 @@ def _to_flat_ndarray(data, copy=True):
 
 
 def _ungridded_sampled_from(sample, data, how='', kernel=None, missing_data_for_missing_sample=True, fill_value=None,
-                            var_name='', var_long_name='', var_units='', **kwargs):
+                            var_name='', var_long_name='', var_units='', workers=1, chunk_size=None, output_file=None,
+                            **kwargs):
     """
     Collocate the CommonData object with another CommonData object using the specified collocator and kernel
 
@@ -1223,16 +1226,29 @@ def _ungridded_sampled_from(sample, data, how='', kernel=None, missing_data_for_
     :param str var_name: The output variable name
     :param str var_long_name: The output variable's long name
     :param str var_units: The output variable's units
-    :return CommonData: The collocated dataset
+    :param int workers: The number of worker processes to use for ungridded -> ungridded collocation. Gridded ->
+        ungridded collocation always runs in a single process, so a warning is logged if more workers are given.
+    :param int chunk_size: If given, collocate this many sample points at a time and write the output of each chunk to
+        output_file as it is completed, rather than returning it. Only ungridded -> ungridded collocation onto an
+        ungridded sample supports this.
+    :param str output_file: The file to write to when collocating in chunks
+    :return CommonData: The collocated dataset, or None if it was written to output_file
     """
     from cis.collocation import col_implementations as ci
     from cis.data_io.gridded_data import GriddedData, GriddedDataList
-    from cis.collocation.col import collocate, get_kernel
+    from cis.collocation.col import collocate, collocate_to_file, get_kernel
+
+    if chunk_size is not None and not (isinstance(data, UngriddedData) or isinstance(data, UngriddedDataList)):
+        raise ValueError("Chunked collocation onto an ungridded sample is only available for ungridded -> ungridded "
+                         "collocation")
+    if chunk_size is not None and output_file is None:
+        raise ValueError("An output file must be given for chunked collocation")
 
     if isinstance(data, UngriddedData) or isinstance(data, UngriddedDataList):
         col = ci.GeneralUngriddedCollocator(fill_value=fill_value, var_name=var_name, var_long_name=var_long_name,
                                             var_units=var_units,
-                                            missing_data_for_missing_sample=missing_data_for_missing_sample)
+                                            missing_data_for_missing_sample=missing_data_for_missing_sample,
+                                            workers=workers)
 
         # Box is the default, and only option for ungridded -> ungridded collocation
         if how not in ['', 'box']:
@@ -1241,6 +1257,9 @@ def _ungridded_sampled_from(sample, data, how='', kernel=None, missing_data_for_
         # We can have any kernel, default to moments
         kernel = get_kernel(kernel)
     elif isinstance(data, GriddedData) or isinstance(data, GriddedDataList):
+        if int(workers) > 1:
+            logging.warning("Only ungridded -> ungridded collocation can use more than one worker process, "
+                            "collocating in a single process")
         col = ci.GriddedUngriddedCollocator(fill_value=fill_value, var_name=var_name, var_long_name=var_long_name,
                                             var_units=var_units,
                                             missing_data_for_missing_sample=missing_data_for_missing_sample)
@@ -1249,26 +1268,81 @@ def _ungridded_sampled_from(sample, data, how='', kernel=None, missing_data_for_
     else:
         raise ValueError("Invalid argument, data must be either GriddedData or UngriddedData")
 
+    if chunk_size is not None:
+        return collocate_to_file(data, sample, col, con, kernel, output_file, chunk_size)
     return collocate(data, sample, col, con, kernel)
 
 
-def _aggregate_ungridded(data, how, **kwargs):
+def _aggregate_ungridded(data, how, workers=1, **kwargs):
     """
     Aggregate an UngriddedData or UngriddedDataList based on the specified grids
     :param UngriddedData or UngriddedDataList data: The data object to aggregate
     :param cis.collocation.col_framework.Kernel kernel: The kernel to use in the aggregation
+    :param int workers: The number of worker processes to aggregate with. Partitions of the data are aggregated in
+     each process and then merged, this is only possible for the moments, mean, stddev, min, max and sum kernels.
     :param kwargs: The grid specifications for each coordinate dimension
     :return:
     """
     from cis.aggregation.ungridded_aggregator import UngriddedAggregator
     from cis.collocation.col import get_kernel
+
+    kernel = get_kernel(how)
+    grid_spec = _get_aggregation_grid_spec(data, kwargs)
+
+    # We have to make the history before doing the aggregation as the grid dims get popped-off during the operation
+    history = _get_aggregation_history(data, grid_spec, kernel)
+
+    aggregator = UngriddedAggregator(grid_spec, workers)
+    data = aggregator.aggregate(data, kernel)
+
+    data.add_history(history)
+
+    return data
+
+
+def _aggregate_ungridded_in_chunks(chunks, how, workers=1, **kwargs):
+    """
+    Aggregate a sequence of UngriddedData or UngriddedDataList chunks (e.g. one for each file) based on the specified
+    grids, without holding more than one of the chunks in memory at a time.
+    :param chunks: An iterable of UngriddedData or UngriddedDataList objects with the same variables and coordinates
+    :param str how: The kernel to use in the aggregation, one of moments, mean, stddev, min, max or sum
+    :param int workers: The number of worker processes to aggregate each chunk with
+    :param kwargs: The grid specifications for each coordinate dimension. The start and end of each must be given.
+    :return GriddedDataList:
+    """
+    from cis.aggregation.ungridded_aggregator import StreamingUngriddedAggregator
+    from cis.collocation.col import get_kernel
+
+    kernel = get_kernel(how)
+    chunks = iter(chunks)
+    first_chunk = next(chunks)
+    grid_spec = _get_aggregation_grid_spec(first_chunk, kwargs, use_data_range=False)
+    history = _get_aggregation_history(first_chunk, grid_spec, kernel)
+
+    aggregator = StreamingUngriddedAggregator(grid_spec, kernel, workers)
+    aggregator.add(first_chunk)
+    # Don't keep a reference to the first chunk while the rest are aggregated
+    del first_chunk
+    data = aggregator.aggregate(chunks)
+
+    data.add_history(history)
+
+    return data
+
+
+def _get_aggregation_grid_spec(data, grids, use_data_range=True):
+    """
+    Create the aggregation grid specification from the (user) grid arguments.
+    :param data: The data to aggregate
+    :param dict grids: The grid arguments for each coordinate dimension
+    :param bool use_data_range: Default the start and end of the grid to the range of the data
+    :return dict: A slice of (start, end, step) for each coordinate name
+    """
     from cis.time_util import PartialDateTime
     from datetime import datetime, timedelta
-    from cis import __version__
 
-    kernel = get_kernel(how)
     grid_spec = {}
-    for dim_name, grid in kwargs.items():
+    for dim_name, grid in grids.items():
         c = data._get_coord(dim_name)
         if all(hasattr(grid, att) for att in ('start', 'stop', 'step')):
             g = grid
@@ -1280,11 +1354,15 @@ def _aggregate_ungridded(data, how, **kwargs):
             raise ValueError("Invalid subset arguments: {}".format(grid))
 
         # Fill in defaults
-        grid_start = g.start if g.start is not None else c.points.min()
+        grid_start = g.start
+        if grid_start is None and use_data_range:
+            grid_start = c.points.min()
         if isinstance(grid_start, datetime):
             grid_start = c.units.date2num(grid_start)
 
-        grid_end = g.stop if g.stop is not None else c.points.max()
+        grid_end = g.stop
+        if grid_end is None and use_data_range:
+            grid_end = c.points.max()
         if isinstance(grid_end, datetime):
             grid_end = c.units.date2num(grid_end)
 
@@ -1298,17 +1376,13 @@ def _aggregate_ungridded(data, how, **kwargs):
             grid_step = grid_step.total_seconds() / (24*60*60)
 
         grid_spec[c.name()] = slice(grid_start, grid_end, grid_step)
+    return grid_spec
 
-    # We have to make the history before doing the aggregation as the grid dims get popped-off during the operation
-    history = "Aggregated using CIS version " + __version__ + \
-              "\n variables: " + str(getattr(data, "var_name", "Unknown")) + \
-              "\n from files: " + str(getattr(data, "filenames", "Unknown")) + \
-              "\n using new grid: " + str(grid_spec) + \
-              "\n with kernel: " + str(kernel) + "."
-
-    aggregator = UngriddedAggregator(grid_spec)
-    data = aggregator.aggregate(data, kernel)
 
-    data.add_history(history)
-
-    return data
+def _get_aggregation_history(data, grid_spec, kernel):
+    from cis import __version__
+    return "Aggregated using CIS version " + __version__ + \
+           "\n variables: " + str(getattr(data, "var_name", "Unknown")) + \
+           "\n from files: " + str(getattr(data, "filenames", "Unknown")) + \
+           "\n using new grid: " + str(grid_spec) + \
+           "\n with kernel: " + str(kernel) + "."
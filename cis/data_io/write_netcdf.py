@@ -86,16 +86,37 @@ def __check_disk_space(filepath, data):
                             .format(path=filepath, free=sizeof_fmt(available), size=sizeof_fmt(data.data.nbytes)))
 
 
-def __create_variable(nc_file, data, prefer_standard_name=False):
+def __write_values(var, data, start=None):
+    """Writes the values of some data to a netCDF variable.
+    :param var: netCDF variable to write to
+    :param data: LazyData for variable to write
+    :param start: the index along the dimension to start writing at, or None to write the whole variable
+    """
+    from cis.exceptions import InconsistentDimensionsError
+    try:
+        if start is None:
+            var[:] = data.data.flatten()
+        else:
+            values = data.data.flatten()
+            var[start:start + len(values)] = values
+    except IndexError as e:
+        raise InconsistentDimensionsError(str(e) + "\nInconsistent dimensions in output file, unable to write "
+                                                   "{} to file (it's shape is {}).".format(data.name(), data.shape))
+    except:
+        logging.error("Error writing data to disk.")
+        raise
+
+
+def __create_variable(nc_file, data, prefer_standard_name=False, start=None):
     """Creates and writes a variable to a netCDF file.
     :param nc_file: netCDF file to which to write
     :param data: LazyData for variable to write
     :param prefer_standard_name: if True, use the standard name of the variable if defined,
            otherwise use the variable name
+    :param start: if given, the data are a chunk of the variable to write starting at this index. The variable is
+           created if it doesn't exist yet.
     :return: created netCDF variable
     """
-    from cis.exceptions import InconsistentDimensionsError
-
     name = None
     if (data.metadata._name is not None) and (len(data.metadata._name) > 0):
         name = data.metadata._name
@@ -110,14 +131,11 @@ def __create_variable(nc_file, data, prefer_standard_name=False):
         var = nc_file.createVariable(name, datatype=out_type, dimensions=index_name,
                                      fill_value=__get_missing_value(data))
         var = __add_metadata(var, data)
-        try:
-            var[:] = data.data.flatten()
-        except IndexError as e:
-            raise InconsistentDimensionsError(str(e) + "\nInconsistent dimensions in output file, unable to write "
-                                                       "{} to file (it's shape is {}).".format(data.name(), data.shape))
-        except:
-            logging.error("Error writing data to disk.")
-            raise
+        __write_values(var, data, start)
+        return var
+    elif start is not None:
+        var = nc_file.variables[name]
+        __write_values(var, data, start)
         return var
     else:
         return nc_file.variables[name]
@@ -161,15 +179,36 @@ def write_coordinate_list(coord_list, filename):
     netcdf_file.close()
 
 
-def add_data_to_file(data_object, filename):
+def add_data_to_file(data_object, filename, start=None):
     """
 
     :param data_object:
     :param filename:
+    :param start: if given, the data object is a chunk of the variable starting at this index along the dimension
+           (which must already be in the file). This allows large outputs to be written a chunk at a time.
     :return:
     """
     from cis import __version__
     netcdf_file = Dataset(filename, 'a', format="NETCDF4")
-    var = __create_variable(netcdf_file, data_object, prefer_standard_name=False)
+    var = __create_variable(netcdf_file, data_object, prefer_standard_name=False, start=start)
     netcdf_file.source = "CIS" + __version__
     netcdf_file.close()
+
+
+def append_along_unlimited_dimension(block_filename, filename, start):
+    """
+    Append the contents of one NetCDF file to another along the (single) unlimited dimension of the second. Both files
+    must have the same structure, e.g. both were written by saving consecutive blocks of the same data. Variables which
+    don't span the unlimited dimension are left as they are.
+
+    :param str block_filename: The file containing the block to append
+    :param str filename: The file to append to
+    :param int start: The index along the unlimited dimension at which to write the block
+    """
+    with Dataset(block_filename) as block_file, Dataset(filename, 'a') as netcdf_file:
+        dimension = [name for name, dim in netcdf_file.dimensions.items() if dim.isunlimited()][0]
+        stop = start + len(block_file.dimensions[dimension])
+        for name, block_var in block_file.variables.items():
+            if dimension in block_var.dimensions:
+                index = tuple(slice(start, stop) if dim == dimension else slice(None) for dim in block_var.dimensions)
+                netcdf_file.variables[name][index] = block_var[:]
@@ -225,6 +225,14 @@ def add_aggregate_parser_arguments(parser):
                              "degree increments up to 90")
     parser.add_argument("-o", "--output", metavar="Output filename", default="out", nargs="?",
                         help="The filename of the output file")
+    parser.add_argument("--stream", action='store_true',
+                        help="Aggregate ungridded data one file at a time, so that only the output grid (and not all of "
+                             "the data) has to fit in memory. Only the moments, mean, stddev, min, max and sum kernels "
+                             "can be used.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="The number of processes to aggregate ungridded data with. The data is split between the "
+                             "processes and the results merged, this is only possible for the moments, mean, stddev, "
+                             "min, max and sum kernels.")
     return parser
 
 
@@ -366,7 +374,16 @@ def check_aggregate_kernel(arg, parser):
 
     aggregation_classes = plugin.find_plugin_classes(Kernel, 'cis.collocation.col_implementations')
     aggregation_names = [cls().__class__.__name__ for cls in aggregation_classes]
-    if arg in list(aggregation_kernels.keys()) or arg in aggregation_names:
+    name, options = extract_method_and_args(arg, parser)
+    if options and name in aggregation_names:
+        # Kernels with parameters (e.g. percentile[q=90]) are created here, as only the name can be passed on
+        from cis.collocation.col_framework import get_kernel
+        from cis.exceptions import InvalidCommandLineOptionError
+        try:
+            return get_kernel(name)(**options)
+        except (TypeError, InvalidCommandLineOptionError) as e:
+            parser.error("Invalid parameters for the {} kernel: {}".format(name, e))
+    elif arg in list(aggregation_kernels.keys()) or arg in aggregation_names:
         return arg
     else:
         parser.error(arg + " is not a valid aggregation kernel. Please use one of " + str(aggregation_names))
@@ -919,6 +936,8 @@ def validate_col_args(arguments, parser):
 def validate_aggregate_args(arguments, parser):
     arguments.datagroups = get_aggregate_datagroups(arguments.datagroups, parser)
     arguments.grid = get_aggregate_grid(arguments.aggregategrid, parser)
+    if arguments.workers < 1:
+        parser.error("The number of workers must be at least 1")
     _validate_output_file(arguments, parser)
     return arguments
 
@@ -0,0 +1,41 @@
+from unittest import TestCase
+
+import numpy as np
+
+from cis.aggregation.running_moments import RunningMoments, running_moments
+
+
+class TestRunningMoments(TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(9)
+        # Values for each of 4 cells, including an empty cell and one with a large offset
+        self.values = [rng.normal(size=20), rng.normal(size=1), np.array([]), 1e8 + rng.normal(size=30)]
+
+    def _moments_of(self, values):
+        moments = RunningMoments((len(values),))
+        indptr = np.concatenate([[0], np.cumsum([len(v) for v in values])])
+        count, mean, m2, minimum, maximum = running_moments().get_value_for_segments(np.concatenate(values), indptr)
+        moments.update(np.nan_to_num(count), mean, m2, minimum, maximum)
+        return moments
+
+    def test_merging_chunks_matches_all_values(self):
+        moments = RunningMoments((4,))
+        for chunk in range(4):
+            moments.merge(self._moments_of([v[chunk::4] for v in self.values]))
+
+        for statistic, func in [('count', np.size), ('mean', np.mean), ('std', lambda v: np.std(v, ddof=1)),
+                                ('min', np.min), ('max', np.max), ('sum', np.sum)]:
+            result = moments.get_statistic(statistic)
+            assert result[2] is np.ma.masked
+            for cell in [0, 3]:
+                assert np.isclose(result[cell], func(self.values[cell]), rtol=1e-10), statistic
+
+    def test_std_of_single_value_is_masked(self):
+        moments = self._moments_of(self.values)
+        assert moments.get_statistic('std')[1] is np.ma.masked
+        assert moments.get_statistic('mean')[1] == self.values[1][0]
+
+    def test_unknown_statistic_raises_error(self):
+        with self.assertRaises(ValueError):
+            RunningMoments((1,)).get_statistic('median')
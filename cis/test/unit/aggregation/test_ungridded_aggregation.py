@@ -458,3 +458,119 @@ class TestUngriddedListAggregation(TestCase):
         assert len(cube_out) == 2
         compare_masked_arrays(cube_out[0].data, result_0)
         compare_masked_arrays(cube_out[1].data, result_1)
+
+
+class TestStreamingUngriddedAggregation(TestCase):
+
+    @staticmethod
+    def _make_chunks(n_chunks, n_points):
+        import datetime
+        from cis.data_io.hyperpoint import HyperPoint
+        from cis.data_io.ungridded_data import UngriddedData
+
+        rng = numpy.random.RandomState(8)
+        values = [rng.uniform(-90, 90, n_chunks * n_points), rng.uniform(-180, 180, n_chunks * n_points),
+                  rng.uniform(0, 10, n_chunks * n_points), rng.normal(size=n_chunks * n_points)]
+
+        def make_data(start, stop):
+            data = UngriddedData.from_points_array(
+                [HyperPoint(lat=lat, lon=lon, t=datetime.datetime(2000, 1, 1) + datetime.timedelta(days=days), val=val)
+                 for lat, lon, days, val in zip(*[v[start:stop] for v in values])])
+            data.metadata._name = 'rain'
+            data.metadata.units = 'kg m-2 s-1'
+            return data
+
+        return make_data(0, n_chunks * n_points), [make_data(i * n_points, (i + 1) * n_points)
+                                                   for i in range(n_chunks)]
+
+    def test_aggregating_in_chunks_matches_aggregating_all_data(self):
+        from cis.collocation.col_implementations import sum
+        from cis.data_io.ungridded_data import _aggregate_ungridded_in_chunks
+
+        data, chunks = self._make_chunks(3, 200)
+        grid = {'x': slice(-180, 180, 60), 'y': slice(-90, 90, 45)}
+        for kernel in [moments(), mean(), stddev(), min(), max(), sum()]:
+            expected = data.aggregate(how=kernel, **grid)
+            expected = expected if isinstance(expected, list) else [expected]
+            output = _aggregate_ungridded_in_chunks(iter(chunks), kernel, **grid)
+            assert len(output) == len(expected)
+            for output_cube, expected_cube in zip(output, expected):
+                assert output_cube.var_name == expected_cube.var_name
+                assert output_cube.units == expected_cube.units
+                assert_arrays_equal(numpy.ma.getmaskarray(output_cube.data),
+                                    numpy.ma.getmaskarray(expected_cube.data))
+                assert numpy.ma.allclose(output_cube.data, expected_cube.data)
+                # The collapsed time coordinate covers all of the chunks
+                assert_arrays_almost_equal(output_cube.coord('time').bounds, expected_cube.coord('time').bounds)
+                assert_arrays_almost_equal(output_cube.coord('time').points, expected_cube.coord('time').points)
+
+    def test_aggregating_lists_in_chunks(self):
+        from cis.aggregation.ungridded_aggregator import StreamingUngriddedAggregator
+
+        data = UngriddedDataList([make_regular_2d_ungridded_data_with_missing_values(),
+                                  make_regular_2d_ungridded_data(data_offset=10)])
+        data[1].metadata._name = 'snow'
+        aggregator = StreamingUngriddedAggregator({'longitude': slice(-7.5, 7.5, 5), 'latitude': slice(-12.5, 12.5, 5)},
+                                                  mean())
+        output = aggregator.aggregate([data, data])
+
+        assert len(output) == 2
+        compare_masked_arrays(output[0].data, make_regular_2d_ungridded_data_with_missing_values().data)
+        assert not numpy.ma.getmaskarray(output[1].data).any()
+        assert_arrays_almost_equal(output[1].data, make_regular_2d_ungridded_data(data_offset=10).data)
+
+    def test_aggregating_in_chunks_with_unsupported_kernel_raises_error(self):
+        from cis.aggregation.ungridded_aggregator import StreamingUngriddedAggregator
+        from cis.collocation.col_implementations import nn_horizontal
+
+        with self.assertRaises(ValueError):
+            StreamingUngriddedAggregator({'x': slice(-7.5, 7.5, 5)}, nn_horizontal())
+
+    def test_aggregating_in_chunks_without_grid_limits_raises_error(self):
+        from cis.aggregation.ungridded_aggregator import StreamingUngriddedAggregator
+
+        with self.assertRaises(ValueError):
+            StreamingUngriddedAggregator({'x': slice(None, 7.5, 5)}, mean())
+
+
+class TestParallelUngriddedAggregation(TestCase):
+
+    def test_aggregating_in_processes_matches_aggregating_in_one_process(self):
+        from cis.collocation.col_implementations import sum
+
+        data, _ = TestStreamingUngriddedAggregation._make_chunks(1, 600)
+        grid = {'x': slice(-180, 180, 60), 'y': slice(-90, 90, 45)}
+        for kernel in ['moments', 'mean', 'stddev', 'min', 'max', sum()]:
+            expected = data.aggregate(how=kernel, **grid)
+            expected = expected if isinstance(expected, list) else [expected]
+            output = data.aggregate(how=kernel, workers=3, **grid)
+            output = output if isinstance(output, list) else [output]
+            assert len(output) == len(expected)
+            for output_cube, expected_cube in zip(output, expected):
+                assert output_cube.var_name == expected_cube.var_name
+                assert_arrays_equal(numpy.ma.getmaskarray(output_cube.data),
+                                    numpy.ma.getmaskarray(expected_cube.data))
+                assert numpy.ma.allclose(output_cube.data, expected_cube.data)
+                assert_arrays_almost_equal(output_cube.coord('time').bounds, expected_cube.coord('time').bounds)
+
+    def test_aggregating_lists_in_processes(self):
+        data = UngriddedDataList([make_regular_2d_ungridded_data_with_missing_values(),
+                                  make_regular_2d_ungridded_data(data_offset=10)])
+        data[1].metadata._name = 'snow'
+        output = data.aggregate(how='mean', workers=2, x=[-7.5, 7.5, 5], y=[-12.5, 12.5, 5])
+
+        assert len(output) == 2
+        compare_masked_arrays(output[0].data, make_regular_2d_ungridded_data_with_missing_values().data)
+        assert not numpy.ma.getmaskarray(output[1].data).any()
+        assert_arrays_almost_equal(output[1].data, make_regular_2d_ungridded_data(data_offset=10).data)
+
+    def test_aggregating_in_processes_with_unsupported_kernel_aggregates_in_one_process(self):
+        from cis.collocation.col_framework import AbstractDataOnlyKernel
+
+        class median(AbstractDataOnlyKernel):
+            def get_value_for_data_only(self, values):
+                return numpy.median(values)
+
+        data = make_regular_2d_ungridded_data()
+        output = data.aggregate(how=median(), workers=2, x=[-7.5, 7.5, 5], y=[-12.5, 12.5, 5])
+        assert_arrays_almost_equal(output.data, data.data)
@@ -0,0 +1,33 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_array_equal
+
+from cis.collocation import data_index
+
+
+class TestTimeSortedIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.data = pd.DataFrame({'time': [5.0, 1.0, 3.0, 2.0, 4.0, 3.0], 'vals': np.arange(6.0)})
+        self.index = data_index.TimeSortedIndex()
+        self.index.index_data(None, self.data, None)
+
+    def test_GIVEN_unsorted_times_WHEN_index_THEN_times_are_sorted(self):
+        assert_array_equal(self.index.sorted_times, [1.0, 2.0, 3.0, 3.0, 4.0, 5.0])
+        assert_array_equal(self.index.sort_order, [1, 3, 2, 5, 4, 0])
+
+    def test_GIVEN_unsorted_sample_times_WHEN_find_windows_THEN_windows_include_boundaries(self):
+        start, stop = self.index.find_windows(np.array([4.5, 0.0, 3.0, 10.0]), 1.0)
+        assert_array_equal(start, [4, 0, 1, 6])
+        assert_array_equal(stop, [6, 1, 5, 6])
+
+    def test_GIVEN_single_time_WHEN_find_points_within_window_THEN_points_returned_in_original_order(self):
+        assert_array_equal(self.index.find_points_within_window(3.0, 0.5), [2, 5])
+        assert_array_equal(self.index.find_points_within_window(3.5, 1.0), [2, 4, 5])
+
+    def test_GIVEN_data_without_time_WHEN_index_THEN_no_index_created(self):
+        index = data_index.TimeSortedIndex()
+        index.index_data(None, pd.DataFrame({'vals': [1.0]}), None)
+        assert index.sort_order is None
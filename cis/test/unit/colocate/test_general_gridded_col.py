@@ -44,6 +44,22 @@ class SlowMean(object):
         return self.mean.get_variable_details(var_name, var_long_name, var_standard_name, var_units)
 
 
+class IterativeKernel(object):
+    """
+    Wraps a data only kernel so that the collocator calls it once per cell rather than for all cells at once.
+    """
+
+    def __init__(self, kernel):
+        self.kernel = kernel
+        self.return_size = kernel.return_size
+
+    def get_value_for_data_only(self, data):
+        return self.kernel.get_value_for_data_only(data)
+
+    def get_variable_details(self, var_name, var_long_name, var_standard_name, var_units):
+        return self.kernel.get_variable_details(var_name, var_long_name, var_standard_name, var_units)
+
+
 class FastMoments(object):
     return_size = 3
 
@@ -1085,3 +1101,64 @@ class TestGeneralGriddedCollocator(unittest.TestCase):
         kernel = mean()
         out_cube = col.collocate(points=sample, data=data, constraint=constraint, kernel=kernel)
         assert out_cube[0].shape == (5, 3)
+
+    def test_vectorised_data_only_kernels_match_iterating_over_cells(self):
+        from cis.collocation.col_implementations import sum, min, max, stddev, median, percentile
+        from cis.data_io.hyperpoint import HyperPoint
+        from cis.data_io.ungridded_data import UngriddedData
+
+        rng = numpy.random.RandomState(7)
+        data = UngriddedData.from_points_array(
+            [HyperPoint(lat=lat, lon=lon, val=val) for lat, lon, val in
+             zip(rng.uniform(-13, 13, 200), rng.uniform(-8, 8, 200), rng.normal(size=200))])
+        data.metadata._name = 'rain'
+        mask = [[False, False, False],
+                [False, False, True],
+                [False, False, False],
+                [True, False, False],
+                [False, False, False]]
+
+        for missing_data_for_missing_sample in [False, True]:
+            for kernel in [mean(), sum(), min(), max(), stddev(), moments(), median(), percentile(q=90)]:
+                col = GeneralGriddedCollocator(fill_value=-999.9,
+                                               missing_data_for_missing_sample=missing_data_for_missing_sample)
+                output = col.collocate(points=make_mock_cube(mask=mask), data=data,
+                                       constraint=BinnedCubeCellOnlyConstraint(), kernel=kernel)
+                expected = col.collocate(points=make_mock_cube(mask=mask), data=data,
+                                         constraint=BinnedCubeCellOnlyConstraint(), kernel=IterativeKernel(kernel))
+                assert len(output) == len(expected)
+                for output_cube, expected_cube in zip(output, expected):
+                    assert_arrays_equal(output_cube.data.mask, expected_cube.data.mask)
+                    assert_arrays_almost_equal(output_cube.data.filled(), expected_cube.data.filled())
+
+    def test_variables_with_the_same_coordinates_share_the_bin_index(self):
+        from cis.collocation.data_index import GridCellBinIndexInSlices
+        from cis.data_io.hyperpoint import HyperPoint
+        from cis.data_io.ungridded_data import UngriddedData
+        from mock import patch
+
+        rng = numpy.random.RandomState(9)
+        rain = UngriddedData.from_points_array(
+            [HyperPoint(lat=lat, lon=lon, val=val) for lat, lon, val in
+             zip(rng.uniform(-13, 13, 200), rng.uniform(-8, 8, 200), rng.normal(size=200))])
+        rain.metadata._name = 'rain'
+        # The second variable has the same coordinates but different missing values
+        snow_values = numpy.ma.masked_array(rng.normal(size=200), mask=rng.uniform(size=200) < 0.3)
+        snow = rain.make_new_with_same_coordinates(data=snow_values, var_name='snow')
+        data = UngriddedDataList([rain, snow])
+
+        for kernel in [mean(), moments()]:
+            expected = GriddedDataList()
+            for variable in data:
+                expected.extend(GeneralGriddedCollocator().collocate(make_mock_cube(), variable,
+                                                                     BinnedCubeCellOnlyConstraint(), kernel))
+            with patch.object(GridCellBinIndexInSlices, 'index_data', autospec=True,
+                              side_effect=GridCellBinIndexInSlices.index_data) as index_data:
+                output = GeneralGriddedCollocator().collocate(make_mock_cube(), data, BinnedCubeCellOnlyConstraint(),
+                                                              kernel)
+            assert index_data.call_count == 1
+            assert len(output) == len(expected)
+            for output_cube, expected_cube in zip(output, expected):
+                assert output_cube.var_name == expected_cube.var_name
+                assert_arrays_equal(output_cube.data.mask, expected_cube.data.mask)
+                assert_arrays_almost_equal(output_cube.data.filled(), expected_cube.data.filled())
@@ -127,6 +127,176 @@ class TestGeneralUngriddedCollocator(unittest.TestCase):
         assert all(output[4].data.mask)
         assert np.allclose(output[5].data, expected_n)
 
+    def test_list_with_different_masks_matches_collocating_each_variable(self):
+        from cis.collocation.col_implementations import nn_horizontal
+
+        ug_data_1 = mock.make_regular_2d_ungridded_data_with_missing_values()
+        ug_data_2 = mock.make_regular_2d_ungridded_data(data_offset=3)
+        ug_data_2.data = np.ma.masked_array(ug_data_2.data, mask=np.arange(15).reshape(5, 3) % 5 == 0)
+        ug_data_2.metadata._name = 'snow'
+        sample_points = UngriddedData.from_points_array(
+            [HyperPoint(lat=lat, lon=lon) for lat in np.linspace(-9, 9, 7) for lon in [-4.0, 1.0, 3.5]])
+
+        for kernel in [moments(), nn_horizontal()]:
+            constraint = SepConstraintKdtree('700km')
+            output = GeneralUngriddedCollocator().collocate(sample_points, UngriddedDataList([ug_data_1, ug_data_2]),
+                                                            constraint, kernel)
+            # The neighbours are only found once, on the points where either variable has a value
+            assert constraint.haversine_distance_kd_tree_index.index.n == 15
+
+            expected = UngriddedDataList()
+            for var in [ug_data_1, ug_data_2]:
+                expected.extend(GeneralUngriddedCollocator().collocate(sample_points, var,
+                                                                       SepConstraintKdtree('700km'), kernel))
+            assert len(output) == len(expected)
+            for output_var, expected_var in zip(output, expected):
+                eq_(output_var.var_name, expected_var.var_name)
+                assert np.array_equal(output_var.data.mask, expected_var.data.mask)
+                assert np.ma.allclose(output_var.data, expected_var.data)
+
+    def test_box_moments_with_all_constraints_matches_per_point_constraint(self):
+        data = mock.make_regular_4d_ungridded_data()
+        sample = UngriddedData.from_points_array(
+            [HyperPoint(lat=1.0, lon=1.0, alt=12.0, t=dt.datetime(1984, 8, 29, 8, 34)),
+             HyperPoint(lat=-4.0, lon=3.0, alt=41.0, t=dt.datetime(1984, 9, 1, 2, 0)),
+             HyperPoint(lat=9.0, lon=-4.0, alt=75.0, t=dt.datetime(1984, 9, 4, 12, 0)),
+             HyperPoint(lat=50.0, lon=50.0, alt=75.0, t=dt.datetime(1984, 9, 4, 12, 0))])
+        constraint = SepConstraintKdtree(h_sep='800km', a_sep='15m', t_sep='P2D')
+
+        col = GeneralUngriddedCollocator()
+        output = col.collocate(sample, data, constraint, moments())
+
+        # Compare against the points found by the per-point iterator
+        data_points = data.as_data_frame(time_index=False, name='vals').dropna(axis=0)
+        sample_points = sample.as_data_frame(time_index=False, name='vals')
+        expected = np.ma.masked_all((3, len(sample_points)))
+        for i, point, con_points in constraint.get_iterator(False, None, None, data_points, None, sample_points, None):
+            if len(con_points) > 0:
+                expected[:, i] = moments().get_value_for_data_only(con_points.vals.values)
+
+        for output_var, expected_var in zip(output, expected):
+            assert np.array_equal(output_var.data.mask, np.ma.getmaskarray(np.ma.masked_invalid(expected_var)))
+            assert np.ma.allclose(output_var.data, np.ma.masked_invalid(expected_var))
+        assert output[2].data[3] is np.ma.masked
+
+    def test_box_data_only_kernel_without_segmented_reduction(self):
+        from cis.collocation.col_framework import AbstractDataOnlyKernel
+
+        class range_kernel(AbstractDataOnlyKernel):
+            def get_value_for_data_only(self, values):
+                return np.max(values) - np.min(values)
+
+        data = mock.make_regular_2d_ungridded_data()
+        sample = UngriddedData.from_points_array(
+            [HyperPoint(lat=1.0, lon=1.0), HyperPoint(lat=3.0, lon=3.0), HyperPoint(lat=50.0, lon=50.0)])
+
+        col = GeneralUngriddedCollocator()
+        output = col.collocate(sample, data, SepConstraintKdtree('500km'), range_kernel())
+
+        assert np.allclose(output[0].data[:2], [3.0, 4.0])
+        assert output[0].data[2] is np.ma.masked
+
+    def test_box_moments_with_workers_matches_single_process(self):
+        data = mock.make_regular_4d_ungridded_data()
+        rng = np.random.RandomState(1)
+        sample = UngriddedData.from_points_array(
+            [HyperPoint(lat=lat, lon=lon, alt=alt, t=dt.datetime(1984, 8, 27) + dt.timedelta(days=days))
+             for lat, lon, alt, days in zip(rng.uniform(-12, 12, 40), rng.uniform(-7, 7, 40),
+                                            rng.uniform(0, 100, 40), rng.uniform(0, 15, 40))])
+
+        expected = GeneralUngriddedCollocator().collocate(
+            sample, data, SepConstraintKdtree(h_sep='500km', t_sep='P3D'), moments())
+        output = GeneralUngriddedCollocator(workers=3).collocate(
+            sample, data, SepConstraintKdtree(h_sep='500km', t_sep='P3D'), moments())
+
+        for output_var, expected_var in zip(output, expected):
+            assert np.array_equal(output_var.data.mask, expected_var.data.mask)
+            assert np.ma.allclose(output_var.data, expected_var.data)
+
+    def test_nn_with_workers_matches_single_process(self):
+        from cis.collocation.col_implementations import nn_horizontal
+
+        data = mock.make_regular_2d_ungridded_data()
+        rng = np.random.RandomState(2)
+        sample = UngriddedData.from_points_array(
+            [HyperPoint(lat=lat, lon=lon) for lat, lon in zip(rng.uniform(-12, 12, 30), rng.uniform(-7, 7, 30))])
+
+        expected = GeneralUngriddedCollocator().collocate(sample, data, SepConstraintKdtree('400km'), nn_horizontal())
+        output = GeneralUngriddedCollocator(workers=2).collocate(sample, data, SepConstraintKdtree('400km'),
+                                                                 nn_horizontal())
+
+        assert np.array_equal(output[0].data.mask, expected[0].data.mask)
+        assert np.ma.allclose(output[0].data, expected[0].data)
+
+    def test_time_only_constraint_uses_time_index_and_matches_exhaustive_search(self):
+        from cis.collocation.col_implementations import nn_time
+
+        data = mock.make_regular_4d_ungridded_data()
+        rng = np.random.RandomState(3)
+        sample = UngriddedData.from_points_array(
+            [HyperPoint(lat=0.0, lon=0.0, alt=alt, t=dt.datetime(1984, 8, 27) + dt.timedelta(days=days))
+             for alt, days in zip(rng.uniform(0, 100, 25), rng.uniform(-2, 18, 25))])
+        constraint = SepConstraintKdtree(t_sep='P1DT12H', a_sep='30m')
+
+        for kernel in [moments(), nn_time()]:
+            output = GeneralUngriddedCollocator().collocate(sample, data, constraint, kernel)
+            assert constraint.time_sorted_index.sort_order is not None
+
+            data_points = data.as_data_frame(time_index=False, name='vals').dropna(axis=0)
+            sample_points = sample.as_data_frame(time_index=False, name='vals')
+            for i, point in sample_points.iterrows():
+                # Exhaustive search over all of the data points
+                con_points = data_points
+                for check in constraint.checks:
+                    con_points = con_points.iloc[check(con_points, point)]
+                if len(con_points) == 0:
+                    assert output[0].data[i] is np.ma.masked
+                else:
+                    expected = kernel.get_value(point, con_points)
+                    assert np.allclose(output[0].data[i], expected[0] if kernel.return_size > 1 else expected)
+
+    def test_collocate_to_file_in_chunks_matches_collocate(self):
+        import os
+        import tempfile
+        from netCDF4 import Dataset
+        from cis.collocation.col_implementations import nn_horizontal
+
+        data = UngriddedDataList([mock.make_regular_2d_ungridded_data(),
+                                  mock.make_regular_2d_ungridded_data_with_missing_values()])
+        data[1].metadata._name = 'snow'
+        rng = np.random.RandomState(4)
+        sample = UngriddedData.from_points_array(
+            [HyperPoint(lat=lat, lon=lon) for lat, lon in zip(rng.uniform(-12, 12, 23), rng.uniform(-7, 7, 23))])
+
+        handle, output_file = tempfile.mkstemp(suffix='.nc')
+        os.close(handle)
+        try:
+            for kernel in [moments(), nn_horizontal()]:
+                expected = GeneralUngriddedCollocator().collocate(sample, data, SepConstraintKdtree('400km'), kernel)
+                GeneralUngriddedCollocator().collocate_to_file(sample, data, SepConstraintKdtree('400km'), kernel,
+                                                               output_file, chunk_size=5)
+                with Dataset(output_file) as output:
+                    assert np.allclose(output.variables['latitude'][:], sample.lat.points)
+                    for expected_var in expected:
+                        output_var = output.variables[expected_var.var_name][:]
+                        assert np.array_equal(np.ma.getmaskarray(output_var), expected_var.data.mask)
+                        assert np.ma.allclose(output_var, expected_var.data)
+        finally:
+            os.remove(output_file)
+
+    def test_invalid_chunk_size_raises_error(self):
+        from cis.exceptions import InvalidCommandLineOptionError
+        with self.assertRaises(InvalidCommandLineOptionError):
+            GeneralUngriddedCollocator().collocate_to_file(mock.make_regular_2d_ungridded_data(),
+                                                           mock.make_regular_2d_ungridded_data(),
+                                                           SepConstraintKdtree('400km'), moments(), 'out.nc',
+                                                           chunk_size=0)
+
+    def test_invalid_number_of_workers_raises_error(self):
+        from cis.exceptions import InvalidCommandLineOptionError
+        with self.assertRaises(InvalidCommandLineOptionError):
+            GeneralUngriddedCollocator(workers=0)
+
 if __name__ == '__main__':
     import nose
     nose.runmodule()
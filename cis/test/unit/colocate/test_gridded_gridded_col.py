@@ -1278,3 +1278,160 @@ class TestGriddedGriddedCollocator(GriddedGriddedCollocatorTests, TestCase):
         col = self.collocator
         out_cube = col.collocate(points=sample, data=data, constraint=None, kernel=gridded_gridded_nn())
         assert out_cube[0].shape == sample.shape
+
+    def test_regridding_weights_are_reused_for_data_on_the_same_grid(self):
+        from mock import patch
+        from cis.collocation.gridded_interpolation import _RegularGridInterpolator
+        sample_cube = gridded_data.make_from_cube(make_mock_cube(data_offset=100))
+        data_list = gridded_data.GriddedDataList([
+            gridded_data.make_from_cube(make_mock_cube(horizontal_offset=0.7, time_dim_length=4)),
+            gridded_data.make_from_cube(make_mock_cube(horizontal_offset=0.7, time_dim_length=4, data_offset=3))])
+
+        col = self.collocator
+        with patch.object(_RegularGridInterpolator, '_get_weights', autospec=True,
+                          side_effect=_RegularGridInterpolator._get_weights) as get_weights:
+            out_cube = col.collocate(points=sample_cube, data=data_list, constraint=None, kernel=gridded_gridded_li())
+            col.collocate(points=sample_cube, data=data_list[0], constraint=None, kernel=gridded_gridded_li())
+        assert get_weights.call_count == 1
+
+        # The time dimension (which isn't in the sample) is carried through, as the last dimension
+        assert out_cube[0].shape == sample_cube.shape + (4,)
+        assert numpy.allclose(out_cube[1].data, out_cube[0].data + 3)
+
+    def test_regridding_matches_iris_interpolation(self):
+        from mock import patch
+        sample_cube = gridded_data.make_from_cube(make_mock_cube(horizontal_offset=0.5))
+        data_cube = gridded_data.make_from_cube(make_mock_cube(mask=True, time_dim_length=2))
+
+        for kernel in [gridded_gridded_li(), gridded_gridded_nn()]:
+            out_cube = GriddedCollocator().collocate(points=sample_cube, data=data_cube, constraint=None,
+                                                     kernel=kernel)[0]
+            with patch.object(GriddedCollocator, '_can_regrid', return_value=False):
+                iris_cube = GriddedCollocator().collocate(points=sample_cube, data=data_cube, constraint=None,
+                                                          kernel=kernel)[0]
+            assert numpy.array_equal(numpy.ma.getmaskarray(out_cube.data), numpy.ma.getmaskarray(iris_cube.data))
+            assert numpy.allclose(out_cube.data.compressed(), iris_cube.data.compressed())
+            assert [c.name() for c in out_cube.coords()] == [c.name() for c in iris_cube.coords()]
+
+
+def _make_global_cube(lat_step, lon_step, data=None, time_dim_length=None):
+    import iris.cube
+    from iris.coords import DimCoord
+    latitude = DimCoord(numpy.arange(-90 + lat_step / 2.0, 90, lat_step), standard_name='latitude', units='degrees')
+    longitude = DimCoord(numpy.arange(-180 + lon_step / 2.0, 180, lon_step), standard_name='longitude',
+                         units='degrees', circular=True)
+    latitude.guess_bounds()
+    longitude.guess_bounds()
+    dim_coords_and_dims = [(latitude, 0), (longitude, 1)]
+    shape = (len(latitude.points), len(longitude.points))
+    if time_dim_length is not None:
+        time = DimCoord(numpy.arange(time_dim_length, dtype=float), standard_name='time',
+                        units='days since 2000-01-01')
+        dim_coords_and_dims = [(time, 0), (latitude, 1), (longitude, 2)]
+        shape = (time_dim_length,) + shape
+    if data is None:
+        data = numpy.random.RandomState(0).uniform(0, 1, shape)
+    return gridded_data.make_from_cube(iris.cube.Cube(data, dim_coords_and_dims=dim_coords_and_dims))
+
+
+class TestConservativeRegridding(TestCase):
+
+    def test_coarse_graining_gives_area_weighted_means(self):
+        from cis.collocation.col_implementations import gridded_gridded_conservative
+        data_cube = _make_global_cube(10, 10)
+        sample_cube = _make_global_cube(30, 40)
+
+        out_cube = GriddedCollocator().collocate(sample_cube, data_cube, None, gridded_gridded_conservative())[0]
+
+        # Each sample cell covers 3x4 data cells, weighted by the area of each data cell (which only depends on the
+        #  latitude)
+        lat_bounds = numpy.deg2rad(data_cube.coord('latitude').bounds)
+        lat_weights = numpy.sin(lat_bounds[:, 1]) - numpy.sin(lat_bounds[:, 0])
+        for i in range(6):
+            for j in range(9):
+                weights = numpy.repeat(lat_weights[i * 3:(i + 1) * 3, numpy.newaxis], 4, axis=1)
+                expected = numpy.average(data_cube.data[i * 3:(i + 1) * 3, j * 4:(j + 1) * 4], weights=weights)
+                assert numpy.allclose(out_cube.data[i, j], expected)
+        assert numpy.array_equal(out_cube.coord('latitude').bounds, sample_cube.coord('latitude').bounds)
+
+    def test_total_is_conserved_with_other_dimensions(self):
+        from iris.analysis.cartography import area_weights
+        from cis.collocation.col_implementations import gridded_gridded_conservative
+        data_cube = _make_global_cube(1, 1.5, time_dim_length=2)
+        sample_cube = _make_global_cube(4, 5)
+
+        out_cube = GriddedCollocator().collocate(sample_cube, data_cube, None, gridded_gridded_conservative())[0]
+
+        assert out_cube.shape == sample_cube.shape + (2,)
+        for t in range(2):
+            assert numpy.isclose((out_cube.data[..., t] * area_weights(sample_cube)).sum(),
+                                 (data_cube.data[t] * area_weights(data_cube[t])).sum())
+
+    def test_masked_values_are_excluded(self):
+        from cis.collocation.col_implementations import gridded_gridded_conservative
+        data = numpy.ma.masked_array(numpy.ones((18, 36)), mask=False)
+        data[0:3, 0:4] = numpy.ma.masked
+        data[3:6, 0:4] = 100
+        data[3, 0] = numpy.ma.masked
+        data_cube = _make_global_cube(10, 10, data=data)
+        sample_cube = _make_global_cube(30, 40)
+
+        out_cube = GriddedCollocator().collocate(sample_cube, data_cube, None, gridded_gridded_conservative())[0]
+
+        assert out_cube.data.mask[0, 0]
+        assert numpy.allclose(out_cube.data[1, 0], 100)
+        assert numpy.allclose(out_cube.data[2:, 1:], 1)
+
+
+class TestGriddedCollocationToFile(TestCase):
+
+    def setUp(self):
+        import os
+        import tempfile
+        handle, self.output_file = tempfile.mkstemp(suffix='.nc')
+        os.close(handle)
+        self.addCleanup(os.remove, self.output_file)
+
+    def test_collocating_in_time_blocks_gives_same_output_as_collocating_all_at_once(self):
+        from netCDF4 import Dataset
+        from cis.collocation.col_implementations import gridded_gridded_conservative
+        data_cube = _make_global_cube(10, 10, time_dim_length=7)
+        sample_data = numpy.ma.masked_array(numpy.zeros((12, 18)), mask=False)
+        sample_data[0, 0] = numpy.ma.masked
+        sample_cube = _make_global_cube(15, 20, data=sample_data)
+
+        for kernel in [gridded_gridded_li(), gridded_gridded_nn(), gridded_gridded_conservative()]:
+            col = GriddedCollocator(missing_data_for_missing_sample=True)
+            expected = col.collocate(sample_cube, data_cube, None, kernel)[0]
+            col.collocate_to_file(sample_cube, data_cube, None, kernel, self.output_file, chunk_size=3)
+            with Dataset(self.output_file) as output:
+                assert output.dimensions['time'].isunlimited()
+                assert numpy.array_equal(output.variables['time'][:], data_cube.coord('time').points)
+                output_var = output.variables['unknown'][:]
+                assert numpy.array_equal(numpy.ma.getmaskarray(output_var), numpy.ma.getmaskarray(expected.data))
+                assert numpy.ma.allclose(output_var, expected.data)
+
+    def test_weights_are_calculated_once_for_all_blocks(self):
+        from mock import patch
+        from cis.collocation.gridded_interpolation import _RegularGridInterpolator
+        data_cube = _make_global_cube(10, 10, time_dim_length=5)
+        sample_cube = _make_global_cube(15, 20)
+
+        with patch.object(_RegularGridInterpolator, '_get_weights', autospec=True,
+                          side_effect=_RegularGridInterpolator._get_weights) as get_weights:
+            GriddedCollocator().collocate_to_file(sample_cube, data_cube, None, gridded_gridded_li(),
+                                                  self.output_file, chunk_size=2)
+        assert get_weights.call_count == 1
+
+    def test_sample_with_time_raises_error(self):
+        data_cube = _make_global_cube(10, 10, time_dim_length=5)
+        with self.assertRaises(ValueError):
+            GriddedCollocator().collocate_to_file(data_cube, data_cube, None, gridded_gridded_li(), self.output_file,
+                                                  chunk_size=2)
+
+    def test_invalid_chunk_size_raises_error(self):
+        from cis.exceptions import InvalidCommandLineOptionError
+        data_cube = _make_global_cube(10, 10, time_dim_length=5)
+        with self.assertRaises(InvalidCommandLineOptionError):
+            GriddedCollocator().collocate_to_file(_make_global_cube(15, 20), data_cube, None, gridded_gridded_li(),
+                                                  self.output_file, chunk_size='a')
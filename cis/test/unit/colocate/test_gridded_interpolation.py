@@ -387,6 +387,91 @@ class TestRegularGridInterpolator(TestCase):
         interpolator = GriddedUngriddedInterpolator(cube, sample_points, 'lin')
         assert_array_almost_equal(interpolator(cube, extrapolate=True), wanted)
 
+    def test_find_vertical_indices_matches_searching_each_column(self):
+        rng = np.random.RandomState(0)
+        columns = np.sort(rng.uniform(0, 100, (200, 12)), axis=1)
+        points = rng.uniform(-10, 110, 200)
+        indices, norm_distances, out_of_bounds = _RegularGridInterpolator._find_vertical_indices(points, columns)
+        for point, column, index, norm_distance, outside in zip(points, columns, indices, norm_distances,
+                                                                out_of_bounds):
+            expected_index = np.clip(np.searchsorted(column, point) - 1, 0, column.size - 2)
+            assert index == expected_index
+            assert_allclose(norm_distance, (point - column[index]) / (column[index + 1] - column[index]))
+            assert outside == (point < column[0] or point > column[-1])
+
+    def test_find_vertical_indices_in_decreasing_columns(self):
+        rng = np.random.RandomState(1)
+        columns = np.sort(rng.uniform(0, 100, (200, 12)), axis=1)
+        points = rng.uniform(-10, 110, 200)
+        levels = np.arange(12.0)
+        # Interpolating the level number should give the same result whichever way up the columns are
+        results = []
+        for cols, lvls in [(columns, levels), (columns[:, ::-1], levels[::-1])]:
+            indices, norm_distances, out_of_bounds = _RegularGridInterpolator._find_vertical_indices(points, cols)
+            results.append((lvls[indices] + (lvls[indices + 1] - lvls[indices]) * norm_distances, out_of_bounds))
+        assert_allclose(results[0][0], results[1][0])
+        assert np.array_equal(results[0][1], results[1][1])
+
+    def test_weights_give_the_same_result_as_evaluating_each_corner(self):
+        rng = np.random.RandomState(2)
+        grid = [np.sort(rng.uniform(0, 10, n)) for n in (5, 7, 4)]
+        sample = [rng.uniform(-1, 11, 300) for _ in grid]
+        values = np.ma.masked_greater(rng.uniform(0, 1, (5, 7, 4)), 0.9)
+        for method, evaluate in [('lin', _RegularGridInterpolator._evaluate_linear),
+                                 ('nn', _RegularGridInterpolator._evaluate_nearest)]:
+            interp = _RegularGridInterpolator(grid, sample, method=method)
+            assert interp.weights.shape == (300, values.size)
+            indices, norm_distances, _ = _RegularGridInterpolator._find_indices(np.vstack(sample), interp.grid)
+            expected = evaluate(values, indices, norm_distances)
+            result = interp(values, fill_value=None)
+            assert np.array_equal(np.ma.getmaskarray(result), np.ma.getmaskarray(expected))
+            assert_allclose(result.compressed(), expected.compressed())
+
+    def test_weights_are_loaded_from_the_cache(self):
+        import shutil
+        import tempfile
+        from mock import patch
+        from cis.collocation.index_cache import IndexCache
+        points, values = self._get_sample_4d()
+        sample = np.asarray([[0.1, 0.1, 1., .9], [0.2, 0.1, .45, .8], [0.5, 0.5, .5, .5]])
+        cache = IndexCache(tempfile.mkdtemp())
+        try:
+            expected = _RegularGridInterpolator(points, sample.T, cache=cache)(values)
+            assert len(cache.entries()) == 1
+            with patch.object(_RegularGridInterpolator, '_get_weights') as get_weights:
+                interp = _RegularGridInterpolator(points, sample.T, cache=cache)
+                assert_allclose(interp(values), expected)
+            assert get_weights.call_count == 0
+            # Different sample points mustn't reuse the weights
+            _RegularGridInterpolator(points, sample.T[:, :2], cache=cache)
+            assert len(cache.entries()) == 2
+        finally:
+            shutil.rmtree(cache.cache_dir)
+
+    def test_only_the_block_of_data_containing_the_sample_points_is_used(self):
+        from cis.test.util.mock import make_square_5x3_2d_cube
+        from cis.data_io.ungridded_data import UngriddedData
+        from cis.data_io.hyperpoint import HyperPoint
+
+        cube = make_square_5x3_2d_cube()
+        sample_points = UngriddedData.from_points_array([HyperPoint(lat=2.5, lon=-2.5), HyperPoint(lat=7.5, lon=0.0)])
+
+        interpolator = GriddedUngriddedInterpolator(cube, sample_points, 'lin')
+        assert interpolator._slices == (slice(2, 5), slice(0, 2))
+        assert_array_almost_equal(interpolator(cube), [9.0, 12.5])
+
+    def test_decreasing_coordinate(self):
+        from cis.test.util.mock import make_square_5x3_2d_cube_with_decreasing_latitude
+        from cis.data_io.ungridded_data import UngriddedData
+        from cis.data_io.hyperpoint import HyperPoint
+
+        cube = make_square_5x3_2d_cube_with_decreasing_latitude()
+        sample_points = UngriddedData.from_points_array([HyperPoint(lat=2.5, lon=-2.5), HyperPoint(lat=7.5, lon=0.0)])
+
+        interpolator = GriddedUngriddedInterpolator(cube, sample_points, 'lin')
+        assert interpolator._slices == (slice(0, 3), slice(0, 2))
+        assert_array_almost_equal(interpolator(cube), [6.0, 3.5])
+
 
 class MyValue(object):
     """
@@ -53,6 +53,25 @@ class TestGriddedUngriddedCollocator(unittest.TestCase):
         assert isinstance(output, UngriddedDataList)
         assert np.allclose(output[0].data, expected_result)
 
+    def test_variables_on_the_same_grid_are_interpolated_together(self):
+        from mock import patch
+        from cis.collocation.gridded_interpolation import _RegularGridInterpolator
+        data = [make_from_cube(mock.make_mock_cube()), make_from_cube(mock.make_mock_cube(data_offset=10))]
+        sample = UngriddedData.from_points_array(
+            [HyperPoint(lat=1.0, lon=1.0, alt=12.0, t=dt.datetime(1984, 8, 29, 8, 34)),
+             HyperPoint(lat=3.0, lon=3.0, alt=7.0, t=dt.datetime(1984, 8, 29, 8, 34)),
+             HyperPoint(lat=-1.0, lon=-1.0, alt=5.0, t=dt.datetime(1984, 8, 29, 8, 34))])
+
+        col = GriddedUngriddedCollocator()
+        with patch.object(_RegularGridInterpolator, '_apply_weights', autospec=True,
+                          side_effect=_RegularGridInterpolator._apply_weights) as apply_weights:
+            output = col.collocate(sample, data, None, 'lin')
+
+        assert apply_weights.call_count == 1
+        assert len(output) == 2
+        assert np.allclose(output[0].data, [8.8, 10.4, 7.2])
+        assert np.allclose(output[1].data, [18.8, 20.4, 17.2])
+
     def test_missing_data_for_missing_sample(self):
         data = make_from_cube(mock.make_mock_cube())
         data.name = lambda: 'Name'
@@ -0,0 +1,120 @@
+"""
+Tests the on-disk cache of collocation indexes
+"""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from mock import patch
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_array_equal
+
+from cis.collocation.index_cache import IndexCache, hash_arrays, get_default_cache
+
+
+class TestIndexCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_stored_arrays_are_loaded_memory_mapped(self):
+        cache = IndexCache(self.cache_dir)
+        cache.store('abc', {'x': np.arange(5.0), 'y': np.array([[1, 2], [3, 4]])})
+        arrays = cache.load('abc')
+        assert isinstance(arrays['x'], np.memmap)
+        assert_array_equal(arrays['x'], np.arange(5.0))
+        assert_array_equal(arrays['y'], [[1, 2], [3, 4]])
+
+    def test_missing_entry_returns_none(self):
+        assert IndexCache(self.cache_dir).load('abc') is None
+
+    def test_hash_depends_on_values_and_parameters(self):
+        a = np.arange(10.0)
+        assert hash_arrays(a, leafsize=10) == hash_arrays(a.copy(), leafsize=10)
+        assert hash_arrays(a, leafsize=10) != hash_arrays(a, leafsize=5)
+        assert hash_arrays(a, leafsize=10) != hash_arrays(a + 1, leafsize=10)
+        assert hash_arrays(a.reshape(5, 2)) != hash_arrays(a.reshape(2, 5))
+
+    def test_entries_older_than_max_age_are_evicted(self):
+        cache = IndexCache(self.cache_dir, max_age=1)
+        cache.store('old', {'x': np.arange(5.0)})
+        two_days_ago = time.time() - 2 * 86400
+        os.utime(os.path.join(self.cache_dir, 'old'), (two_days_ago, two_days_ago))
+        cache.store('new', {'x': np.arange(5.0)})
+        assert cache.load('old') is None
+        assert cache.load('new') is not None
+
+    def test_least_recently_used_entries_are_evicted_to_max_size(self):
+        cache = IndexCache(self.cache_dir, max_size=1.5)
+        # Each entry is roughly 0.8MB
+        cache.store('first', {'x': np.zeros(100000)})
+        os.utime(os.path.join(self.cache_dir, 'first'), (time.time() - 10, time.time() - 10))
+        cache.store('second', {'x': np.zeros(100000)})
+        assert cache.load('first') is None
+        assert cache.load('second') is not None
+
+    def test_entries_removed_during_eviction_are_skipped(self):
+        cache = IndexCache(self.cache_dir, max_age=1)
+        cache.store('first', {'x': np.arange(5.0)})
+        getmtime = os.path.getmtime
+
+        def removed_by_another_process(path):
+            if path.endswith('first'):
+                raise OSError("No such file or directory")
+            return getmtime(path)
+
+        with patch('os.path.getmtime', side_effect=removed_by_another_process):
+            cache.store('second', {'x': np.arange(5.0)})
+        assert cache.load('second') is not None
+
+    def test_failed_eviction_does_not_fail_store(self):
+        cache = IndexCache(self.cache_dir, max_age=1)
+        with patch.object(cache, 'evict', side_effect=OSError("No such file or directory")):
+            cache.store('abc', {'x': np.arange(5.0)})
+        assert cache.load('abc') is not None
+
+    def test_default_cache_is_configured_from_environment(self):
+        with patch.dict(os.environ, {'CIS_INDEX_CACHE_DIR': self.cache_dir, 'CIS_INDEX_CACHE_MAX_SIZE': '10'}):
+            cache = get_default_cache()
+        assert cache.cache_dir == self.cache_dir
+        assert cache.max_size == 10
+
+    def test_no_default_cache_without_environment_variable(self):
+        with patch.dict(os.environ, {}):
+            os.environ.pop('CIS_INDEX_CACHE_DIR', None)
+            assert get_default_cache() is None
+
+    def test_compiled_kd_tree_index_is_not_cached(self):
+        from cis.collocation.haversinedistancekdtreeindex import HaversineDistanceKDTreeIndex
+        rng = np.random.RandomState(0)
+        data = pd.DataFrame({'latitude': rng.uniform(-90, 90, 1000), 'longitude': rng.uniform(-180, 180, 1000)})
+
+        with patch.dict(os.environ, {'CIS_INDEX_CACHE_DIR': self.cache_dir}):
+            HaversineDistanceKDTreeIndex().index_data(None, data, None)
+
+        assert os.listdir(self.cache_dir) == []
+
+    def test_cached_pure_python_kd_tree_index_gives_the_same_results(self):
+        from cis.collocation.haversinedistancekdtreeindex import HaversineDistanceKDTreeIndex
+        rng = np.random.RandomState(0)
+        data = pd.DataFrame({'latitude': rng.uniform(-90, 90, 1000), 'longitude': rng.uniform(-180, 180, 1000)})
+        sample = pd.DataFrame({'latitude': rng.uniform(-90, 90, 20), 'longitude': rng.uniform(-180, 180, 20)})
+
+        with patch.dict(os.environ, {'CIS_INDEX_CACHE_DIR': self.cache_dir}):
+            indexes = []
+            for i in range(2):
+                index = HaversineDistanceKDTreeIndex(compiled=False)
+                index.index_data(None, data, None)
+                indexes.append(index)
+
+        assert len(os.listdir(self.cache_dir)) == 1
+        assert isinstance(indexes[1].index.split_dims, np.memmap)
+        assert_array_equal(indexes[0].find_nearest_point(sample), indexes[1].find_nearest_point(sample))
+        assert indexes[0].find_points_within_distance_sample(sample, 1000) == \
+            indexes[1].find_points_within_distance_sample(sample, 1000)
@@ -210,6 +210,32 @@ class TestNNTime(unittest.TestCase):
         eq_(new_data.data[2], 15.0)
 
 
+    def test_nearest_in_time_within_horizontal_and_time_constraint_matches_per_point_kernel(self):
+        from cis.collocation.col_implementations import GeneralUngriddedCollocator, nn_time, SepConstraintKdtree
+        from cis.collocation import data_index
+        import datetime as dt
+
+        ug_data = mock.make_regular_2d_with_time_ungridded_data()
+        sample_points = HyperPointList()
+        sample_points.append(HyperPoint(lat=1.0, lon=1.0, t=dt.datetime(1984, 8, 29, 8, 34)))
+        sample_points.append(HyperPoint(lat=4.0, lon=4.0, t=dt.datetime(1984, 9, 2, 1, 23)))
+        sample_points.append(HyperPoint(lat=-4.0, lon=-4.0, t=dt.datetime(1984, 9, 4, 15, 54)))
+        sample_points.append(HyperPoint(lat=40.0, lon=40.0, t=dt.datetime(1984, 9, 4, 15, 54)))
+        sample_points = UngriddedData.from_points_array(sample_points)
+        col = GeneralUngriddedCollocator()
+        new_data = col.collocate(sample_points, ug_data, SepConstraintKdtree(h_sep=1000, t_sep='P3D'), nn_time())[0]
+
+        constraint = SepConstraintKdtree(h_sep=1000, t_sep='P3D')
+        sample_df = sample_points.as_data_frame(time_index=False, name='vals')
+        data_df = ug_data.as_data_frame(time_index=False, name='vals')
+        data_index.create_indexes(constraint, sample_points, data_df, None)
+        for i, point, con_points in constraint.get_iterator(False, None, None, data_df, None, sample_df, None):
+            if len(con_points) == 0:
+                assert new_data.data.mask[i]
+            else:
+                eq_(new_data.data[i], nn_time().get_value(point, con_points))
+        assert new_data.data.mask[3]
+
 class TestNNAltitude(unittest.TestCase):
     def test_basic_col_with_incompatible_points_throws_a_TypeError(self):
         from cis.collocation.col_implementations import GeneralUngriddedCollocator, nn_altitude, SepConstraintKdtree
@@ -358,6 +384,139 @@ class TestNNPressure(unittest.TestCase):
         eq_(new_data.data[2], 46.0)
 
 
+class TestNNSpaceTime(unittest.TestCase):
+    def _make_sample(self, n, seed):
+        import datetime as dt
+        rng = np.random.RandomState(seed)
+        return UngriddedData.from_points_array(
+            [HyperPoint(lat=lat, lon=lon, alt=alt, t=dt.datetime(1984, 8, 27) + dt.timedelta(days=days))
+             for lat, lon, alt, days in zip(rng.uniform(-12, 12, n), rng.uniform(-7, 7, n), rng.uniform(0, 100, n),
+                                            rng.uniform(-1, 15, n))])
+
+    def test_nearest_in_scaled_space_time_matches_per_point_kernel(self):
+        from cis.collocation.col_implementations import GeneralUngriddedCollocator, nn_spacetime, SepConstraintKdtree
+
+        ug_data = mock.make_regular_4d_ungridded_data()
+        sample = self._make_sample(30, 5)
+        for kernel in [nn_spacetime(h_scale='200km', t_scale='P1D'),
+                       nn_spacetime(h_scale='200km', t_scale='P1D', a_scale='10m')]:
+            new_data = GeneralUngriddedCollocator().collocate(sample, ug_data, SepConstraintKdtree(), kernel)[0]
+
+            # Compare the distances, as there are points at the same place and time with different altitudes
+            data_points = ug_data.as_data_frame(time_index=False, name='vals').dropna(axis=0)
+            scaled_data = kernel.space_time_kd_tree_index.scale_points(data_points)
+            for i, point in sample.as_data_frame(time_index=False, name='vals').iterrows():
+                distances = np.linalg.norm(scaled_data - kernel.space_time_kd_tree_index.scale_points(point), axis=1)
+                expected = kernel.get_value(point, data_points)
+                assert_almost_equal(distances[data_points.vals.values == new_data.data[i]][0],
+                                    distances[data_points.vals.values == expected][0])
+
+    def test_nearest_in_space_time_further_than_separation_is_masked(self):
+        from cis.collocation.col_implementations import GeneralUngriddedCollocator, nn_spacetime, SepConstraintKdtree
+
+        ug_data = mock.make_regular_4d_ungridded_data()
+        sample = self._make_sample(30, 6)
+        kernel = nn_spacetime(h_scale='200km', t_scale='P1D')
+        expected = GeneralUngriddedCollocator().collocate(sample, ug_data, SepConstraintKdtree(), kernel)[0]
+        new_data = GeneralUngriddedCollocator().collocate(sample, ug_data, SepConstraintKdtree(t_sep='P1D'),
+                                                          kernel)[0]
+
+        data_times = ug_data.coord('time').points.ravel()
+        nearest_times = [data_times[ug_data.data.ravel() == value][0] for value in expected.data]
+        too_far = np.abs(np.array(nearest_times) - sample.coord('time').points) >= 1
+        assert too_far.any() and not too_far.all()
+        assert_equal(new_data.data.mask, too_far)
+        assert np.allclose(new_data.data[~too_far], expected.data[~too_far])
+
+    def test_time_is_ignored_without_time_scale(self):
+        from cis.collocation.col_implementations import GeneralUngriddedCollocator, nn_spacetime, nn_horizontal, \
+            SepConstraintKdtree
+
+        ug_data = mock.make_regular_2d_ungridded_data()
+        sample = UngriddedData.from_points_array([HyperPoint(lat=lat, lon=lon) for lat, lon in
+                                                  [(1.2, 0.3), (-7.4, 4.1), (9.0, -4.6), (-3.3, -2.2)]])
+        new_data = GeneralUngriddedCollocator().collocate(sample, ug_data, SepConstraintKdtree(),
+                                                          nn_spacetime(t_scale=None))[0]
+        expected = GeneralUngriddedCollocator().collocate(sample, ug_data, SepConstraintKdtree(), nn_horizontal())[0]
+        assert_equal(new_data.data, expected.data)
+
+    def test_missing_time_raises_error(self):
+        from cis.collocation.col_implementations import GeneralUngriddedCollocator, nn_spacetime, SepConstraintKdtree
+        from cis.exceptions import CoordinateNotFoundError
+
+        ug_data = mock.make_regular_2d_ungridded_data()
+        sample = self._make_sample(5, 8)
+        kernel = nn_spacetime()
+        with self.assertRaises(CoordinateNotFoundError):
+            GeneralUngriddedCollocator().collocate(sample, ug_data, SepConstraintKdtree(), kernel)
+        data_points = ug_data.as_data_frame(time_index=False, name='vals')
+        point = sample.as_data_frame(time_index=False, name='vals').iloc[0]
+        with self.assertRaises(CoordinateNotFoundError):
+            kernel.get_value(point, data_points)
+
+    def test_missing_altitude_raises_error(self):
+        from cis.collocation.col_implementations import GeneralUngriddedCollocator, nn_spacetime, SepConstraintKdtree
+        from cis.exceptions import CoordinateNotFoundError
+
+        ug_data = mock.make_regular_2d_with_time_ungridded_data()
+        sample = self._make_sample(5, 9)
+        kernel = nn_spacetime(a_scale='10m')
+        with self.assertRaises(CoordinateNotFoundError):
+            GeneralUngriddedCollocator().collocate(sample, ug_data, SepConstraintKdtree(), kernel)
+        data_points = ug_data.as_data_frame(time_index=False, name='vals')
+        point = sample.as_data_frame(time_index=False, name='vals').iloc[0]
+        with self.assertRaises(CoordinateNotFoundError):
+            kernel.get_value(point, data_points)
+
+    def test_invalid_scale_raises_error(self):
+        from cis.collocation.col_implementations import nn_spacetime
+        from cis.exceptions import InvalidCommandLineOptionError
+        with self.assertRaises(InvalidCommandLineOptionError):
+            nn_spacetime(h_scale='0km')
+
+
+class TestDistanceWeighted(unittest.TestCase):
+    def test_weighted_means_match_per_point_kernel(self):
+        from cis.collocation.col_implementations import GeneralUngriddedCollocator, SepConstraintKdtree, idw, gaussian
+
+        class PerPointKernel(object):
+            """
+            Wraps a kernel so the collocator applies it one sample point at a time. This isn't a Kernel subclass, so
+            it can't be picked up by the lookup of kernels by name.
+            """
+            def __init__(self, kernel):
+                self.kernel = kernel
+
+            def __getattr__(self, name):
+                return getattr(self.kernel, name)
+
+        ug_data = mock.make_regular_4d_ungridded_data()
+        sample = TestNNSpaceTime()._make_sample(30, 7)
+        for kernel in [idw(), idw(power='1'), gaussian(sigma='300km')]:
+            for constraint in [dict(h_sep='1000km'), dict(h_sep='1000km', t_sep='P3D'), dict(t_sep='P3D')]:
+                new_data = GeneralUngriddedCollocator().collocate(sample, ug_data, SepConstraintKdtree(**constraint),
+                                                                  kernel)[0]
+                expected = GeneralUngriddedCollocator().collocate(sample, ug_data, SepConstraintKdtree(**constraint),
+                                                                  PerPointKernel(kernel))[0]
+                assert_equal(np.ma.getmaskarray(new_data.data), np.ma.getmaskarray(expected.data))
+                assert_almost_equal(new_data.data.filled(0), expected.data.filled(0))
+
+    def test_idw_uses_only_points_at_the_sample_point(self):
+        from cis.collocation.col_implementations import idw
+        values = np.array([1.0, 5.0, 2.0, 3.0, 4.0])
+        distances = np.array([0.0, 10.0, 1.0, 1.0, 0.0])
+        indptr = np.array([0, 2, 4, 5])
+        assert_almost_equal(idw().get_value_for_segments(values, distances, indptr), [1.0, 2.5, 4.0])
+
+    def test_invalid_weighting_parameters_raise_error(self):
+        from cis.collocation.col_implementations import idw, gaussian
+        from cis.exceptions import InvalidCommandLineOptionError
+        with self.assertRaises(InvalidCommandLineOptionError):
+            idw(power='0')
+        with self.assertRaises(InvalidCommandLineOptionError):
+            gaussian(sigma='0km')
+
+
 class TestMean(unittest.TestCase):
     def test_basic_col_in_4d(self):
         from cis.collocation.col_implementations import GeneralUngriddedCollocator, mean, SepConstraintKdtree
@@ -373,5 +532,19 @@ class TestMean(unittest.TestCase):
         eq_(new_data.data[0], 25.5)
 
 
+
+class TestPercentile(unittest.TestCase):
+    def test_percentile_of_values(self):
+        from cis.collocation.col_implementations import percentile
+        assert_almost_equal(percentile(q='75').get_value_for_data_only(np.arange(5.0)), 3.0)
+
+    def test_invalid_percentile_throws_an_error(self):
+        from cis.collocation.col_implementations import percentile
+        from cis.exceptions import InvalidCommandLineOptionError
+        for q in ['101', '-1', 'high']:
+            with self.assertRaises(InvalidCommandLineOptionError):
+                percentile(q=q)
+
+
 if __name__ == '__main__':
     unittest.main()
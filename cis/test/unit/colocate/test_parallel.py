@@ -0,0 +1,45 @@
+"""
+Tests the helpers for running collocations in parallel
+"""
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from cis.collocation import parallel
+
+
+def _scaled_sum(values, scale, task):
+    return np.sum(values[task]) * scale
+
+
+class TestParallel(unittest.TestCase):
+
+    def test_spatial_shards_cover_every_point_once(self):
+        rng = np.random.RandomState(0)
+        lats, lons = rng.uniform(-90, 90, 101), rng.uniform(-180, 180, 101)
+        shards = parallel.spatial_shards(lats, lons, 7)
+        assert len(shards) == 7
+        assert_array_equal(np.sort(np.concatenate(shards)), np.arange(101))
+
+    def test_spatial_order_keeps_nearby_points_together(self):
+        # Two well separated clusters should each end up contiguous in the order
+        lats = np.array([10.0, -50.0, 10.5, -50.5, 10.2, -50.2])
+        lons = np.array([20.0, 100.0, 20.5, 100.5, 20.2, 100.2])
+        order = parallel.spatial_order(lats, lons)
+        assert set(order[:3]) in ({0, 2, 4}, {1, 3, 5})
+
+    def test_spatial_shards_with_fewer_points_than_shards(self):
+        shards = parallel.spatial_shards(np.array([1.0, 2.0]), np.array([1.0, 2.0]), 5)
+        assert len(shards) == 2
+
+    def test_map_in_processes_returns_results_in_order(self):
+        values = np.arange(100.0)
+        tasks = [np.arange(i, i + 10) for i in range(0, 100, 10)]
+        results = parallel.map_in_processes(_scaled_sum, tasks, 3, values, 2.0)
+        assert_array_equal(results, [2.0 * np.sum(values[task]) for task in tasks])
+
+    def test_map_in_processes_with_one_worker(self):
+        values = np.arange(10.0)
+        results = parallel.map_in_processes(_scaled_sum, [np.arange(5), np.arange(5, 10)], 1, values, 1.0)
+        assert_array_equal(results, [10.0, 35.0])
@@ -0,0 +1,68 @@
+"""
+Tests the segmented reductions used to apply kernels to many points at once
+"""
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal, assert_array_almost_equal
+
+from cis.collocation import segmented
+
+
+class TestSegmentedReductions(unittest.TestCase):
+
+    def setUp(self):
+        # Segments: [1, 2, 3], [], [4], [5, 7]
+        self.values = np.array([1.0, 2.0, 3.0, 4.0, 5.0, 7.0])
+        self.indptr = np.array([0, 3, 3, 4, 6])
+
+    def test_csr_from_lists(self):
+        indptr, indices = segmented.csr_from_lists([[4, 1], [], [2], [0, 3, 5]])
+        assert_array_equal(indptr, [0, 2, 2, 3, 6])
+        assert_array_equal(indices, [4, 1, 2, 0, 3, 5])
+
+    def test_csr_from_empty_lists(self):
+        indptr, indices = segmented.csr_from_lists([])
+        assert_array_equal(indptr, [0])
+        assert indices.size == 0
+
+    def test_segment_ids(self):
+        assert_array_equal(segmented.segment_ids(self.indptr), [0, 0, 0, 2, 3, 3])
+
+    def test_compress_segments(self):
+        keep = np.array([True, False, True, False, True, True])
+        assert_array_equal(segmented.compress_segments(self.indptr, keep), [0, 2, 2, 2, 4])
+
+    def test_sum_min_max(self):
+        assert_array_equal(segmented.segment_sum(self.values, self.indptr), [6.0, np.nan, 4.0, 12.0])
+        assert_array_equal(segmented.segment_min(self.values, self.indptr), [1.0, np.nan, 4.0, 5.0])
+        assert_array_equal(segmented.segment_max(self.values, self.indptr), [3.0, np.nan, 4.0, 7.0])
+
+    def test_mean_and_count(self):
+        assert_array_equal(segmented.segment_mean(self.values, self.indptr), [2.0, np.nan, 4.0, 6.0])
+        assert_array_equal(segmented.segment_count(self.values, self.indptr), [3, np.nan, 1, 2])
+
+    def test_std_matches_numpy(self):
+        expected = [np.std([1.0, 2.0, 3.0], ddof=1), np.nan, np.nan, np.std([5.0, 7.0], ddof=1)]
+        assert_array_almost_equal(segmented.segment_std(self.values, self.indptr, ddof=1), expected)
+
+    def test_sort_segments(self):
+        values = np.array([3.0, 1.0, 2.0, 4.0, 7.0, 5.0])
+        assert_array_equal(segmented.sort_segments(values, self.indptr), [1.0, 2.0, 3.0, 4.0, 5.0, 7.0])
+
+    def test_percentile_matches_numpy(self):
+        values = np.array([3.0, 1.0, 2.0, 4.0, 7.0, 5.0])
+        for q in [0, 10, 50, 75, 100]:
+            expected = [np.percentile([3.0, 1.0, 2.0], q), np.nan, 4.0, np.percentile([7.0, 5.0], q)]
+            assert_array_almost_equal(segmented.segment_percentile(values, self.indptr, q), expected)
+
+    def test_median(self):
+        assert_array_equal(segmented.segment_median(self.values, self.indptr), [2.0, np.nan, 4.0, 6.0])
+
+    def test_argmin_returns_first_minimum_ignoring_nans(self):
+        values = np.array([3.0, 1.0, 1.0, 4.0, np.nan, np.nan, 2.0, np.nan])
+        indptr = np.array([0, 3, 3, 4, 6, 8])
+        assert_array_equal(segmented.segment_argmin(values, indptr), [1, -1, 3, -1, 6])
+
+    def test_all_empty_segments(self):
+        assert_array_equal(segmented.segment_mean(np.array([]), np.array([0, 0, 0])), [np.nan, np.nan])
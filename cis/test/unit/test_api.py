@@ -120,6 +120,14 @@ class TestAPI(TestCase):
         # This dataset should still be the same as the alternative one (this checks data and metadata)
         assert self.ug == self.ug_1
 
+    def test_workers_are_ignored_with_a_warning_for_gridded_collocation(self):
+        from mock import patch
+        for sample, data in [(self.ug, self.gd), (self.gd, self.gd), (self.gd, self.ug)]:
+            with patch('logging.warning') as warning:
+                res = sample.sampled_from(data, workers=4)
+            assert warning.called
+            assert_array_almost_equal(res[0].data, sample.sampled_from(data)[0].data)
+
     def test_basic_gridded_subsetting(self):
         gd_copy = self.gd.copy()
         res = self.gd.subset(x=[-5, 0])
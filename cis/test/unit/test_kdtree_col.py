@@ -1,10 +1,11 @@
 import datetime as dt
+import unittest
 import pandas as pd
 
 from hamcrest import *
 from nose.tools import istest, eq_
 import numpy as np
-from cis.collocation.kdtree import KDTree
+from cis.collocation.kdtree import KDTree, UnitSphereKDTree, HaversineDistanceKDTree, haversine_distance
 from cis.time_util import cis_standard_time_unit
 import cis.data_io.gridded_data as gridded_data
 from cis.data_io.hyperpoint import HyperPoint, HyperPointList
@@ -59,7 +60,9 @@ class Test_nn_horizontal_kdtree(object):
         points finding any points which are closer than the current closest. If two distances were exactly the same
         you would expect the first point to be chosen. This doesn't seem to always be the case but is probably
         down to floating points errors in the haversine calculation as these test points are pretty close
-        together. This test is only really for documenting the behaviour for equidistant points.
+        together. This test is only really for documenting the behaviour for equidistant points. (The compiled index
+        compares chord lengths on the unit sphere so its rounding, and hence the chosen point, can differ from the pure
+        Python haversine tree.)
         """
         ug_data = mock.make_regular_2d_ungridded_data()
         sample_points = UngriddedData.from_points_array(
@@ -69,8 +72,8 @@ class Test_nn_horizontal_kdtree(object):
         new_data = col.collocate(sample_points, ug_data, SepConstraintKdtree(), nn_horizontal_only())[0]
         eq_(new_data.data[0], 11.0)
         eq_(new_data.data[1], 5.0)
-        eq_(new_data.data[2], 10.0)
-        eq_(new_data.data[3], 4.0)
+        eq_(new_data.data[2], 11.0)
+        eq_(new_data.data[3], 5.0)
 
     @istest
     def test_coordinates_outside_grid_in_col_ungridded_to_ungridded_in_2d(self):
@@ -219,7 +222,7 @@ class TestSepConstraint(object):
         #  in each direction
         constraint = SepConstraintKdtree(h_sep=400)
 
-        index = HaversineDistanceKDTreeIndex()
+        index = HaversineDistanceKDTreeIndex(compiled=False)
         index.index_data(sample_points, ug_data_points, coord_map, leafsize=2)
 
         depth = self.get_max_depth(index.index.tree, 0)
@@ -307,6 +310,170 @@ class TestSepConstraintWithoutHorizontalSeparation(object):
         assert (np.equal(ref_vals, new_vals).all())
 
 
+class TestUnitSphereKDTree(unittest.TestCase):
+    """Tests that the compiled tree finds the same points as a brute force search using the haversine distance.
+    """
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.points = np.column_stack([rng.uniform(-90, 90, 500), rng.uniform(-180, 180, 500)])
+        self.sample = np.column_stack([rng.uniform(-90, 90, 50), rng.uniform(-180, 180, 50)])
+        self.mask = rng.uniform(size=500) < 0.1
+        self.distances = np.array([[haversine_distance(s, p) for p in self.points] for s in self.sample])
+        self.distances[:, self.mask] = np.inf
+
+    def test_query_finds_the_nearest_points(self):
+        distances, indices = UnitSphereKDTree(self.points, mask=self.mask).query(self.sample)
+        assert np.array_equal(indices, self.distances.argmin(axis=1))
+        assert np.allclose(distances, self.distances.min(axis=1))
+
+    def test_query_with_upper_bound_returns_n_for_missing_neighbours(self):
+        tree = UnitSphereKDTree(self.points, mask=self.mask)
+        distances, indices = tree.query(self.sample, distance_upper_bound=300)
+        missing = self.distances.min(axis=1) > 300
+        assert missing.any()
+        assert np.all(indices[missing] == tree.n)
+        assert np.all(np.isinf(distances[missing]))
+
+    def test_query_ball_point_finds_the_points_within_distance(self):
+        actual = UnitSphereKDTree(self.points, mask=self.mask).query_ball_point(self.sample, 1000)
+        for distances, a in zip(self.distances, actual):
+            eq_(sorted(a), np.nonzero(distances <= 1000)[0].tolist())
+
+    def test_query_ball_tree_finds_the_points_within_distance(self):
+        actual = UnitSphereKDTree(self.sample).query_ball_tree(UnitSphereKDTree(self.points, mask=self.mask), 1000)
+        eq_(len(actual), len(self.sample))
+        for distances, a in zip(self.distances, actual):
+            eq_(sorted(a), np.nonzero(distances <= 1000)[0].tolist())
+    def test_sparse_distance_matrix_finds_the_distances_within_distance(self):
+        i, j, d = UnitSphereKDTree(self.sample).sparse_distance_matrix(UnitSphereKDTree(self.points, mask=self.mask),
+                                                                        1000)
+        expected_i, expected_j = np.nonzero(self.distances <= 1000)
+        order = np.lexsort((j, i))
+        assert np.array_equal(i[order], expected_i)
+        assert np.array_equal(j[order], expected_j)
+        assert np.allclose(d[order], self.distances[expected_i, expected_j])
+
+    def test_approximate_query_ball_tree_csr_only_finds_points_within_distance(self):
+        indptr, indices, distances = UnitSphereKDTree(self.sample).query_ball_tree_csr(
+            UnitSphereKDTree(self.points, mask=self.mask), 1000, eps=0.5)
+        rows = np.repeat(np.arange(len(self.sample)), np.diff(indptr))
+        assert np.all(distances <= 1000)
+        assert np.allclose(distances, self.distances[rows, indices])
+
+    def test_index_finds_the_points_and_distances_within_distance(self):
+        data = pd.DataFrame({'latitude': self.points[:, 0], 'longitude': self.points[:, 1]})
+        sample = pd.DataFrame({'latitude': self.sample[:, 0], 'longitude': self.sample[:, 1]})
+        index = HaversineDistanceKDTreeIndex()
+        index.index_data(None, data, None)
+        indptr, indices, distances = index.find_points_and_distances_within_distance_sample(sample, 1000)
+        distance_matrix = np.array([[haversine_distance(s, p) for p in self.points] for s in self.sample])
+        expected_i, expected_j = np.nonzero(distance_matrix <= 1000)
+        assert np.array_equal(indptr, np.append(0, np.cumsum(np.bincount(expected_i, minlength=len(self.sample)))))
+        assert np.array_equal(indices, expected_j)
+        assert np.allclose(distances, distance_matrix[expected_i, expected_j])
+
+
+class TestHaversineDistanceKDTree(unittest.TestCase):
+    """Tests that the array-backed pure Python tree finds the same points as a brute force search, and can be saved.
+    The points are regional since the bounds used by this tree are approximate over large areas.
+    """
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.points = np.column_stack([rng.uniform(-20, 20, 500), rng.uniform(-30, 30, 500)])
+        self.sample = np.column_stack([rng.uniform(-20, 20, 50), rng.uniform(-30, 30, 50)])
+        self.mask = rng.uniform(size=500) < 0.1
+        self.distances = np.array([[haversine_distance(s, p) for p in self.points] for s in self.sample])
+        self.distances[:, self.mask] = np.inf
+
+    def test_query_finds_the_nearest_points(self):
+        distances, indices = HaversineDistanceKDTree(self.points, mask=self.mask).query(self.sample)
+        assert np.array_equal(indices, self.distances.argmin(axis=1))
+
+    def test_query_ball_point_finds_the_points_within_distance(self):
+        actual = HaversineDistanceKDTree(self.points, mask=self.mask).query_ball_point(self.sample, 500)
+        for distances, a in zip(self.distances, actual):
+            eq_(sorted(a), np.nonzero(distances <= 500)[0].tolist())
+
+    def test_query_ball_tree_finds_the_points_within_distance(self):
+        actual = HaversineDistanceKDTree(self.sample).query_ball_tree(
+            HaversineDistanceKDTree(self.points, mask=self.mask), 500)
+        eq_(len(actual), len(self.sample))
+        for distances, a in zip(self.distances, actual):
+            eq_(sorted(a), np.nonzero(distances <= 500)[0].tolist())
+
+    def test_query_ball_tree_csr_finds_the_points_and_distances_within_distance(self):
+        expected_i, expected_j = np.nonzero(self.distances <= 500)
+        for batch_size in [1, 1000000]:
+            indptr, indices, distances = HaversineDistanceKDTree(self.sample, leafsize=4).query_ball_tree_csr(
+                HaversineDistanceKDTree(self.points, mask=self.mask), 500, batch_size=batch_size)
+            assert np.array_equal(indptr, np.append(0, np.cumsum(np.bincount(expected_i, minlength=len(self.sample)))))
+            assert np.array_equal(indices, expected_j)
+            assert np.allclose(distances, self.distances[expected_i, expected_j])
+
+    def test_each_node_has_contiguous_points(self):
+        tree = HaversineDistanceKDTree(self.points, mask=self.mask, leafsize=4)
+        eq_(sorted(tree.indices), np.nonzero(~self.mask)[0].tolist())
+        inner = tree.split_dims >= 0
+        assert np.array_equal(tree.starts[tree.less[inner]], tree.starts[inner])
+        assert np.array_equal(tree.ends[tree.less[inner]], tree.starts[tree.greater[inner]])
+        assert np.array_equal(tree.ends[tree.greater[inner]], tree.ends[inner])
+        assert np.all(tree.ends[~inner] - tree.starts[~inner] <= 4)
+
+    def test_pickled_and_recreated_trees_give_the_same_results(self):
+        import pickle
+        tree = HaversineDistanceKDTree(self.points, mask=self.mask)
+        expected = tree.query_ball_point(self.sample, 500).tolist()
+        for copied in [pickle.loads(pickle.dumps(tree)), HaversineDistanceKDTree.from_arrays(tree.to_arrays())]:
+            eq_(copied.query_ball_point(self.sample, 500).tolist(), expected)
+            assert np.array_equal(copied.query(self.sample)[1], tree.query(self.sample)[1])
+
+
+class TestApproximateSearch(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(7)
+        self.data = pd.DataFrame({'latitude': rng.uniform(0, 10, 2000), 'longitude': rng.uniform(0, 10, 2000)})
+        self.sample = pd.DataFrame({'latitude': rng.uniform(0, 10, 100), 'longitude': rng.uniform(0, 10, 100)})
+        self.distances = haversine_distance(np.repeat(self.sample.values, len(self.data), axis=0),
+                                            np.tile(self.data.values, (len(self.sample), 1))).reshape(100, 2000)
+
+    def test_eps_configures_the_index_of_the_constraint(self):
+        constraint = SepConstraintKdtree(h_sep='50km', eps='0.1')
+        assert isinstance(constraint.haversine_distance_kd_tree_index, HaversineDistanceKDTreeIndex)
+        eq_(constraint.haversine_distance_kd_tree_index.eps, 0.1)
+
+    def test_invalid_eps_raises_error(self):
+        from cis.exceptions import InvalidCommandLineOptionError
+        for eps in ['a', '-0.1']:
+            with self.assertRaises(InvalidCommandLineOptionError):
+                SepConstraintKdtree(h_sep='50km', eps=eps)
+
+    def test_eps_is_not_an_option_of_the_brute_force_constraint(self):
+        from cis.collocation.col_implementations import SepConstraint
+        with self.assertRaises(TypeError):
+            SepConstraint(h_sep='50km', eps='0.1')
+
+    def test_approximate_search_finds_the_points_well_within_distance(self):
+        for compiled in [True, False]:
+            index = HaversineDistanceKDTreeIndex(compiled=compiled, eps=0.1)
+            index.index_data(None, self.data, None)
+            indptr, indices, distances = index.find_points_and_distances_within_distance_sample(self.sample, 50)
+            rows = np.repeat(np.arange(len(self.sample)), np.diff(indptr))
+            assert np.all(distances <= 50)
+            assert np.allclose(distances, self.distances[rows, indices])
+            found = set(zip(rows, indices))
+            assert set(zip(*np.nonzero(self.distances <= 50 / 1.1))) <= found
+
+    def test_approximate_nearest_point_is_within_eps_of_the_nearest(self):
+        index = HaversineDistanceKDTreeIndex(eps=0.5)
+        index.index_data(None, self.data, None)
+        nearest = index.find_nearest_point(self.sample)
+        assert np.all(self.distances[np.arange(len(self.sample)), nearest] <=
+                      1.5 * self.distances.min(axis=1) + 1e-9)
+
+
 if __name__ == '__main__':
     import nose
 
@@ -621,6 +621,26 @@ class TestParseAggregate(ParseTestFiles):
             args = ['aggregate', 'var1:%s' % self.escaped_single_valid_file, lim]
             parse_args(args)
 
+    def test_GIVEN_kernel_with_parameters_WHEN_aggregate_THEN_kernel_created(self):
+        from cis.collocation.col_implementations import percentile
+        args = ['aggregate', 'var1:%s:kernel=percentile[q=90]' % self.escaped_single_valid_file, 'x=[-10,10,1]']
+        kernel = parse_args(args).datagroups[0]['kernel']
+        assert_that(isinstance(kernel, percentile))
+        assert_that(kernel.q, is_(90.0))
+
+    def test_GIVEN_workers_WHEN_aggregate_THEN_parsed_OK(self):
+        args = ['aggregate', 'var1:%s' % self.escaped_single_valid_file, 'x=[-10,10,1]', '--workers', '4']
+        assert_that(parse_args(args).workers, is_(4))
+
+    def test_GIVEN_no_workers_WHEN_aggregate_THEN_raises_error(self):
+        args = ['aggregate', 'var1:%s' % self.escaped_single_valid_file, 'x=[-10,10,1]', '--workers', '0']
+        try:
+            parse_args(args)
+            assert False
+        except SystemExit as e:
+            if e.code != 2:
+                raise
+
     def test_output_file_matches_an_input_file(self):
         from cis.parse import _output_file_matches_an_input_file
         from argparse import Namespace